@@ -7,3 +7,6 @@ from aiosurge.reports import Report
 
 api_key = os.environ.get("SURGE_API_KEY", None)
 base_url = os.environ.get("SURGE_BASE_URL", "https://app.surgehq.ai/api")
+# Executor used for CPU heavy report decoding: gzip decompression, JSON and CSV parsing.
+# None uses the event loop's default thread pool.
+decode_executor = None
@@ -0,0 +1,35 @@
+import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+async def aiter(items):
+    """Iterate over a sync or async iterable."""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+def require_numpy(feature: str):
+    """Raise an ImportError naming `feature` if the numpy extra is not installed."""
+    if np is None:
+        raise ImportError(
+            f"numpy is required for {feature}, install it with `pip install aiosurge[numpy]`"
+        )
+
+
+def as_int64(values: array.array, copy: bool = False):
+    """
+    Returns an int64 numpy array over an array.array("q"), without copying it unless `copy` is set.
+    Copy it if the array keeps growing while the result is in use.
+    """
+    if not values:
+        return np.zeros(0, dtype=np.int64)
+    view = np.frombuffer(values, dtype=np.int64)
+    return view.copy() if copy else view
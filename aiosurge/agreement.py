@@ -0,0 +1,243 @@
+import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from aiosurge._helpers import as_int64, require_numpy
+from aiosurge.columnar import ColumnSpec, schema_from_questions
+from aiosurge.records import aiter_response_records
+
+# Distance between two options, used by Krippendorff's alpha
+KRIPPENDORFF_METRICS = ("nominal", "ordinal", "interval")
+
+
+def fleiss_kappa(counts):
+    """
+    Fleiss' kappa of a count matrix.
+
+    Tasks may have different numbers of responses. Tasks with fewer than two responses are ignored.
+
+    Arguments:
+        counts (array): shape (tasks, categories), the number of responses of each task in each category.
+
+    Returns:
+        kappa (float): NaN if there is no task with two responses, or if every response is in the same category.
+    """
+    require_numpy("agreement metrics")
+    counts = np.asarray(counts, dtype=np.float64)
+    raters = counts.sum(axis=1)
+    counts = counts[raters >= 2]
+    raters = raters[raters >= 2]
+    if not len(counts):
+        return float("nan")
+
+    observed = ((counts * (counts - 1)).sum(axis=1) / (raters * (raters - 1))).mean()
+    proportions = counts.sum(axis=0) / raters.sum()
+    expected = (proportions**2).sum()
+    if expected == 1:
+        return float("nan")
+    return float((observed - expected) / (1 - expected))
+
+
+def krippendorff_alpha(counts, metric: str = "nominal"):
+    """
+    Krippendorff's alpha of a count matrix. Tasks with fewer than two responses are ignored.
+
+    Arguments:
+        counts (array): shape (tasks, categories), the number of responses of each task in each category.
+        metric (str): "nominal" for unordered categories, "ordinal" or "interval" for categories
+            ordered like a Likert scale, with equally spaced options for "interval".
+
+    Returns:
+        alpha (float): NaN if there are no pairable responses, or if every response is in the same category.
+    """
+    require_numpy("agreement metrics")
+    if metric not in KRIPPENDORFF_METRICS:
+        raise ValueError(
+            "metric must be one of {}".format(", ".join(KRIPPENDORFF_METRICS))
+        )
+    counts = np.asarray(counts, dtype=np.float64)
+    pairable = counts.sum(axis=1)
+    counts = counts[pairable >= 2]
+    pairable = pairable[pairable >= 2]
+    if not len(counts):
+        return float("nan")
+
+    # Coincidence matrix: o[c, k] = sum over tasks of n_c * (n_k - [c == k]) / (m - 1)
+    weighted = counts / (pairable - 1)[:, None]
+    coincidences = weighted.T @ counts - np.diag(weighted.sum(axis=0))
+    totals = coincidences.sum(axis=1)
+    n = totals.sum()
+
+    distances = _squared_distances(totals, metric)
+    observed = (coincidences * distances).sum()
+    expected = (np.outer(totals, totals) * distances).sum()
+    if expected == 0:
+        return float("nan")
+    return float(1 - (n - 1) * observed / expected)
+
+
+def _squared_distances(totals, metric: str):
+    categories = np.arange(len(totals))
+    if metric == "nominal":
+        return (categories[:, None] != categories[None, :]).astype(np.float64)
+    if metric == "interval":
+        return ((categories[:, None] - categories[None, :]) ** 2).astype(np.float64)
+    # Ordinal: the number of values between two categories, counting each end as half
+    cumulative = np.concatenate([[0], np.cumsum(totals)])
+    low = np.minimum(categories[:, None], categories[None, :])
+    high = np.maximum(categories[:, None], categories[None, :])
+    between = cumulative[high + 1] - cumulative[low]
+    return (between - (totals[low] + totals[high]) / 2) ** 2
+
+
+class AgreementScores:
+
+    def __init__(
+        self,
+        name: str,
+        fleiss_kappa: float,
+        krippendorff_alpha: float,
+        num_tasks: int,
+        num_responses: int,
+    ):
+        self.name = name
+        self.fleiss_kappa = fleiss_kappa
+        self.krippendorff_alpha = krippendorff_alpha
+        self.num_tasks = num_tasks
+        self.num_responses = num_responses
+
+    def __str__(self):
+        return (
+            f'<surge.AgreementScores name="{self.name}" '
+            f"fleiss_kappa={self.fleiss_kappa:.3f} krippendorff_alpha={self.krippendorff_alpha:.3f}>"
+        )
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class AgreementCounter:
+
+    def __init__(self, questions: list):
+        """
+        Encodes the answers to multiple choice, Likert and checkbox questions as option codes, one
+        response at a time, and turns them into per task count matrices.
+
+        Codes are kept in compact integer arrays, so millions of responses fit in a few bytes each.
+
+        Arguments:
+            questions (list): Question objects of the project. Other question types are ignored.
+        """
+        self.columns = [
+            column
+            for column in schema_from_questions(questions)
+            if column.kind in (ColumnSpec.CATEGORICAL, ColumnSpec.MULTI_OPTION)
+        ]
+        self._task_index = {}
+        # Per column: task index and option code of each answer, as 64 bit integers
+        self._tasks = [array.array("q") for _ in self.columns]
+        self._codes = [array.array("q") for _ in self.columns]
+        # Per column: number of responses of each task, for checkbox questions
+        self._responses = [array.array("q") for _ in self.columns]
+
+    def __str__(self):
+        return f"<surge.AgreementCounter tasks={len(self._task_index)}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def add(self, response):
+        """Add one ResponseRecord."""
+        task = self._task_index.setdefault(response.task_id, len(self._task_index))
+        for column, tasks, codes, responses in zip(
+            self.columns, self._tasks, self._codes, self._responses
+        ):
+            value = response.answer(column.question)
+            if value is None:
+                continue
+            if column.kind == ColumnSpec.CATEGORICAL:
+                code = column.code(value)
+                if code >= 0:
+                    tasks.append(task)
+                    codes.append(code)
+            else:
+                # Every response to a checkbox question is a yes/no answer for each option
+                responses.append(task)
+                for code in column.codes(value):
+                    tasks.append(task)
+                    codes.append(code)
+
+    def count_matrices(self):
+        """
+        Returns the count matrix of each question, keyed by column name.
+        Checkbox questions have one two-column (not selected, selected) matrix per option, named "{column}: {option}".
+
+        Returns:
+            matrices (dict): arrays of shape (tasks, categories), rows in the order tasks were first seen.
+        """
+        require_numpy("agreement metrics")
+        num_tasks = len(self._task_index)
+        matrices = {}
+        for column, tasks, codes, responses in zip(
+            self.columns, self._tasks, self._codes, self._responses
+        ):
+            num_options = len(column.options)
+            counts = np.bincount(
+                as_int64(tasks) * num_options + as_int64(codes),
+                minlength=num_tasks * num_options,
+            ).reshape(num_tasks, num_options)
+            if column.kind == ColumnSpec.CATEGORICAL:
+                matrices[column.name] = counts
+                continue
+
+            answered = np.bincount(as_int64(responses), minlength=num_tasks)
+            for i, option in enumerate(column.options):
+                selected = counts[:, i]
+                matrices[f"{column.name}: {option}"] = np.stack(
+                    [answered - selected, selected], axis=1
+                )
+        return matrices
+
+    def scores(self, likert_metric: str = "interval"):
+        """
+        Returns the agreement of each question, keyed by column name, see `count_matrices`.
+
+        Arguments:
+            likert_metric (str): Krippendorff metric for Likert questions, "ordinal" or "interval".
+                Other questions use the nominal metric.
+        """
+        ordered = {column.name for column in self.columns if column.ordered}
+        scores = {}
+        for name, counts in self.count_matrices().items():
+            metric = likert_metric if name in ordered else "nominal"
+            responses = counts.sum(axis=1)
+            scores[name] = AgreementScores(
+                name,
+                fleiss_kappa(counts),
+                krippendorff_alpha(counts, metric),
+                num_tasks=int((responses > 0).sum()),
+                num_responses=int(responses.sum()),
+            )
+        return scores
+
+
+async def agreement_scores(records, questions: list, likert_metric: str = "interval"):
+    """
+    Compute Fleiss' kappa and Krippendorff's alpha for every multiple choice, Likert and checkbox question.
+
+    Arguments:
+        records (iterable or async iterable): Report records or Task objects, e.g. `Report.stream_json(project_id)`.
+        questions (list): Question objects of the project.
+        likert_metric (str): Krippendorff metric for Likert questions, "ordinal" or "interval".
+
+    Returns:
+        scores (dict): AgreementScores keyed by column name, the question's column header if it has one or
+            otherwise its label, with one entry per option for checkbox questions.
+    """
+    counter = AgreementCounter(questions)
+    async for response in aiter_response_records(records):
+        counter.add(response)
+    return counter.scores(likert_metric)
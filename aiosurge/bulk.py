@@ -0,0 +1,184 @@
+import asyncio
+import time
+
+from aiosurge._helpers import aiter
+
+
+class RateLimiter:
+
+    def __init__(self, rate: float, burst: float = None):
+        """
+        Token bucket rate limiter shared by concurrent coroutines.
+
+        Arguments:
+            rate (float): Tokens added per second, e.g. requests per second or bytes per second.
+            burst (float, optional): Maximum number of tokens that can accumulate. Defaults to `rate`.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        # Created lazily so the lock belongs to the running event loop
+        self._lock = None
+
+    async def acquire(self, amount: float = 1):
+        """Wait until `amount` tokens are available and consume them."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            # Amounts larger than the burst size are allowed, the caller just waits longer
+            self._tokens -= amount
+            if self._tokens < 0:
+                await asyncio.sleep(-self._tokens / self.rate)
+
+
+class BulkResult:
+
+    def __init__(self, item, result=None, error: Exception = None):
+        self.item = item
+        self.result = result
+        self.error = error
+
+    def __str__(self):
+        return f"<surge.BulkResult ok={self.ok}>"
+
+    def __repr__(self):
+        return (
+            f"<surge.BulkResult ok={self.ok} item={self.item!r} error={self.error!r}>"
+        )
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class BulkProgress:
+
+    def __init__(self, total: int = None):
+        self.total = total
+        self.completed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self._started_at = time.monotonic()
+
+    def __str__(self):
+        total = "?" if self.total is None else self.total
+        return f"<surge.BulkProgress {self.completed}/{total} failed={self.failed}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self._started_at
+
+    def _update(self, result: BulkResult):
+        self.completed += 1
+        if result.ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+
+class BulkSummary:
+
+    def __init__(self):
+        self.succeeded = 0
+        self.failed = 0
+        # Only failures are kept, so memory does not grow with the number of successes
+        self.failures = []
+
+    def __str__(self):
+        return f"<surge.BulkSummary succeeded={self.succeeded} failed={self.failed}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    @property
+    def failed_items(self):
+        """The input items that failed, e.g. to pass them to the same bulk call again."""
+        return [result.item for result in self.failures]
+
+    def _update(self, result: BulkResult):
+        if result.ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+            self.failures.append(result)
+
+
+async def run_bulk(
+    items,
+    fn,
+    concurrency: int = 10,
+    rate_limit=None,
+    on_progress=None,
+    total: int = None,
+):
+    """
+    Run the coroutine function `fn` once per item with bounded concurrency and yield a
+    BulkResult for each item as it completes. Errors raised by `fn` are captured in the result.
+
+    Items are pulled from `items` only when a slot is free, so arbitrarily long iterables
+    and async iterables are processed in constant memory.
+
+    Arguments:
+        items (iterable or async iterable): Items to process.
+        fn (coroutine function): Called as `await fn(item)`.
+        concurrency (int): Maximum number of calls in flight.
+        rate_limit (float or RateLimiter, optional): Maximum calls per second.
+        on_progress (callable, optional): Called with a BulkProgress after each item completes.
+        total (int, optional): Number of items, reported in the progress.
+
+    Returns:
+        results (async iterator): BulkResult objects in completion order.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    if rate_limit is not None and not isinstance(rate_limit, RateLimiter):
+        rate_limit = RateLimiter(rate_limit)
+
+    async def run_one(item):
+        if rate_limit is not None:
+            await rate_limit.acquire()
+        try:
+            return BulkResult(item, result=await fn(item))
+        except Exception as err:
+            return BulkResult(item, error=err)
+
+    progress = BulkProgress(total)
+    iterator = aiter(items)
+    pending = set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(run_one(item)))
+
+            if not pending:
+                break
+
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                result = future.result()
+                progress._update(result)
+                if on_progress is not None:
+                    on_progress(progress)
+                yield result
+    finally:
+        for future in pending:
+            future.cancel()
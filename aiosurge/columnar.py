@@ -0,0 +1,382 @@
+import json
+from datetime import timezone
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from aiosurge._helpers import require_numpy
+from aiosurge.records import (
+    aiter_response_records,
+    answer_options,
+    parse_completed_at,
+)
+
+COLUMNAR_BATCH_SIZE = 64 * 1024
+
+# Question types whose answer is a single option of the question
+CATEGORICAL_QUESTION_TYPES = ("multiple_choice", "likert", "tree_selection")
+# Question types whose answer is any number of options of the question
+MULTI_OPTION_QUESTION_TYPES = ("checkbox",)
+# Question types that only display text and have no answer
+NO_ANSWER_QUESTION_TYPES = ("text",)
+
+METADATA_COLUMNS = ("task_id", "response_id", "worker_id", "completed_at")
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError(
+            "pyarrow is required for Arrow and Parquet export, install it with `pip install aiosurge[arrow]`"
+        )
+
+
+class ColumnSpec:
+
+    CATEGORICAL = "categorical"
+    MULTI_OPTION = "multi_option"
+    TEXT = "text"
+
+    def __init__(self, name: str, question, kind: str):
+        """
+        How the answers to one question are stored in columns.
+
+        Arguments:
+            name (str): Column name, the column header of the question or its label.
+            question (Question): The question.
+            kind (str): CATEGORICAL for integer option codes, MULTI_OPTION for one boolean per option,
+                or TEXT for strings.
+        """
+        self.name = name
+        self.question = question
+        self.kind = kind
+        self.options = list(getattr(question, "options", None) or [])
+        self._codes = {option: code for code, option in enumerate(self.options)}
+
+    def __str__(self):
+        return f'<surge.ColumnSpec name="{self.name}" kind="{self.kind}">'
+
+    def __repr__(self):
+        return self.__str__()
+
+    @property
+    def ordered(self):
+        # Likert options are listed from one end of the scale to the other
+        return getattr(self.question, "type", None) == "likert"
+
+    def code(self, value):
+        """Returns the index of the option selected in `value`, or -1 if there is none."""
+        if isinstance(value, (list, tuple)):
+            value = value[0] if len(value) == 1 else None
+        return self._codes.get(value, -1)
+
+    def codes(self, value):
+        """Returns the indexes of the known options selected in `value`."""
+        codes = self._codes
+        return [codes[option] for option in answer_options(value) if option in codes]
+
+
+def schema_from_questions(questions: list):
+    """
+    Infer the columns of a project's results from its questions.
+
+    Multiple choice, Likert and tree selection questions become categorical columns coded by
+    option index, checkbox questions become one boolean per option, and every other question
+    with an answer becomes a text column.
+
+    Arguments:
+        questions (list): Question objects, e.g. `project.questions`.
+
+    Returns:
+        columns (list): ColumnSpec objects in question order.
+    """
+    columns = []
+    names = set()
+    for question in questions:
+        type_ = getattr(question, "type", None)
+        if type_ in NO_ANSWER_QUESTION_TYPES:
+            continue
+        if type_ in CATEGORICAL_QUESTION_TYPES:
+            kind = ColumnSpec.CATEGORICAL
+        elif type_ in MULTI_OPTION_QUESTION_TYPES:
+            kind = ColumnSpec.MULTI_OPTION
+        else:
+            kind = ColumnSpec.TEXT
+
+        base_name = (
+            getattr(question, "column_header", None)
+            or getattr(question, "label", None)
+            or question.text
+        )
+        # Several questions may share a label
+        name = base_name
+        suffix = 2
+        while name in names or name in METADATA_COLUMNS:
+            name = f"{base_name} ({suffix})"
+            suffix += 1
+        names.add(name)
+        columns.append(ColumnSpec(name, question, kind))
+    return columns
+
+
+class ColumnarBuilder:
+
+    def __init__(self, questions: list):
+        """
+        Accumulates responses column by column, to be converted to NumPy arrays or Arrow record batches.
+
+        Arguments:
+            questions (list): Question objects of the project, see `schema_from_questions`.
+        """
+        self.columns = schema_from_questions(questions)
+        self.clear()
+
+    def __str__(self):
+        return f"<surge.ColumnarBuilder columns={len(self.columns)} rows={len(self)}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        return len(self._task_ids)
+
+    def clear(self):
+        self._task_ids = []
+        self._response_ids = []
+        self._worker_ids = []
+        self._completed_at = []
+        self._values = [[] for _ in self.columns]
+
+    def append(self, response):
+        """Add one ResponseRecord as a row."""
+        self._task_ids.append(response.task_id)
+        self._response_ids.append(response.response_id)
+        self._worker_ids.append(response.worker_id)
+        completed_at = parse_completed_at(response.completed_at)
+        if completed_at is not None:
+            # NumPy and Arrow timestamps are naive UTC
+            completed_at = completed_at.astimezone(timezone.utc).replace(tzinfo=None)
+        self._completed_at.append(completed_at)
+
+        for column, values in zip(self.columns, self._values):
+            value = response.answer(column.question)
+            if column.kind == ColumnSpec.CATEGORICAL:
+                values.append(column.code(value))
+            elif column.kind == ColumnSpec.MULTI_OPTION:
+                values.append(column.codes(value))
+            else:
+                values.append(_text(value))
+
+    def to_numpy(self):
+        """
+        Returns the rows as a dict of NumPy arrays keyed by column name.
+
+        Categorical columns are integer option codes, with -1 for a missing or unknown answer.
+        Multi option columns are boolean matrices of shape (rows, options).
+        Text and ID columns are object arrays, and `completed_at` is a datetime64 array in UTC.
+        """
+        require_numpy("columnar export")
+        arrays = {
+            "task_id": np.array(self._task_ids, dtype=object),
+            "response_id": np.array(self._response_ids, dtype=object),
+            "worker_id": np.array(self._worker_ids, dtype=object),
+            "completed_at": np.array(
+                [np.datetime64("NaT") if d is None else d for d in self._completed_at],
+                dtype="datetime64[ms]",
+            ),
+        }
+        for column, values in zip(self.columns, self._values):
+            if column.kind == ColumnSpec.CATEGORICAL:
+                arrays[column.name] = np.array(values, dtype=_code_dtype(column))
+            elif column.kind == ColumnSpec.MULTI_OPTION:
+                arrays[column.name] = _selection_matrix(values, len(column.options))
+            else:
+                arrays[column.name] = np.array(values, dtype=object)
+        return arrays
+
+    def to_arrow(self):
+        """
+        Returns the rows as an Arrow record batch with the schema of `arrow_schema`.
+
+        Categorical columns are dictionary encoded with the question options as dictionary.
+        Multi option columns are expanded to one boolean column per option, named "{column}: {option}".
+        """
+        _require_pyarrow()
+        require_numpy("columnar export")
+        arrays = [
+            pa.array(self._task_ids, pa.string()),
+            pa.array(self._response_ids, pa.string()),
+            pa.array(self._worker_ids, pa.string()).dictionary_encode(),
+            pa.array(self._completed_at, pa.timestamp("ms", tz="UTC")),
+        ]
+        for column, values in zip(self.columns, self._values):
+            if column.kind == ColumnSpec.CATEGORICAL:
+                codes = np.array(values, dtype=_code_dtype(column))
+                arrays.append(
+                    pa.DictionaryArray.from_arrays(
+                        pa.array(codes, mask=codes < 0),
+                        pa.array(column.options, pa.string()),
+                        ordered=column.ordered,
+                    )
+                )
+            elif column.kind == ColumnSpec.MULTI_OPTION:
+                matrix = _selection_matrix(values, len(column.options))
+                arrays.extend(pa.array(matrix[:, i]) for i in range(matrix.shape[1]))
+            else:
+                arrays.append(pa.array(values, pa.string()))
+        return pa.RecordBatch.from_arrays(arrays, schema=arrow_schema(self.columns))
+
+
+def arrow_schema(columns: list):
+    """
+    Returns the Arrow schema of the results, for a list of ColumnSpec or Question objects.
+    """
+    _require_pyarrow()
+    require_numpy("columnar export")
+    if columns and not isinstance(columns[0], ColumnSpec):
+        columns = schema_from_questions(columns)
+    fields = [
+        pa.field("task_id", pa.string()),
+        pa.field("response_id", pa.string()),
+        pa.field("worker_id", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("completed_at", pa.timestamp("ms", tz="UTC")),
+    ]
+    for column in columns:
+        if column.kind == ColumnSpec.CATEGORICAL:
+            index_type = pa.from_numpy_dtype(_code_dtype(column))
+            fields.append(
+                pa.field(
+                    column.name,
+                    pa.dictionary(index_type, pa.string(), ordered=column.ordered),
+                )
+            )
+        elif column.kind == ColumnSpec.MULTI_OPTION:
+            fields.extend(
+                pa.field(f"{column.name}: {option}", pa.bool_())
+                for option in column.options
+            )
+        else:
+            fields.append(pa.field(column.name, pa.string()))
+    return pa.schema(fields)
+
+
+async def iter_arrow_batches(
+    records, questions: list, batch_size: int = COLUMNAR_BATCH_SIZE
+):
+    """
+    Convert report records to Arrow record batches as they arrive, holding at most one batch in memory.
+
+    Arguments:
+        records (iterable or async iterable): Report records or Task objects, e.g. `Report.stream_json(project_id)`.
+        questions (list): Question objects of the project.
+        batch_size (int): Maximum number of responses per batch.
+
+    Returns:
+        batches (async iterator): pyarrow.RecordBatch objects, one row per response.
+    """
+    builder = ColumnarBuilder(questions)
+    async for response in aiter_response_records(records):
+        builder.append(response)
+        if len(builder) >= batch_size:
+            yield builder.to_arrow()
+            builder.clear()
+    if len(builder):
+        yield builder.to_arrow()
+
+
+async def to_arrow(records, questions: list, batch_size: int = COLUMNAR_BATCH_SIZE):
+    """
+    Convert report records to an Arrow table with one row per response.
+
+    Arguments:
+        records (iterable or async iterable): Report records or Task objects, e.g. `Report.stream_json(project_id)`.
+        questions (list): Question objects of the project.
+
+    Returns:
+        table (pyarrow.Table)
+    """
+    _require_pyarrow()
+    batches = [
+        batch async for batch in iter_arrow_batches(records, questions, batch_size)
+    ]
+    return pa.Table.from_batches(batches, schema=arrow_schema(questions))
+
+
+async def write_parquet(
+    records,
+    questions: list,
+    path: str,
+    batch_size: int = COLUMNAR_BATCH_SIZE,
+    compression: str = "snappy",
+):
+    """
+    Stream report records into a Parquet file, one row group per batch.
+
+    Arguments:
+        records (iterable or async iterable): Report records or Task objects, e.g. `Report.stream_json(project_id)`.
+        questions (list): Question objects of the project.
+        path (str): Location of the Parquet file.
+        batch_size (int): Number of responses per row group.
+        compression (str): Parquet compression codec.
+
+    Returns:
+        rows (int): number of responses written.
+    """
+    _require_pyarrow()
+    rows = 0
+    with pq.ParquetWriter(
+        path, arrow_schema(questions), compression=compression
+    ) as writer:
+        async for batch in iter_arrow_batches(records, questions, batch_size):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+async def to_numpy(records, questions: list, batch_size: int = COLUMNAR_BATCH_SIZE):
+    """
+    Convert report records to NumPy arrays, see `ColumnarBuilder.to_numpy`.
+
+    Arguments:
+        records (iterable or async iterable): Report records or Task objects, e.g. `Report.stream_json(project_id)`.
+        questions (list): Question objects of the project.
+
+    Returns:
+        arrays (dict): NumPy arrays keyed by column name, one row per response.
+    """
+    require_numpy("columnar export")
+    builder = ColumnarBuilder(questions)
+    parts = []
+    async for response in aiter_response_records(records):
+        builder.append(response)
+        if len(builder) >= batch_size:
+            # Compact the Python lists into arrays as we go
+            parts.append(builder.to_numpy())
+            builder.clear()
+    parts.append(builder.to_numpy())
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def _code_dtype(column: ColumnSpec):
+    return np.int16 if len(column.options) < np.iinfo(np.int16).max else np.int32
+
+
+def _selection_matrix(codes: list, num_options: int):
+    matrix = np.zeros((len(codes), num_options), dtype=bool)
+    rows = np.repeat(np.arange(len(codes)), [len(row) for row in codes])
+    matrix[rows, [code for row in codes for code in row]] = True
+    return matrix
+
+
+def _text(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
@@ -0,0 +1,380 @@
+import collections
+
+from aiosurge.columnar import schema_from_questions
+from aiosurge.records import aiter_response_records, answer_options
+from aiosurge.tree_selection import TREE_SEPARATOR, OptionTree
+
+
+class MajorityVote:
+
+    def __init__(self, break_ties: bool = True):
+        """
+        Resolves to the most common answer.
+
+        Arguments:
+            break_ties (bool): If True, a tie goes to the option listed first in the question.
+                If False, a tie resolves to None.
+        """
+        self.break_ties = break_ties
+
+    def __str__(self):
+        return f"<surge.{self.__class__.__name__}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def weight(self, worker_id):
+        return 1
+
+    def resolve(self, question, values: list, worker_ids: list):
+        scores = collections.Counter()
+        for value, worker_id in zip(values, worker_ids):
+            if value is not None and value != "":
+                scores[_hashable(value)] += self.weight(worker_id)
+        if not scores:
+            return None
+
+        best = max(scores.values())
+        winners = [value for value, score in scores.items() if score == best]
+        if len(winners) == 1:
+            return winners[0]
+        if not self.break_ties:
+            return None
+        order = {option: i for i, option in enumerate(_options(question))}
+        return min(winners, key=lambda value: order.get(value, len(order)))
+
+
+class WeightedVote(MajorityVote):
+
+    def __init__(
+        self, weights: dict, default_weight: float = 1, break_ties: bool = True
+    ):
+        """
+        Resolves to the answer with the highest total worker weight, e.g. weighted by gold standard accuracy.
+
+        Arguments:
+            weights (dict): worker ID -> weight.
+            default_weight (float): Weight of workers missing from `weights`.
+            break_ties (bool): If True, a tie goes to the option listed first in the question.
+        """
+        super().__init__(break_ties)
+        self.weights = weights
+        self.default_weight = default_weight
+
+    def weight(self, worker_id):
+        return self.weights.get(worker_id, self.default_weight)
+
+
+class OptionMajority:
+
+    def __init__(self, threshold: float = 0.5):
+        """
+        Resolves checkbox answers to the options selected by more than `threshold` of the responses.
+        """
+        self.threshold = threshold
+
+    def __str__(self):
+        return f"<surge.OptionMajority threshold={self.threshold}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def resolve(self, question, values: list, worker_ids: list):
+        if not values:
+            return None
+        selected = collections.Counter(
+            option for value in values for option in set(answer_options(value))
+        )
+        return [
+            option
+            for option in _options(question) or list(selected)
+            if selected[option] > self.threshold * len(values)
+        ]
+
+
+class LikertMean:
+
+    def __init__(self, round_to_option: bool = False):
+        """
+        Resolves Likert answers to the mean position on the scale, from 1 for the first option.
+
+        Arguments:
+            round_to_option (bool): If True, resolve to the option closest to the mean instead.
+        """
+        self.round_to_option = round_to_option
+
+    def __str__(self):
+        return f"<surge.LikertMean round_to_option={self.round_to_option}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def resolve(self, question, values: list, worker_ids: list):
+        options = _options(question)
+        positions = {option: i + 1 for i, option in enumerate(options)}
+        scores = [positions[value] for value in values if value in positions]
+        if not scores:
+            return None
+        mean = sum(scores) / len(scores)
+        if self.round_to_option:
+            # Halves round up, away from the first option
+            return options[int(mean + 0.5) - 1]
+        return mean
+
+
+class DeepestMajority:
+
+    def __init__(self, threshold: float = 0.5, separator: str = TREE_SEPARATOR):
+        """
+        Resolves tree selection answers to the deepest option or option prefix that more than `threshold`
+        of the responses are at or below, e.g. "1A" when workers agree on "1A" but not on "1A / 2A" or "1A / 2B".
+
+        Arguments:
+            threshold (float): Fraction of the responses that must agree on a node.
+            separator (str): Separator between the levels of an option.
+        """
+        self.threshold = threshold
+        self.separator = separator
+        # Trees of the questions resolved so far, keyed by their options
+        self._trees = {}
+
+    def __str__(self):
+        return f"<surge.DeepestMajority threshold={self.threshold}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def resolve(self, question, values: list, worker_ids: list):
+        options = tuple(_options(question))
+        tree = self._trees.get(options)
+        if tree is None:
+            tree = self._trees[options] = OptionTree(options, self.separator)
+
+        votes = collections.Counter()
+        num_answers = 0
+        for value in values:
+            if isinstance(value, list):
+                value = value[0] if value else None
+            node = tree.node_id(value) if value else -1
+            if node > 0:
+                num_answers += 1
+                votes.update(tree.path_ids(node))
+        accepted = [
+            node for node in votes if votes[node] > self.threshold * num_answers
+        ]
+        if not accepted:
+            return None
+        best = min(accepted, key=lambda node: (-tree.depths[node], -votes[node], node))
+        return tree.name(best)
+
+
+# Strategy used for each question type when none is given
+DEFAULT_STRATEGIES = {
+    "multiple_choice": MajorityVote(),
+    "tree_selection": MajorityVote(),
+    "likert": LikertMean(),
+    "checkbox": OptionMajority(),
+}
+
+
+class ResolvedTask:
+
+    def __init__(
+        self,
+        task_id: str,
+        answers: dict,
+        num_responses: int,
+        worker_ids: list,
+        complete: bool = True,
+        response_answers: dict = None,
+    ):
+        """
+        The resolved answers of a task.
+
+        Arguments:
+            task_id (str): ID of the task.
+            answers (dict): Resolved answer of each question, keyed by column name: the question's column
+                header if it has one, otherwise its label.
+            num_responses (int): Number of responses the answers were resolved from.
+            worker_ids (list): Workers who responded.
+            complete (bool): False if the task was flushed before all expected responses arrived.
+            response_answers (dict, optional): Answers of each response, keyed by column name like `answers`,
+                in the same order as `worker_ids`.
+        """
+        self.task_id = task_id
+        self.answers = answers
+        self.num_responses = num_responses
+        self.worker_ids = worker_ids
+        self.complete = complete
+        self.response_answers = response_answers or {}
+
+    def __str__(self):
+        return f'<surge.ResolvedTask task_id="{self.task_id}" num_responses={self.num_responses}>'
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class ConsensusAggregator:
+
+    def __init__(
+        self, questions: list, num_workers_per_task: int, strategies: dict = None
+    ):
+        """
+        Resolves one answer per task and question from a stream of responses.
+
+        Responses are buffered per task only until `num_workers_per_task` of them have arrived,
+        then the task is resolved and its state dropped, so memory depends on the number of
+        partially answered tasks rather than on the size of the results. Resolved tasks are not
+        remembered, so a late response to a task that was already resolved starts a new pending
+        entry, which is resolved again, as incomplete, by `flush()`.
+
+        Arguments:
+            questions (list): Question objects of the project.
+            num_workers_per_task (int): Number of responses expected for each task.
+            strategies (dict, optional): Strategy for some questions, keyed by question label, column name
+                (the question's column header, if it has one) or question type, in that order of precedence,
+                e.g. {"likert": LikertMean(round_to_option=True), "Sentiment": WeightedVote(weights)}.
+                Questions without a strategy use DEFAULT_STRATEGIES, and are skipped if their type has none.
+        """
+        if num_workers_per_task < 1:
+            raise ValueError("num_workers_per_task must be at least 1")
+        self.num_workers_per_task = num_workers_per_task
+        strategies = strategies or {}
+        self.columns = []
+        self.strategies = []
+        for column in schema_from_questions(questions):
+            type_ = getattr(column.question, "type", None)
+            strategy = (
+                strategies.get(getattr(column.question, "label", None))
+                or strategies.get(column.name)
+                or strategies.get(type_)
+                or DEFAULT_STRATEGIES.get(type_)
+            )
+            if strategy is not None:
+                self.columns.append(column)
+                self.strategies.append(strategy)
+        # task ID -> (worker IDs, answers to each column)
+        self._pending = {}
+
+    def __str__(self):
+        return f"<surge.ConsensusAggregator pending_tasks={len(self._pending)}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    @classmethod
+    def from_project(cls, project, strategies: dict = None):
+        """Creates an aggregator for the questions and `num_workers_per_task` of a project."""
+        return cls(
+            project.questions,
+            getattr(project, "num_workers_per_task", None) or 1,
+            strategies,
+        )
+
+    @property
+    def num_pending(self):
+        """Number of tasks still waiting for responses."""
+        return len(self._pending)
+
+    def add(self, response):
+        """
+        Add one ResponseRecord.
+
+        A response to a task that was already resolved is buffered as a new pending task.
+
+        Returns:
+            resolved (ResolvedTask or None): the task, if this was its last expected response.
+        """
+        worker_ids, values = self._pending.setdefault(
+            response.task_id, ([], [[] for _ in self.columns])
+        )
+        worker_ids.append(response.worker_id)
+        for column, column_values in zip(self.columns, values):
+            column_values.append(response.answer(column.question))
+
+        if len(worker_ids) >= self.num_workers_per_task:
+            return self._resolve(response.task_id, complete=True)
+        return None
+
+    def flush(self):
+        """
+        Resolve the tasks that are still waiting for responses, from the responses received so far.
+
+        Returns:
+            resolved (list): ResolvedTask objects with `complete` set to False.
+        """
+        return [
+            self._resolve(task_id, complete=False) for task_id in list(self._pending)
+        ]
+
+    def pending_responses(self):
+        """
+        Iterate over the tasks still waiting for responses, e.g. to save them.
+
+        Returns:
+            pending (iterator): (task ID, worker IDs, answers) tuples, where answers maps each column name
+                to the answers received so far, in the order of the worker IDs.
+        """
+        for task_id, (worker_ids, values) in self._pending.items():
+            answers = {
+                column.name: column_values
+                for column, column_values in zip(self.columns, values)
+            }
+            yield task_id, list(worker_ids), answers
+
+    def restore_pending(self, task_id: str, worker_ids: list, answers: dict):
+        """Restore a task returned by `pending_responses`. Columns missing from `answers` get None."""
+        self._pending[task_id] = (
+            list(worker_ids),
+            [
+                list(answers.get(column.name) or [None] * len(worker_ids))
+                for column in self.columns
+            ],
+        )
+
+    async def aggregate(self, records, flush: bool = True):
+        """
+        Resolve tasks as their responses arrive.
+
+        Arguments:
+            records (iterable or async iterable): Report records or Task objects, e.g. `Report.stream_json(project_id)`
+                or pages of `Task.list`.
+            flush (bool): Resolve the tasks with missing responses once `records` is exhausted.
+
+        Returns:
+            resolved (async iterator): ResolvedTask objects, in the order tasks received their last response.
+        """
+        async for response in aiter_response_records(records):
+            resolved = self.add(response)
+            if resolved is not None:
+                yield resolved
+        if flush:
+            for resolved in self.flush():
+                yield resolved
+
+    def _resolve(self, task_id, complete: bool):
+        worker_ids, values = self._pending.pop(task_id)
+        answers = {
+            column.name: strategy.resolve(column.question, column_values, worker_ids)
+            for column, strategy, column_values in zip(
+                self.columns, self.strategies, values
+            )
+        }
+        response_answers = {
+            column.name: column_values
+            for column, column_values in zip(self.columns, values)
+        }
+        return ResolvedTask(
+            task_id, answers, len(worker_ids), worker_ids, complete, response_answers
+        )
+
+
+def _options(question):
+    return list(getattr(question, "options", None) or [])
+
+
+def _hashable(value):
+    if isinstance(value, list):
+        return value[0] if len(value) == 1 else tuple(value)
+    return value
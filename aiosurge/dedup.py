@@ -0,0 +1,146 @@
+import hashlib
+import json
+import sqlite3
+
+from aiosurge.tasks import Task
+
+# SQLite limits the number of host parameters in a single statement
+_SQLITE_MAX_PARAMS = 500
+
+
+def task_fields_hash(fields: dict):
+    """
+    Returns a stable 16 byte digest of a task's fields.
+    The digest does not depend on key order, so {"a": 1, "b": 2} and {"b": 2, "a": 1} match.
+    """
+    encoded = json.dumps(
+        fields, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).digest()
+
+
+class TaskDedupIndex:
+
+    def __init__(self, project_id: str, path: str = None):
+        """
+        A persistent local index of the tasks already uploaded to a project, stored in SQLite.
+        Pass it to `Project.create_tasks(..., dedup_index=index)` to skip tasks whose fields were uploaded before.
+
+        Arguments:
+            project_id (str): ID of the project the index belongs to.
+            path (str, optional): Location of the index file. Defaults to "project_{project_id}_tasks.sqlite3".
+        """
+        self.project_id = project_id
+        self.path = path or f"project_{project_id}_tasks.sqlite3"
+        # Task.create_many queries the index from a worker thread
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS task_hashes "
+            "(hash BLOB PRIMARY KEY, task_id TEXT) WITHOUT ROWID"
+        )
+        self._connection.commit()
+
+    def __str__(self):
+        return (
+            f'<surge.TaskDedupIndex project_id="{self.project_id}" path="{self.path}">'
+        )
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        row = self._connection.execute("SELECT COUNT(*) FROM task_hashes").fetchone()
+        return row[0]
+
+    def __contains__(self, fields: dict):
+        row = self._connection.execute(
+            "SELECT 1 FROM task_hashes WHERE hash = ?", (task_fields_hash(fields),)
+        ).fetchone()
+        return row is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def filter_new(self, tasks_data: list):
+        """
+        Split task data into tasks that have not been uploaded yet and duplicates.
+        Repeats within `tasks_data` itself are also treated as duplicates.
+
+        Arguments:
+            tasks_data (list): list of dicts that map each task field to its value.
+
+        Returns:
+            (new_tasks, skipped): list of new task dicts, and the indexes of the skipped rows in `tasks_data`.
+        """
+        hashes = [task_fields_hash(fields) for fields in tasks_data]
+        known = self._known_hashes(hashes)
+
+        new_tasks = []
+        skipped = []
+        for i, (fields, digest) in enumerate(zip(tasks_data, hashes)):
+            if digest in known:
+                skipped.append(i)
+            else:
+                known.add(digest)
+                new_tasks.append(fields)
+        return new_tasks, skipped
+
+    def add(self, tasks_data: list, task_ids: list = None):
+        """
+        Record task data as uploaded.
+
+        Arguments:
+            tasks_data (list): list of dicts that map each task field to its value.
+            task_ids (list, optional): Surge task IDs, in the same order as `tasks_data`.
+        """
+        if task_ids is None:
+            task_ids = [None] * len(tasks_data)
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO task_hashes (hash, task_id) VALUES (?, ?)",
+            [
+                (task_fields_hash(fields), task_id)
+                for fields, task_id in zip(tasks_data, task_ids)
+            ],
+        )
+        self._connection.commit()
+
+    async def seed_from_project(self, per_page: int = 100, api_key: str = None):
+        """
+        Add every task that already exists in the project to the index, using `Task.list`.
+        Pages are read until an empty page is returned.
+
+        Returns:
+            count (int): number of tasks read from the project.
+        """
+        count = 0
+        page = 1
+        while True:
+            tasks = await Task.list(
+                self.project_id, page=page, per_page=per_page, api_key=api_key
+            )
+            if not tasks:
+                break
+            self.add(
+                [getattr(task, "fields", None) or {} for task in tasks],
+                [task.id for task in tasks],
+            )
+            count += len(tasks)
+            page += 1
+        return count
+
+    def _known_hashes(self, hashes: list):
+        known = set()
+        for i in range(0, len(hashes), _SQLITE_MAX_PARAMS):
+            chunk = hashes[i : i + _SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._connection.execute(
+                f"SELECT hash FROM task_hashes WHERE hash IN ({placeholders})", chunk
+            )
+            known.update(row[0] for row in rows)
+        return known
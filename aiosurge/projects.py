@@ -12,6 +12,7 @@ from aiosurge.api_resource import PROJECTS_ENDPOINT, APIResource
 from aiosurge.questions import Question
 from aiosurge.reports import Report
 from aiosurge.tasks import Task
+from aiosurge.validation import TaskDataValidator
 from aiosurge import utils
 
 
@@ -301,32 +302,95 @@ class Project(APIResource):
         """
         return await Task.list(self.id, page=page, per_page=per_page, api_key=api_key)
 
-    async def create_tasks(self, tasks_data: list, launch=False, api_key: str = None):
+    def validate_tasks_data(self, tasks_data: list, required_fields: list = None):
+        """
+        Checks task data against this project's fields_template before uploading it.
+
+        Arguments:
+            tasks_data (list): list of dicts that map each task field to its value
+            required_fields (list, optional): fields that must also be present and non-empty in every task.
+
+        Returns:
+            report (TaskDataValidationReport): offending row indexes, see `report.invalid_rows`.
+        """
+        validator = TaskDataValidator.from_project(
+            self, required_fields=required_fields
+        )
+        return validator.validate(tasks_data)
+
+    async def create_tasks(
+        self,
+        tasks_data: list,
+        launch=False,
+        api_key: str = None,
+        validate: bool = False,
+        required_fields: list = None,
+        dedup_index=None,
+        source_index=None,
+    ):
         """
         Creates new Task objects for this project.
 
         Arguments:
             tasks_data (list): list of dicts that map each task field to its value
                 e.g. [{"website": "surgehq.ai"}, {"website":"twitch.tv"}]
+            validate (bool, optional): Check the tasks against the project's fields_template first and
+                raise SurgeTaskDataError listing the invalid rows instead of uploading them.
+            required_fields (list, optional): Fields that must also be present and non-empty in every task
+                when `validate` is set.
+            dedup_index (TaskDedupIndex, optional): Skip tasks that were already uploaded to this project.
+            source_index (SourceKeyIndex, optional): Record the ID of the task created from each row.
 
         Returns:
             tasks (list): list of Task objects
         """
-        return await Task.create_many(self.id, tasks_data, launch, api_key=api_key)
+        if validate:
+            report = self.validate_tasks_data(tasks_data, required_fields)
+            report.raise_for_errors()
+        return await Task.create_many(
+            self.id,
+            tasks_data,
+            launch,
+            dedup_index=dedup_index,
+            source_index=source_index,
+            api_key=api_key,
+        )
 
-    async def create_tasks_from_csv(self, file_path: str, api_key: str = None):
+    async def create_tasks_from_csv(
+        self,
+        file_path: str,
+        api_key: str = None,
+        parallel: bool = False,
+        validate: bool = False,
+        required_fields: list = None,
+        dedup_index=None,
+        source_index=None,
+    ):
         """
         Creates new Task objects for this project from a local CSV file.
         The header of the CSV file must specify the fields that are used in your Tasks.
 
         Arguments:
             file_path (str): path to CSV file.
+            parallel (bool, optional): Parse the file in a process pool. Recommended for very large files.
+            validate (bool, optional): Check the tasks against the project's fields_template before uploading.
+            required_fields (list, optional): Fields that must also be present and non-empty in every task
+                when `validate` is set.
+            dedup_index (TaskDedupIndex, optional): Skip tasks that were already uploaded to this project.
+            source_index (SourceKeyIndex, optional): Record the ID of the task created from each row.
 
         Returns:
             tasks (list): list of Task objects
         """
-        tasks_data = await utils.load_tasks_data_from_csv(file_path)
-        return await self.create_tasks(tasks_data, api_key=api_key)
+        tasks_data = await utils.load_tasks_data_from_csv(file_path, parallel=parallel)
+        return await self.create_tasks(
+            tasks_data,
+            validate=validate,
+            required_fields=required_fields,
+            dedup_index=dedup_index,
+            source_index=source_index,
+            api_key=api_key,
+        )
 
     async def update(
         self,
@@ -420,11 +484,52 @@ class Project(APIResource):
             api_key=api_key,
         )
 
-    async def download_json(self, poll_time=5 * 60, api_key: str = None):
+    async def download_json(self, poll_time=5 * 60, cache=None, api_key: str = None):
         """
         Download and parse the results JSON for a project
 
         Arguments:
             poll_time (int): Number of seconds to poll for the report
+            cache (ReportCache, optional): Serve the report from this cache while the project is unchanged.
         """
+        if cache is not None:
+            return await cache.download_json(self, poll_time=poll_time, api_key=api_key)
         return await Report.download_json(self.id, poll_time=poll_time, api_key=api_key)
+
+    def stream_json(self, poll_time=5 * 60, api_key: str = None):
+        """
+        Download the results JSON for a project and yield one record at a time, in constant memory.
+
+        Arguments:
+            poll_time (int): Number of seconds to poll for the report
+
+        Returns:
+            results (async iterator): Dictionary of results for each response
+        """
+        return Report.stream_json(self.id, poll_time=poll_time, api_key=api_key)
+
+    def stream_csv(
+        self,
+        type: str = "export_csv",
+        as_dict: bool = True,
+        batch_size: int = None,
+        poll_time=5 * 60,
+        api_key: str = None,
+    ):
+        """
+        Download a CSV report for a project and yield its parsed rows as they arrive, without writing to disk.
+
+        Arguments:
+            type (string): One of `export_csv`, `export_csv_aggregated` or `export_csv_flattened`
+            as_dict (bool): Yield dicts keyed by the header row instead of lists of strings.
+            batch_size (int, optional): If set, yield lists of up to `batch_size` rows.
+            poll_time (int): Number of seconds to poll for the report
+        """
+        return Report.stream_csv(
+            self.id,
+            type=type,
+            as_dict=as_dict,
+            batch_size=batch_size,
+            poll_time=poll_time,
+            api_key=api_key,
+        )
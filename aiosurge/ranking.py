@@ -0,0 +1,306 @@
+import array
+import csv
+import json
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from aiosurge._helpers import as_int64, require_numpy
+from aiosurge.records import aiter_response_records
+
+# Number of responses compared at once when building pairwise matrices
+RANKING_BATCH_SIZE = 4096
+
+
+def decode_ranking(answer, options: list = None):
+    """
+    Returns the groups of a ranking answer, best first.
+
+    The answer may be a list of options, a list of groups of tied options, their serialized JSON,
+    or one group per line as in CSV exports, with the options of a group separated by commas.
+
+    Arguments:
+        answer: The answer.
+        options (list, optional): Options of the question. In the line format, commas are first matched
+            against these, so options containing commas are kept whole. Otherwise lines are read as CSV rows.
+
+    Returns:
+        groups (list): lists of options, one list per rank.
+    """
+    if answer is None or answer == "":
+        return []
+    if isinstance(answer, str):
+        try:
+            answer = json.loads(answer)
+        except ValueError:
+            options = set(options or ())
+            answer = [
+                _split_group(line, options)
+                for line in answer.split("\n")
+                if line.strip()
+            ]
+    if isinstance(answer, dict):
+        answer = answer.get("ranking") or answer.get("groups") or []
+    if not isinstance(answer, list):
+        return [[answer]]
+    return [group if isinstance(group, list) else [group] for group in answer]
+
+
+def _split_group(line: str, options: set):
+    # Match the longest runs of comma separated pieces that are options, else read the line as CSV
+    pieces = line.split(",")
+    group = []
+    i = 0
+    while options and i < len(pieces):
+        for j in range(len(pieces), i, -1):
+            option = ",".join(pieces[i:j]).strip()
+            if option in options:
+                group.append(option)
+                i = j
+                break
+        else:
+            break
+    if group and i == len(pieces):
+        return group
+    cells = next(csv.reader([line], skipinitialspace=True))
+    return [cell.strip() for cell in cells if cell.strip()]
+
+
+def ranks_from_groups(groups: list, options: list, allow_ties: bool = False):
+    """
+    Encode a ranking as the rank of each option, from 0 for the best. Rows of ranks are the inverse
+    of the permutation that sorts the options from best to worst.
+
+    Arguments:
+        groups (list): Groups of options, best first, see `decode_ranking`.
+        options (list): Options of the question. Options that were not ranked get NaN.
+        allow_ties (bool): If True, the options of a group share their mean position. If False,
+            as for questions without `allow_ranking_ties`, groups are read as consecutive ranks.
+
+    Returns:
+        ranks (list): one float per option.
+    """
+    positions = {option: i for i, option in enumerate(options)}
+    ranks = [float("nan")] * len(options)
+    position = 0
+    for group in groups:
+        group = [positions[option] for option in group if option in positions]
+        if allow_ties:
+            for i in group:
+                ranks[i] = position + (len(group) - 1) / 2
+            position += len(group)
+        else:
+            for i in group:
+                ranks[i] = position
+                position += 1
+    return ranks
+
+
+def _signs(ranks):
+    # sign(rank_j - rank_i) for every pair of options, 0 for ties and unranked options
+    with np.errstate(invalid="ignore"):
+        signs = np.sign(ranks[:, None, :] - ranks[:, :, None])
+    return np.nan_to_num(signs, nan=0.0)
+
+
+def _mean_pairwise_tau(ranks):
+    # ranks has shape (groups, responses, options). Returns the mean tau-b over the pairs of
+    # responses of each group, NaN for groups without a comparable pair.
+    num_groups, size, num_options = ranks.shape
+    signs = _signs(ranks.reshape(-1, num_options)).reshape(num_groups, size, -1)
+    ranked = ~np.isnan(ranks)
+    # Pairs of options ranked by each response: only pairs ranked by both responses are compared
+    pair_ranked = (ranked[..., :, None] & ranked[..., None, :]).reshape(
+        num_groups, size, -1
+    )
+    products = np.einsum("gpw,gqw->gpq", signs, signs)
+    # squares[g, p, q]: squared norm of response p over the pairs that response q ranks
+    squares = np.einsum("gpw,gqw->gpq", signs**2, pair_ranked.astype(np.float64))
+    norms = np.sqrt(squares * squares.transpose(0, 2, 1))
+
+    first, second = np.triu_indices(size, 1)
+    products = products[:, first, second]
+    norms = norms[:, first, second]
+    comparable = norms > 0
+    taus = np.divide(products, norms, out=np.zeros_like(products), where=comparable)
+    counts = comparable.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, taus.sum(axis=1) / counts, np.nan)
+
+
+def kendall_tau(a, b):
+    """
+    Kendall's tau-b between two rank vectors, see `ranks_from_groups`.
+    Only pairs of options ranked in both vectors are compared. Returns NaN if either ranking
+    has no strict preference among them.
+    """
+    require_numpy("ranking aggregates")
+    ranks = np.asarray([[a, b]], dtype=np.float64)
+    return float(_mean_pairwise_tau(ranks)[0])
+
+
+class RankingCollector:
+
+    def __init__(self, question, allow_ties: bool = None):
+        """
+        Encodes the answers to a RankingQuestion as rank vectors over its options, one response at a time,
+        and computes Borda counts, pairwise wins and Kendall's tau in bulk.
+
+        Arguments:
+            question (RankingQuestion): The question.
+            allow_ties (bool, optional): Whether tied groups share a rank. Defaults to the question's `allow_ranking_ties`.
+        """
+        self.question = question
+        self.options = list(getattr(question, "options", None) or [])
+        self.allow_ties = (
+            bool(getattr(question, "allow_ranking_ties", False))
+            if allow_ties is None
+            else allow_ties
+        )
+        self._task_codes = {}
+        self._tasks = array.array("q")
+        self._ranks = array.array("d")
+        self.worker_ids = []
+
+    def __str__(self):
+        return f"<surge.RankingCollector responses={len(self._tasks)}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        return len(self._tasks)
+
+    @property
+    def task_ids(self):
+        return list(self._task_codes)
+
+    def add(self, response):
+        """Add one ResponseRecord. Responses that rank none of the options are skipped."""
+        ranks = ranks_from_groups(
+            decode_ranking(response.answer(self.question), self.options),
+            self.options,
+            self.allow_ties,
+        )
+        if all(rank != rank for rank in ranks):
+            return
+        self._tasks.append(
+            self._task_codes.setdefault(response.task_id, len(self._task_codes))
+        )
+        self._ranks.extend(ranks)
+        self.worker_ids.append(response.worker_id)
+
+    def rank_matrix(self):
+        """Returns the ranks of every response, shape (responses, options), NaN for unranked options."""
+        require_numpy("ranking aggregates")
+        if not self._ranks:
+            return np.zeros((0, len(self.options)))
+        return np.frombuffer(self._ranks, dtype=np.float64).reshape(
+            -1, len(self.options)
+        )
+
+    def task_codes(self):
+        """Returns the row of each response in per task results, in the order of `task_ids`."""
+        require_numpy("ranking aggregates")
+        return as_int64(self._tasks)
+
+    def borda_counts(self, by_task: bool = False):
+        """
+        Borda count of each option: in a response ranking m options, an option ranked r gets m - 1 - r points.
+        Tied options share the mean of their points. Unranked options get none.
+
+        Returns:
+            counts (array): shape (options,), or (tasks, options) if `by_task`.
+        """
+        ranks = self.rank_matrix()
+        ranked = ~np.isnan(ranks)
+        points = np.where(ranked, ranked.sum(axis=1, keepdims=True) - 1 - ranks, 0)
+        if not by_task:
+            return points.sum(axis=0)
+        return self._sum_by_task(points)
+
+    def pairwise_wins(self, by_task: bool = False):
+        """
+        Number of responses ranking each option strictly above each other option.
+        Ties and unranked options count for neither.
+
+        Returns:
+            wins (array): shape (options, options), or (tasks, options, options) if `by_task`,
+                where wins[i, j] counts responses that prefer option i to option j.
+        """
+        ranks = self.rank_matrix()
+        num_options = len(self.options)
+        if by_task:
+            tasks = self.task_codes()
+            num_tasks = len(self._task_codes)
+            wins = np.zeros((num_tasks, num_options * num_options))
+            for i in range(0, len(ranks), RANKING_BATCH_SIZE):
+                batch = _signs(ranks[i : i + RANKING_BATCH_SIZE]) > 0
+                wins += _sum_rows(
+                    batch.reshape(len(batch), -1).astype(np.float64),
+                    tasks[i : i + RANKING_BATCH_SIZE],
+                    num_tasks,
+                )
+            return wins.reshape(num_tasks, num_options, num_options)
+        wins = np.zeros((num_options, num_options))
+        for i in range(0, len(ranks), RANKING_BATCH_SIZE):
+            wins += (_signs(ranks[i : i + RANKING_BATCH_SIZE]) > 0).sum(axis=0)
+        return wins
+
+    def kendall_tau(self):
+        """
+        Mean Kendall's tau-b between every pair of responses to each task, see `kendall_tau`.
+
+        Each pair is compared over the options both responses ranked, so workers may rank different
+        subsets. Tasks with the same number of responses are stacked and compared in one batch.
+
+        Returns:
+            taus (dict): mean tau keyed by task ID, NaN for tasks without a comparable pair of responses.
+        """
+        ranks = self.rank_matrix()
+        tasks = self.task_codes()
+        counts = np.bincount(tasks, minlength=len(self._task_codes))
+        # Rows of each task are contiguous in `order`, starting at `starts`
+        order = np.argsort(tasks, kind="stable")
+        starts = np.cumsum(counts) - counts
+        taus = np.full(len(counts), np.nan)
+        for size in np.unique(counts[counts > 1]):
+            same_size = np.flatnonzero(counts == size)
+            step = max(RANKING_BATCH_SIZE // size, 1)
+            for i in range(0, len(same_size), step):
+                batch = same_size[i : i + step]
+                rows = order[starts[batch, None] + np.arange(size)]
+                taus[batch] = _mean_pairwise_tau(ranks[rows])
+        return {task_id: float(tau) for task_id, tau in zip(self._task_codes, taus)}
+
+    def _sum_by_task(self, values):
+        return _sum_rows(values, self.task_codes(), len(self._task_codes))
+
+
+def _sum_rows(values, rows, num_rows: int):
+    # Sum the rows of `values` that share a row number, with a single bincount
+    width = values.shape[1]
+    cells = rows[:, None] * width + np.arange(width)
+    return np.bincount(
+        cells.ravel(), weights=values.ravel(), minlength=num_rows * width
+    ).reshape(num_rows, width)
+
+
+async def collect_rankings(records, question, allow_ties: bool = None):
+    """
+    Encode every response to a RankingQuestion.
+
+    Arguments:
+        records (iterable or async iterable): Report records or Task objects, e.g. `Report.stream_json(project_id)`.
+        question (RankingQuestion): The question.
+        allow_ties (bool, optional): Defaults to the question's `allow_ranking_ties`.
+
+    Returns:
+        collector (RankingCollector)
+    """
+    collector = RankingCollector(question, allow_ties)
+    async for response in aiter_response_records(records):
+        collector.add(response)
+    return collector
@@ -0,0 +1,182 @@
+from datetime import datetime, timezone
+
+import dateutil.parser
+
+from aiosurge._helpers import aiter
+
+# Keys of a report record that describe the task or response, not the answers
+RECORD_METADATA_KEYS = frozenset(
+    (
+        "id",
+        "task_id",
+        "response_id",
+        "worker_id",
+        "completed_at",
+        "created_at",
+        "project_id",
+        "fields",
+        "data",
+        "response",
+        "responses",
+        "is_gold_standard",
+        "gold_standards",
+    )
+)
+
+
+class ResponseRecord:
+
+    __slots__ = ("task_id", "response_id", "worker_id", "completed_at", "answers")
+
+    def __init__(
+        self,
+        task_id: str,
+        answers: dict,
+        response_id: str = None,
+        worker_id: str = None,
+        completed_at=None,
+    ):
+        """
+        One worker's response to a task, in the same shape whichever source it was read from.
+
+        Arguments:
+            task_id (str): ID of the task.
+            answers (dict): Answers of the response, keyed by question text, column header or label.
+            response_id (str, optional): ID of the response.
+            worker_id (str, optional): ID of the worker who submitted the response.
+            completed_at (datetime or str, optional): When the response was submitted.
+        """
+        self.task_id = task_id
+        self.answers = answers
+        self.response_id = response_id
+        self.worker_id = worker_id
+        self.completed_at = completed_at
+
+    def __str__(self):
+        return f'<surge.ResponseRecord task_id="{self.task_id}" worker_id="{self.worker_id}">'
+
+    def __repr__(self):
+        return self.__str__()
+
+    def answer(self, question, default=None):
+        """Returns the answer to `question`, see `question_answer`."""
+        return question_answer(self.answers, question, default)
+
+
+def record_task_id(record):
+    """Returns the task ID of a report record, a task dict or a Task object."""
+    if isinstance(record, dict):
+        return record.get("task_id", record.get("id"))
+    return getattr(record, "task_id", None) or getattr(record, "id", None)
+
+
+def question_keys(question):
+    """The keys an answer to `question` may be stored under, most specific first."""
+    keys = []
+    for key in (
+        getattr(question, "column_header", None),
+        getattr(question, "text", None),
+        getattr(question, "label", None),
+        getattr(question, "id", None),
+    ):
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def question_answer(answers: dict, question, default=None):
+    """
+    Returns the answer to `question` in a dict of answers.
+    Results are keyed by column header when one is set, and by question text otherwise.
+    """
+    for key in question_keys(question):
+        if key in answers:
+            return answers[key]
+    return default
+
+
+def answer_options(value):
+    """
+    Returns the options selected in an answer as a list of strings.
+    Checkbox answers may be a list, or a single newline separated string in CSV exports.
+    """
+    if value is None or value == "":
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(option) for option in value]
+    return str(value).split("\n")
+
+
+def parse_completed_at(value):
+    """Returns `completed_at` as a timezone aware datetime, or None."""
+    if value is None or value == "":
+        return None
+    if not isinstance(value, datetime):
+        value = dateutil.parser.isoparse(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def iter_response_records(records):
+    """
+    Yield a ResponseRecord for every response in `records`.
+
+    Arguments:
+        records (iterable): Task objects, task dicts with a `responses` list, or one dict per
+            response as found in `export_json` reports.
+    """
+    for record in records:
+        yield from _record_responses(record)
+
+
+async def aiter_response_records(records):
+    """Same as `iter_response_records`, for iterables or async iterables such as `Report.stream_json`."""
+    async for record in aiter(records):
+        for response in _record_responses(record):
+            yield response
+
+
+def _record_responses(record):
+    if isinstance(record, ResponseRecord):
+        yield record
+        return
+
+    if not isinstance(record, dict):
+        # A Task object
+        for response in getattr(record, "responses", None) or []:
+            yield ResponseRecord(
+                record.id,
+                response.data,
+                response_id=response.id,
+                worker_id=getattr(response, "worker_id", None),
+                completed_at=response.completed_at,
+            )
+        return
+
+    task_id = record_task_id(record)
+    if isinstance(record.get("responses"), list):
+        for response in record["responses"]:
+            yield ResponseRecord(
+                task_id,
+                _record_answers(response),
+                response_id=response.get("id", response.get("response_id")),
+                worker_id=response.get("worker_id"),
+                completed_at=response.get("completed_at"),
+            )
+        return
+
+    yield ResponseRecord(
+        task_id,
+        _record_answers(record),
+        response_id=record.get("response_id"),
+        worker_id=record.get("worker_id"),
+        completed_at=record.get("completed_at"),
+    )
+
+
+def _record_answers(record: dict):
+    for key in ("data", "response"):
+        if isinstance(record.get(key), dict):
+            return record[key]
+    return {k: v for k, v in record.items() if k not in RECORD_METADATA_KEYS}
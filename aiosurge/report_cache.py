@@ -0,0 +1,193 @@
+import hashlib
+import os
+
+import aiofiles
+
+from aiosurge.errors import SurgeMissingAttributeError
+from aiosurge.projects import Project
+from aiosurge.reports import Report
+from aiosurge import utils
+
+REPORT_CACHE_DIRECTORY = os.path.join(
+    os.path.expanduser("~"), ".cache", "aiosurge", "reports"
+)
+REPORT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Project attributes that change whenever the results of a project change
+FRESHNESS_ATTRIBUTES = (
+    "status",
+    "num_tasks",
+    "num_tasks_completed",
+    "num_responses_completed",
+)
+
+
+class ReportCache:
+
+    def __init__(self, directory: str = None, max_bytes: int = REPORT_CACHE_MAX_BYTES):
+        """
+        On-disk cache of project reports, keyed by project, report type and the project's freshness.
+
+        Reports are stored gzip compressed, exactly as downloaded. The project is retrieved before
+        each fetch, and a cached report is served as long as its freshness attributes (`status`,
+        task and response counts) are unchanged. The least recently used reports are evicted once
+        the cache grows past `max_bytes`.
+
+        Arguments:
+            directory (str, optional): Where reports are stored. Defaults to ~/.cache/aiosurge/reports.
+            max_bytes (int): Maximum total size of the cached reports.
+        """
+        self.directory = directory or REPORT_CACHE_DIRECTORY
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __str__(self):
+        return f'<surge.ReportCache directory="{self.directory}">'
+
+    def __repr__(self):
+        return self.__str__()
+
+    @staticmethod
+    def freshness(project: Project):
+        """
+        Returns a key that changes whenever the project's results may have changed.
+        Raises SurgeMissingAttributeError if the project has none of FRESHNESS_ATTRIBUTES,
+        since its cached report could never be detected as stale.
+        """
+        values = [
+            f"{attr}={getattr(project, attr)}"
+            for attr in FRESHNESS_ATTRIBUTES
+            if hasattr(project, attr)
+        ]
+        if not values:
+            raise SurgeMissingAttributeError(
+                "Project has none of {}, so a cached report cannot be checked for freshness.".format(
+                    ", ".join(FRESHNESS_ATTRIBUTES)
+                )
+            )
+        return hashlib.sha1("&".join(values).encode("utf-8")).hexdigest()[:16]
+
+    def path(self, project: Project, type: str = "export_json"):
+        """Location of the cached report for the current state of the project."""
+        return os.path.join(
+            self.directory, project.id, f"{type}-{self.freshness(project)}.gz"
+        )
+
+    async def fetch(
+        self,
+        project: Project,
+        type: str = "export_json",
+        refresh: bool = True,
+        poll_time=5 * 60,
+        api_key: str = None,
+    ):
+        """
+        Returns the path to the gzip compressed report, downloading it only if the cached copy is stale.
+
+        Arguments:
+            project (Project): The project.
+            type (str): Report type, e.g. `export_json` or `export_csv`
+            refresh (bool): Retrieve the project first, so the freshness check uses its current state.
+                If False, the attributes of `project` are trusted, and the cached report is served
+                even if the project changed since it was retrieved.
+            poll_time (int): Number of seconds to poll for the report
+
+        Returns:
+            path (str): location of the cached gzip file.
+        """
+        if refresh:
+            project = await Project.retrieve(project.id, api_key=api_key)
+
+        path = self.path(project, type)
+        if os.path.exists(path):
+            # Mark the report as recently used
+            os.utime(path)
+            return path
+
+        url = await Report._wait_for_report_url(project.id, type, poll_time, api_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.part"
+        try:
+            async with aiofiles.open(tmp_path, "wb") as file:
+                async for chunk in Report._iter_compressed_chunks(
+                    url,
+                    refresh_url=Report._url_refresher(
+                        project.id, type, poll_time, api_key
+                    ),
+                ):
+                    await file.write(chunk)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+
+        # Older versions of the same report are stale now
+        self._remove(project.id, type, keep=path)
+        self._evict(keep=path)
+        return path
+
+    async def stream_json(self, project: Project, **kwargs):
+        """
+        Yield the records of the project's `export_json` report one at a time, from the cache when it is valid.
+        Accepts the same keyword arguments as `fetch`.
+        """
+        path = await self.fetch(project, "export_json", **kwargs)
+        async for record in utils.iter_json_array(
+            utils.decompress_gzip_stream(utils.iter_file_chunks(path))
+        ):
+            yield record
+
+    async def download_json(self, project: Project, **kwargs):
+        """
+        Returns the parsed `export_json` report of the project, from the cache when it is valid.
+        Accepts the same keyword arguments as `fetch`.
+        """
+        return [record async for record in self.stream_json(project, **kwargs)]
+
+    def invalidate(self, project_id: str, type: str = None):
+        """
+        Remove the cached reports of a project.
+
+        Arguments:
+            project_id (str): ID of project.
+            type (str, optional): Only remove reports of this type.
+        """
+        self._remove(project_id, type)
+
+    def size(self):
+        """Total size in bytes of the cached reports."""
+        return sum(os.path.getsize(path) for path in self._cached_paths())
+
+    def _cached_paths(self):
+        for project_id in os.listdir(self.directory):
+            project_directory = os.path.join(self.directory, project_id)
+            if not os.path.isdir(project_directory):
+                continue
+            for name in os.listdir(project_directory):
+                if name.endswith(".gz"):
+                    yield os.path.join(project_directory, name)
+
+    def _remove(self, project_id: str, type: str = None, keep: str = None):
+        project_directory = os.path.join(self.directory, project_id)
+        if not os.path.isdir(project_directory):
+            return
+        for name in os.listdir(project_directory):
+            path = os.path.join(project_directory, name)
+            if path == keep or not name.endswith(".gz"):
+                continue
+            if type is None or name.rsplit("-", 1)[0] == type:
+                os.remove(path)
+
+    def _evict(self, keep: str = None):
+        entries = sorted(
+            (os.stat(path).st_mtime, os.path.getsize(path), path)
+            for path in self._cached_paths()
+        )
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                os.remove(path)
+                total -= size
@@ -0,0 +1,275 @@
+import asyncio
+import heapq
+import itertools
+
+import httpx
+
+from aiosurge.bulk import RateLimiter
+from aiosurge.reports import (
+    REPORT_PENDING_STATUSES,
+    REPORT_POLL_BACKOFF_FACTOR,
+    REPORT_POLL_INITIAL_DELAY,
+    REPORT_POLL_MAX_DELAY,
+    REPORT_READY_STATUSES,
+    Report,
+)
+
+
+class ReportJob:
+
+    PENDING = "PENDING"
+    GENERATING = "GENERATING"
+    DOWNLOADING = "DOWNLOADING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+    def __init__(self, project_id: str, type: str = "export_json", filepath=None):
+        """
+        A report to download with a ReportManager.
+
+        Arguments:
+            project_id (str): UUID of project to get data for
+            type (str): Report type, e.g. `export_json` or `export_csv`
+            filepath (string or IO or None): Location to save the results file. If not specified, will save to
+                "project_{project_id}_results.{csv/json}"
+        """
+        self.project_id = project_id
+        self.type = type
+        self.filepath = filepath or Report._default_filepath(project_id, type)
+        self.status = self.PENDING
+        self.job_id = None
+        self.error = None
+        self.bytes_downloaded = 0
+
+    def __str__(self):
+        return (
+            f'<surge.ReportJob project_id="{self.project_id}" '
+            f'type="{self.type}" status="{self.status}">'
+        )
+
+    def __repr__(self):
+        return self.__str__()
+
+    @property
+    def ok(self):
+        return self.status == self.COMPLETED
+
+
+class ReportManagerProgress:
+
+    def __init__(self, jobs: list):
+        self._jobs = jobs
+
+    def __str__(self):
+        counts = " ".join(f"{k.lower()}={v}" for k, v in self.counts.items())
+        return f"<surge.ReportManagerProgress {counts}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    @property
+    def counts(self):
+        counts = {
+            status: 0
+            for status in (
+                ReportJob.PENDING,
+                ReportJob.GENERATING,
+                ReportJob.DOWNLOADING,
+                ReportJob.COMPLETED,
+                ReportJob.FAILED,
+            )
+        }
+        for job in self._jobs:
+            counts[job.status] += 1
+        return counts
+
+    @property
+    def bytes_downloaded(self):
+        return sum(job.bytes_downloaded for job in self._jobs)
+
+
+class ReportManager:
+
+    def __init__(
+        self,
+        max_concurrent_requests: int = 10,
+        max_concurrent_downloads: int = 4,
+        max_bytes_per_second: float = None,
+        poll_time=5 * 60,
+        poll_initial_delay: float = REPORT_POLL_INITIAL_DELAY,
+        poll_max_delay: float = REPORT_POLL_MAX_DELAY,
+        on_progress=None,
+        api_key: str = None,
+    ):
+        """
+        Generates and downloads reports for many projects at once.
+
+        Report requests and status checks for every job go through one scheduler, which polls
+        each job with exponential backoff. Downloads share one pooled HTTP client and are limited
+        by a global concurrency and bandwidth budget.
+
+        Arguments:
+            max_concurrent_requests (int): Maximum number of report/status API calls in flight.
+            max_concurrent_downloads (int): Maximum number of reports downloading at once.
+            max_bytes_per_second (float, optional): Bandwidth budget shared by all downloads.
+            poll_time (int): Number of seconds to wait for the reports to be generated.
+            poll_initial_delay (float): Seconds before the first status check of a job.
+            poll_max_delay (float): Maximum seconds between two status checks of a job.
+            on_progress (callable, optional): Called with (job, ReportManagerProgress) whenever a job changes status.
+        """
+        self.max_concurrent_requests = max_concurrent_requests
+        self.max_concurrent_downloads = max_concurrent_downloads
+        self.max_bytes_per_second = max_bytes_per_second
+        self.poll_time = poll_time
+        self.poll_initial_delay = poll_initial_delay
+        self.poll_max_delay = poll_max_delay
+        self.on_progress = on_progress
+        self.api_key = api_key
+        self._client = None
+
+    async def __aenter__(self):
+        self._client = self._create_client()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._client.aclose()
+        self._client = None
+
+    def _create_client(self):
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_concurrent_downloads,
+                max_keepalive_connections=self.max_concurrent_downloads,
+            )
+        )
+
+    async def run(self, jobs):
+        """
+        Generate and download every report.
+
+        Arguments:
+            jobs (list): ReportJob objects, or (project_id, type, filepath) tuples.
+
+        Returns:
+            jobs (list): ReportJob objects in the same order, with their final `status`, `error` and `bytes_downloaded`.
+        """
+        jobs = [job if isinstance(job, ReportJob) else ReportJob(*job) for job in jobs]
+        if self._client is None:
+            async with self:
+                return await self._run(jobs)
+        return await self._run(jobs)
+
+    async def _run(self, jobs: list):
+        loop = asyncio.get_running_loop()
+        progress = ReportManagerProgress(jobs)
+        request_semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        download_semaphore = asyncio.Semaphore(self.max_concurrent_downloads)
+        bandwidth_limiter = (
+            RateLimiter(self.max_bytes_per_second)
+            if self.max_bytes_per_second
+            else None
+        )
+        deadline = loop.time() + self.poll_time
+        # (time of next status check, tie breaker, job, delay that led to this check)
+        schedule = []
+        counter = itertools.count()
+        downloads = []
+
+        def set_status(job, status, error=None):
+            job.status = status
+            job.error = error
+            if self.on_progress is not None:
+                self.on_progress(job, progress)
+
+        async def download(job, url):
+            async with download_semaphore:
+                set_status(job, ReportJob.DOWNLOADING)
+
+                def on_bytes(size):
+                    job.bytes_downloaded += size
+
+                try:
+                    await Report._download(
+                        url,
+                        job.filepath,
+                        client=self._client,
+                        bandwidth_limiter=bandwidth_limiter,
+                        on_bytes=on_bytes,
+                        refresh_url=Report._url_refresher(
+                            job.project_id, job.type, self.poll_time, self.api_key
+                        ),
+                    )
+                except Exception as err:
+                    set_status(job, ReportJob.FAILED, err)
+                else:
+                    set_status(job, ReportJob.COMPLETED)
+
+        def handle(job, response, delay):
+            if response.status in REPORT_READY_STATUSES:
+                downloads.append(asyncio.ensure_future(download(job, response.url)))
+            elif response.status in REPORT_PENDING_STATUSES:
+                job.job_id = getattr(response, "job_id", None) or job.job_id
+                if job.status != ReportJob.GENERATING:
+                    set_status(job, ReportJob.GENERATING)
+                heapq.heappush(
+                    schedule, (loop.time() + delay, next(counter), job, delay)
+                )
+            else:
+                set_status(
+                    job,
+                    ReportJob.FAILED,
+                    ValueError(
+                        "Report failed to generate with status {}".format(
+                            response.status
+                        )
+                    ),
+                )
+
+        async def check(job, delay):
+            async with request_semaphore:
+                try:
+                    if job.job_id is None:
+                        response = await Report.request(
+                            job.project_id, job.type, api_key=self.api_key
+                        )
+                    else:
+                        response = await Report.status(
+                            job.project_id, job.job_id, api_key=self.api_key
+                        )
+                except Exception as err:
+                    set_status(job, ReportJob.FAILED, err)
+                    return
+            handle(job, response, delay)
+
+        try:
+            await asyncio.gather(*(check(job, self.poll_initial_delay) for job in jobs))
+
+            # Single scheduler: sleep until the next status check is due, then run every due check
+            while schedule:
+                now = loop.time()
+                if now >= deadline:
+                    message = "Report failed to generate within {poll_time} seconds"
+                    for _, _, job, _ in schedule:
+                        error = Exception(message.format(poll_time=self.poll_time))
+                        set_status(job, ReportJob.FAILED, error)
+                    schedule.clear()
+                    break
+                if schedule[0][0] > now:
+                    await asyncio.sleep(min(schedule[0][0], deadline) - now)
+                    continue
+
+                due = []
+                while schedule and schedule[0][0] <= now:
+                    _, _, job, delay = heapq.heappop(schedule)
+                    next_delay = min(
+                        delay * REPORT_POLL_BACKOFF_FACTOR, self.poll_max_delay
+                    )
+                    due.append(check(job, next_delay))
+                await asyncio.gather(*due)
+
+            await asyncio.gather(*downloads)
+        finally:
+            for future in downloads:
+                future.cancel()
+
+        return jobs
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import aiofiles
+
+from aiosurge._helpers import aiter
+from aiosurge.records import record_task_id
+from aiosurge.reports import CSV_REPORT_TYPES, Report
+
+# Index file layout: a header, then fixed size entries sorted by key digest
+INDEX_MAGIC = b"SRS1"
+INDEX_HEADER = struct.Struct("<4sQ")
+# (task id digest, offset of the record in the data file, length of the record)
+INDEX_ENTRY = struct.Struct("<16sQI")
+INDEX_SUFFIX = ".idx"
+# Encoded records are written once this many bytes are buffered
+REPORT_STORE_WRITE_BUFFER_SIZE = 256 * 1024
+
+
+def _key_digest(task_id):
+    return hashlib.blake2b(str(task_id).encode("utf-8"), digest_size=16).digest()
+
+
+class ReportStore:
+
+    def __init__(self, path: str):
+        """
+        Read only access to a saved report, one task at a time, without loading the report.
+
+        A store is a JSON lines data file with one record per line, plus an index file mapping
+        the digest of each task ID to the byte ranges of its records. Both files are memory
+        mapped, so a lookup is a binary search over the index and one JSON parse per record.
+        Create a store with `ReportStore.build` or `ReportStore.from_report`.
+
+        Arguments:
+            path (str): Location of the data file. The index is stored next to it, with an ".idx" suffix.
+        """
+        self.path = path
+        self._data_file = open(path, "rb")
+        self._index_file = open(path + INDEX_SUFFIX, "rb")
+        # Empty files cannot be memory mapped
+        self._data = _mmap(self._data_file)
+        self._index = _mmap(self._index_file)
+
+        if self._index is None or self._index[: len(INDEX_MAGIC)] != INDEX_MAGIC:
+            self.close()
+            raise ValueError(f"{path}{INDEX_SUFFIX} is not a report store index")
+        _, self._count = INDEX_HEADER.unpack_from(self._index, 0)
+
+    def __str__(self):
+        return f'<surge.ReportStore path="{self.path}" records={self._count}>'
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        """Number of records in the store."""
+        return self._count
+
+    def __contains__(self, task_id):
+        position = self._search(_key_digest(task_id))
+        return position < self._count and self._digest(position) == _key_digest(task_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        for resource in (self._data, self._index, self._data_file, self._index_file):
+            if resource is not None:
+                resource.close()
+
+    def get_raw(self, task_id):
+        """
+        Returns the encoded records of a task, in report order, without parsing them.
+
+        Returns:
+            records (list): bytes of each JSON record. Empty if the task is not in the store.
+        """
+        digest = _key_digest(task_id)
+        records = []
+        position = self._search(digest)
+        while position < self._count:
+            entry_digest, offset, length = INDEX_ENTRY.unpack_from(
+                self._index, INDEX_HEADER.size + position * INDEX_ENTRY.size
+            )
+            if entry_digest != digest:
+                break
+            records.append(self._data[offset : offset + length])
+            position += 1
+        return records
+
+    def get(self, task_id):
+        """
+        Returns the records of a task, in report order.
+
+        Returns:
+            records (list): dict for each record of the task. Empty if the task is not in the store.
+        """
+        return [json.loads(record) for record in self.get_raw(task_id)]
+
+    def __iter__(self):
+        """Iterate over every record, in report order."""
+        start = 0
+        data = self._data
+        while data is not None and start < len(data):
+            end = data.find(b"\n", start)
+            yield json.loads(data[start:end])
+            start = end + 1
+
+    def _digest(self, position: int):
+        offset = INDEX_HEADER.size + position * INDEX_ENTRY.size
+        return self._index[offset : offset + 16]
+
+    def _search(self, digest: bytes):
+        # First entry whose digest is not less than `digest`
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._digest(middle) < digest:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    @classmethod
+    async def build(
+        cls,
+        records,
+        path: str,
+        key=None,
+        buffer_size: int = REPORT_STORE_WRITE_BUFFER_SIZE,
+    ):
+        """
+        Write report records to a store in one streaming pass, and open it.
+
+        Arguments:
+            records (iterable or async iterable): dicts, e.g. `Report.stream_json(project_id)` or `Report.stream_csv(project_id)`.
+            path (str): Location of the data file. The index is written to `path` + ".idx".
+            key (callable, optional): Returns the task ID of a record. Defaults to its `task_id` or `id`.
+            buffer_size (int): Number of encoded bytes to buffer between writes.
+
+        Returns:
+            store (ReportStore)
+        """
+        key = key or record_task_id
+        entries = []
+        offset = 0
+        buffer = []
+        buffered = 0
+        data_path = f"{path}.part"
+        try:
+            async with aiofiles.open(data_path, "wb") as file:
+                async for record in aiter(records):
+                    encoded = json.dumps(record, ensure_ascii=False).encode("utf-8")
+                    entries.append((_key_digest(key(record)), offset, len(encoded)))
+                    offset += len(encoded) + 1
+                    buffer.append(encoded)
+                    buffered += len(encoded) + 1
+                    if buffered >= buffer_size:
+                        await file.write(b"\n".join(buffer) + b"\n")
+                        buffer = []
+                        buffered = 0
+                if buffer:
+                    await file.write(b"\n".join(buffer) + b"\n")
+
+            # Sorting keeps the records of a task in report order, as offsets increase
+            entries.sort()
+            index_path = f"{path}{INDEX_SUFFIX}.part"
+            async with aiofiles.open(index_path, "wb") as file:
+                await file.write(INDEX_HEADER.pack(INDEX_MAGIC, len(entries)))
+                await file.write(b"".join(INDEX_ENTRY.pack(*e) for e in entries))
+        except BaseException:
+            for part in (data_path, f"{path}{INDEX_SUFFIX}.part"):
+                if os.path.exists(part):
+                    os.remove(part)
+            raise
+
+        os.replace(data_path, path)
+        os.replace(index_path, path + INDEX_SUFFIX)
+        return cls(path)
+
+    @classmethod
+    async def from_report(
+        cls,
+        project_id: str,
+        path: str,
+        type: str = "export_json",
+        poll_time=5 * 60,
+        api_key: str = None,
+    ):
+        """
+        Download a report and save it as a store, without holding the report in memory.
+
+        Arguments:
+            project_id (string): UUID of project to get data for
+            path (str): Location of the data file.
+            type (string): `export_json`, or one of the CSV report types
+            poll_time (int): Number of seconds to poll for the report
+
+        Returns:
+            store (ReportStore)
+        """
+        if type in CSV_REPORT_TYPES:
+            records = Report.stream_csv(
+                project_id, type, poll_time=poll_time, api_key=api_key
+            )
+        else:
+            records = Report.stream_json(
+                project_id, poll_time=poll_time, api_key=api_key
+            )
+        return await cls.build(records, path)
+
+
+def _mmap(file):
+    if os.fstat(file.fileno()).st_size == 0:
+        return None
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
@@ -1,7 +1,5 @@
-import gzip
 import asyncio
 import urllib
-import tempfile
 import shutil
 import io
 import json
@@ -10,6 +8,31 @@ import aiofiles
 import httpx
 
 from aiosurge.api_resource import REPORTS_ENDPOINT, APIResource
+from aiosurge.errors import SurgeRequestError
+from aiosurge import utils
+
+CSV_REPORT_TYPES = ("export_csv", "export_csv_aggregated", "export_csv_flattened")
+
+# `request` returns READY/CREATING, `status` returns COMPLETED/IN_PROGRESS/RETRYING/ERROR
+REPORT_READY_STATUSES = ("READY", "COMPLETED")
+REPORT_PENDING_STATUSES = ("CREATING", "IN_PROGRESS", "RETRYING")
+
+# Delays in seconds between report status checks
+REPORT_POLL_INITIAL_DELAY = 1
+REPORT_POLL_MAX_DELAY = 30
+REPORT_POLL_BACKOFF_FACTOR = 2
+
+# Interrupted report downloads are resumed from the last byte received
+REPORT_DOWNLOAD_MAX_RETRIES = 5
+REPORT_DOWNLOAD_RETRY_DELAY = 1
+# Presigned report URLs answer with one of these once they have expired
+REPORT_URL_EXPIRED_STATUS_CODES = (403,)
+
+
+def _content_range_total(http_response):
+    # Total size from a "bytes 0-99/1000" or "bytes */1000" Content-Range header, or None
+    total = http_response.headers.get("Content-Range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
 
 
 class Report(APIResource):
@@ -49,55 +72,228 @@ class Report(APIResource):
             filepath (string or IO or None): Location to save the results file. If not specified, will save to "project_{project_id}_results.{csv/json}
             poll_time (int): Number of seconds to poll for the report
         """
-        for _ in range(poll_time // 2):
-            response = await cls.request(
-                project_id=project_id, type=type, api_key=api_key
-            )
-
-            # Download zipped project results if ready
-            if response.status == "READY":
-                file_ext = "csv" if "csv" in type else "json"
-                default_file_name = (
-                    "project_{project_id}_results.{file_ext}.gzip".format(
-                        project_id=project_id, file_ext=file_ext
-                    )
-                )
-
-                async with httpx.AsyncClient() as client:
-                    async with client.stream("GET", response.url) as http_response:
-                        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-                            async for chunk in http_response.aiter_bytes():
-                                tmp_file.write(chunk)
-                            tmp_file.flush()
-                            tmp_file_path = tmp_file.name
-
-                with gzip.open(tmp_file_path, "r") as gz_file:
-                    data = gz_file.read()
-
-                filepath = filepath or default_file_name.rstrip(".gzip")
-                if isinstance(filepath, str):
-                    async with aiofiles.open(filepath, "wb") as file:
-                        await file.write(data)
-                else:
-                    filepath.write(data)
+        url = await cls._wait_for_report_url(project_id, type, poll_time, api_key)
+        filepath = filepath or cls._default_filepath(project_id, type)
+        await cls._download(
+            url,
+            filepath,
+            refresh_url=cls._url_refresher(project_id, type, poll_time, api_key),
+        )
 
-                return
+    @staticmethod
+    def _default_filepath(project_id: str, type: str):
+        file_ext = "csv" if "csv" in type else "json"
+        default_file_name = "project_{project_id}_results.{file_ext}.gzip".format(
+            project_id=project_id, file_ext=file_ext
+        )
+        return default_file_name.rstrip(".gzip")
 
-            # Wait two seconds before polling again
-            elif response.status == "CREATING":
-                await asyncio.sleep(2)
-                continue
-            else:
+    @classmethod
+    async def _wait_for_report_url(
+        cls, project_id: str, type: str, poll_time: int, api_key: str = None
+    ):
+        # Request the report once, then poll the status of its job until the report is generated
+        response = await cls.request(project_id=project_id, type=type, api_key=api_key)
+        job_id = getattr(response, "job_id", None)
+
+        waited = 0
+        delay = REPORT_POLL_INITIAL_DELAY
+        while True:
+            if response.status in REPORT_READY_STATUSES:
+                return response.url
+            elif response.status not in REPORT_PENDING_STATUSES:
                 raise ValueError(
                     "Report failed to generate with status {}".format(response.status)
                 )
 
+            # Back off exponentially, without sleeping past the deadline
+            remaining = poll_time - waited
+            if remaining <= 0:
+                break
+            delay = min(delay, remaining)
+            await asyncio.sleep(delay)
+            waited += delay
+            delay = min(delay * REPORT_POLL_BACKOFF_FACTOR, REPORT_POLL_MAX_DELAY)
+
+            if job_id is None:
+                response = await cls.request(
+                    project_id=project_id, type=type, api_key=api_key
+                )
+            else:
+                response = await cls.status(project_id, job_id, api_key=api_key)
+            # The job id changes when the report generation is retried
+            job_id = getattr(response, "job_id", None) or job_id
+
         raise Exception(
             "Report failed to generate within {poll_time} seconds".format(
                 poll_time=poll_time
             )
         )
 
+    @classmethod
+    def _url_refresher(
+        cls, project_id: str, type: str, poll_time: int, api_key: str = None
+    ):
+        # Requesting a report that is already generated returns a new presigned URL
+        async def refresh_url():
+            return await cls._wait_for_report_url(project_id, type, poll_time, api_key)
+
+        return refresh_url
+
+    @classmethod
+    async def _download(
+        cls,
+        url: str,
+        filepath,
+        client: httpx.AsyncClient = None,
+        bandwidth_limiter=None,
+        on_bytes=None,
+        refresh_url=None,
+    ):
+        # Decompress the report as it arrives and write it straight to its destination
+        chunks = cls._iter_report_chunks(
+            url,
+            client=client,
+            bandwidth_limiter=bandwidth_limiter,
+            on_bytes=on_bytes,
+            refresh_url=refresh_url,
+        )
+        if isinstance(filepath, str):
+            async with aiofiles.open(filepath, "wb") as file:
+                async for chunk in chunks:
+                    await file.write(chunk)
+        else:
+            async for chunk in chunks:
+                filepath.write(chunk)
+
+    @classmethod
+    def _iter_report_chunks(
+        cls,
+        url: str,
+        client: httpx.AsyncClient = None,
+        bandwidth_limiter=None,
+        on_bytes=None,
+        refresh_url=None,
+    ):
+        return utils.decompress_gzip_stream(
+            cls._iter_compressed_chunks(
+                url,
+                client=client,
+                bandwidth_limiter=bandwidth_limiter,
+                on_bytes=on_bytes,
+                refresh_url=refresh_url,
+            )
+        )
+
+    @classmethod
+    async def _iter_compressed_chunks(
+        cls,
+        url: str,
+        client: httpx.AsyncClient = None,
+        bandwidth_limiter=None,
+        on_bytes=None,
+        refresh_url=None,
+        max_retries: int = REPORT_DOWNLOAD_MAX_RETRIES,
+    ):
+        """
+        Stream the gzip compressed report from its presigned URL.
+
+        If the connection drops, the download is resumed from the last byte received with a
+        `Range` request. If the presigned URL has expired, a new one is fetched with `refresh_url`.
+        The retry count and backoff are reset whenever a retry receives new bytes.
+
+        Arguments:
+            client (httpx.AsyncClient, optional): Client to reuse. A new one is created and closed otherwise.
+            bandwidth_limiter (RateLimiter, optional): Shared limit, in bytes per second.
+            on_bytes (callable, optional): Called with the size of each compressed chunk received.
+            refresh_url (coroutine function, optional): Returns a new presigned URL for the same report.
+            max_retries (int): Maximum number of consecutive times the download is resumed or the URL
+                refreshed without receiving any bytes.
+        """
+        if client is None:
+            async with httpx.AsyncClient() as client:
+                async for chunk in cls._iter_compressed_chunks(
+                    url, client, bandwidth_limiter, on_bytes, refresh_url, max_retries
+                ):
+                    yield chunk
+            return
+
+        received = 0
+        # Size of the whole report, once known
+        total = None
+        etag = None
+        retries = 0
+        delay = REPORT_DOWNLOAD_RETRY_DELAY
+        while True:
+            received_before = received
+            headers = {}
+            if received:
+                headers["Range"] = f"bytes={received}-"
+                if etag is not None:
+                    # The server sends the whole report instead if it changed since
+                    headers["If-Range"] = etag
+            try:
+                async with client.stream(
+                    "GET", url, **({"headers": headers} if headers else {})
+                ) as http_response:
+                    if (
+                        http_response.status_code in REPORT_URL_EXPIRED_STATUS_CODES
+                        and refresh_url is not None
+                        and retries < max_retries
+                    ):
+                        retries += 1
+                        url = await refresh_url()
+                        continue
+                    if http_response.status_code == 416 and received:
+                        total = _content_range_total(http_response) or total
+                        if received == total:
+                            # Everything was received before the connection dropped
+                            return
+                    http_response.raise_for_status()
+
+                    skip = 0
+                    if received and http_response.status_code != 206:
+                        if etag is not None and (
+                            http_response.headers.get("ETag") != etag
+                        ):
+                            raise SurgeRequestError(
+                                "Report changed while it was being downloaded."
+                            )
+                        # Range is not supported, drop the part already received
+                        skip = received
+                    elif not received:
+                        etag = http_response.headers.get("ETag")
+                    if http_response.status_code == 206:
+                        total = _content_range_total(http_response) or total
+                    elif "Content-Length" in http_response.headers:
+                        total = int(http_response.headers["Content-Length"])
+
+                    async for chunk in http_response.aiter_bytes():
+                        if skip:
+                            if len(chunk) <= skip:
+                                skip -= len(chunk)
+                                continue
+                            chunk = chunk[skip:]
+                            skip = 0
+                        if bandwidth_limiter is not None:
+                            await bandwidth_limiter.acquire(len(chunk))
+                        if on_bytes is not None:
+                            on_bytes(len(chunk))
+                        received += len(chunk)
+                        yield chunk
+                return
+            except (httpx.TransportError, httpx.StreamError) as err:
+                if received > received_before:
+                    retries = 0
+                    delay = REPORT_DOWNLOAD_RETRY_DELAY
+                if retries >= max_retries:
+                    raise SurgeRequestError(
+                        f"Report download failed after {retries} retries: {err!r}"
+                    ) from err
+                retries += 1
+                await asyncio.sleep(delay)
+                delay *= 2
+
     @classmethod
     async def download_json(
         cls, project_id: str, poll_time=5 * 60, api_key: str = None
@@ -120,11 +316,88 @@ class Report(APIResource):
             poll_time=poll_time,
             api_key=api_key,
         )
-        bytesio.seek(0)
-        return json.load(bytesio)
+        return await utils.run_in_decode_executor(json.loads, bytesio.getvalue())
 
     @classmethod
-    def request(cls, project_id: str, type: str, api_key: str = None):
+    async def stream_json(cls, project_id: str, poll_time=5 * 60, api_key: str = None):
+        """
+        Download the results JSON for a project and parse it incrementally, one record at a time.
+        Unlike `download_json`, neither the raw report nor the full list of results is held in memory.
+
+        Arguments:
+            project_id (string): UUID of project to get data for
+            poll_time (int): Number of seconds to poll for the report
+
+        Returns:
+            results (async iterator): Dictionary of results for each response
+        """
+        url = await cls._wait_for_report_url(
+            project_id, "export_json", poll_time, api_key
+        )
+        chunks = cls._iter_report_chunks(
+            url,
+            refresh_url=cls._url_refresher(
+                project_id, "export_json", poll_time, api_key
+            ),
+        )
+        async for record in utils.iter_json_array(chunks):
+            yield record
+
+    @classmethod
+    async def stream_csv(
+        cls,
+        project_id: str,
+        type: str = "export_csv",
+        as_dict: bool = True,
+        batch_size: int = None,
+        poll_time=5 * 60,
+        api_key: str = None,
+    ):
+        """
+        Download a CSV report for a project and yield its parsed rows as they arrive, without writing to disk.
+
+        Arguments:
+            project_id (string): UUID of project to get data for
+            type (string): Must be one of these types:
+              * `export_csv`
+              * `export_csv_aggregated`
+              * `export_csv_flattened`
+            as_dict (bool): If True, the header row is used as keys and each row is yielded as a dict.
+                If False, each row is yielded as a list of strings, starting with the header row.
+            batch_size (int, optional): If set, yield lists of up to `batch_size` rows instead of single rows.
+            poll_time (int): Number of seconds to poll for the report
+
+        Returns:
+            rows (async iterator): rows, or batches of rows if `batch_size` is set
+        """
+        if type not in CSV_REPORT_TYPES:
+            raise ValueError(
+                "type must be one of {}".format(", ".join(CSV_REPORT_TYPES))
+            )
+
+        url = await cls._wait_for_report_url(project_id, type, poll_time, api_key)
+        chunks = cls._iter_report_chunks(
+            url, refresh_url=cls._url_refresher(project_id, type, poll_time, api_key)
+        )
+        rows = utils.iter_csv_rows(chunks)
+        if as_dict:
+            rows = _rows_as_dicts(rows)
+        if batch_size is None:
+            async for row in rows:
+                yield row
+            return
+
+        batch = []
+        async for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @classmethod
+    async def request(cls, project_id: str, type: str, api_key: str = None):
         """
         Request creation of a report for the given type. Note that reports are generated
         asychronously so the response may include a `job_id` which needs to be used with
@@ -165,11 +438,11 @@ class Report(APIResource):
         """
         endpoint = f"{REPORTS_ENDPOINT}/{project_id}/report"
         params = {"report_type": type}
-        response_json = cls.post(endpoint, params, api_key=api_key)
+        response_json = await cls.post(endpoint, params, api_key=api_key)
         return cls(**response_json)
 
     @classmethod
-    def status(cls, project_id: str, job_id: str, api_key: str = None):
+    async def status(cls, project_id: str, job_id: str, api_key: str = None):
         """
         Checks the status of a given report job. The response will be of one of these shapes:
 
@@ -210,5 +483,14 @@ class Report(APIResource):
         """
         endpoint = f"{REPORTS_ENDPOINT}/{project_id}/report_status"
         params = {"job_id": job_id}
-        response_json = cls.get(endpoint, params, api_key=api_key)
+        response_json = await cls.get(endpoint, params, api_key=api_key)
         return cls(**response_json)
+
+
+async def _rows_as_dicts(rows):
+    headers = None
+    async for row in rows:
+        if headers is None:
+            headers = row
+            continue
+        yield dict(zip(headers, row))
@@ -0,0 +1,254 @@
+import sqlite3
+
+from aiosurge._helpers import aiter
+from aiosurge.dedup import task_fields_hash
+from aiosurge.records import iter_response_records, record_task_id
+
+# Key of the task level fingerprint in saved fingerprints
+_TASK_KEY = ""
+
+
+class SnapshotDiff:
+
+    def __init__(self):
+        """
+        Differences between two report snapshots. Tasks are identified by ID, and responses by
+        (task ID, response key), where the key is the response ID, or the worker ID if there is none.
+        Responses with neither are keyed by their position among the responses of their task, e.g. "#1".
+        """
+        self.added_tasks = []
+        self.removed_tasks = []
+        self.changed_tasks = []
+        self.added_responses = []
+        self.removed_responses = []
+        self.changed_responses = []
+
+    def __str__(self):
+        return (
+            f"<surge.SnapshotDiff tasks=+{len(self.added_tasks)}/-{len(self.removed_tasks)}"
+            f"/~{len(self.changed_tasks)} responses=+{len(self.added_responses)}"
+            f"/-{len(self.removed_responses)}/~{len(self.changed_responses)}>"
+        )
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __bool__(self):
+        return bool(
+            self.added_tasks
+            or self.removed_tasks
+            or self.changed_tasks
+            or self.added_responses
+            or self.removed_responses
+            or self.changed_responses
+        )
+
+
+class SnapshotFingerprint:
+
+    def __init__(self):
+        """
+        Digests of every task and response of a report snapshot, without the snapshot itself.
+
+        Each task keeps a 16 byte digest of its own fields and one per response, so memory grows with
+        the number of tasks and responses, not with the size of the answers. Build it while streaming
+        a report with `SnapshotFingerprint.build`, save it, and diff the next snapshot against it.
+        """
+        # task ID -> [digest of the task fields or None, {response key: digest}]
+        self._tasks = {}
+
+    def __str__(self):
+        return f"<surge.SnapshotFingerprint tasks={len(self._tasks)}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __contains__(self, task_id):
+        return task_id in self._tasks
+
+    def add(self, record):
+        """
+        Add a report record, task dict or Task object.
+
+        Returns:
+            fingerprint ((task_id, task digest, {response key: digest})): the digests of this record alone.
+        """
+        task_id = record_task_id(record)
+        entry = self._tasks.setdefault(task_id, [None, {}])
+        task_digest, responses = _record_fingerprint(record, len(entry[1]))
+        if task_digest is not None:
+            entry[0] = task_digest
+        entry[1].update(responses)
+        return task_id, task_digest, responses
+
+    def diff(self, newer: "SnapshotFingerprint"):
+        """
+        Returns the SnapshotDiff from this snapshot to `newer`.
+        A task is changed if its fields changed, or if any of its responses were added, removed or changed.
+        """
+        diff = SnapshotDiff()
+        for task_id, (task_digest, responses) in newer._tasks.items():
+            old = self._tasks.get(task_id)
+            if old is None:
+                diff.added_tasks.append(task_id)
+                diff.added_responses.extend((task_id, key) for key in responses)
+                continue
+
+            old_digest, old_responses = old
+            changed = task_digest != old_digest
+            for key, digest in responses.items():
+                old_response = old_responses.get(key)
+                if old_response is None:
+                    diff.added_responses.append((task_id, key))
+                    changed = True
+                elif old_response != digest:
+                    diff.changed_responses.append((task_id, key))
+                    changed = True
+            for key in old_responses.keys() - responses.keys():
+                diff.removed_responses.append((task_id, key))
+                changed = True
+            if changed:
+                diff.changed_tasks.append(task_id)
+
+        for task_id, (_, old_responses) in self._tasks.items():
+            if task_id not in newer._tasks:
+                diff.removed_tasks.append(task_id)
+                diff.removed_responses.extend((task_id, key) for key in old_responses)
+        return diff
+
+    def is_changed(self, record, position: int = 0):
+        """
+        Whether a record of a newer snapshot has a new or changed task or response compared to this snapshot.
+
+        Arguments:
+            record: Report record, task dict or Task object.
+            position (int): Number of responses of the same task in earlier records of the newer snapshot.
+                Used to key responses without an ID or worker ID, see `iter_changed_records`.
+        """
+        entry = self._tasks.get(record_task_id(record))
+        if entry is None:
+            return True
+        task_digest, responses = _record_fingerprint(record, position)
+        if task_digest is not None and task_digest != entry[0]:
+            return True
+        if _has_all_responses(record) and responses.keys() != entry[1].keys():
+            return True
+        return any(entry[1].get(key) != digest for key, digest in responses.items())
+
+    @classmethod
+    async def build(cls, records):
+        """
+        Fingerprint a snapshot in one streaming pass.
+
+        Arguments:
+            records (iterable or async iterable): Report records or Task objects, e.g. `Report.stream_json(project_id)`.
+        """
+        fingerprint = cls()
+        async for record in aiter(records):
+            fingerprint.add(record)
+        return fingerprint
+
+    def save(self, path: str):
+        """Save the fingerprint to a SQLite file."""
+        connection = sqlite3.connect(path)
+        try:
+            connection.executescript(
+                "DROP TABLE IF EXISTS fingerprints;"
+                "CREATE TABLE fingerprints (task_id TEXT, response_key TEXT, digest BLOB,"
+                " PRIMARY KEY (task_id, response_key)) WITHOUT ROWID;"
+            )
+            connection.executemany(
+                "INSERT INTO fingerprints VALUES (?, ?, ?)",
+                self._rows(),
+            )
+            connection.commit()
+        finally:
+            connection.close()
+
+    @classmethod
+    def load(cls, path: str):
+        """Load a fingerprint saved with `save`."""
+        fingerprint = cls()
+        connection = sqlite3.connect(path)
+        try:
+            rows = connection.execute("SELECT * FROM fingerprints")
+            for task_id, response_key, digest in rows:
+                entry = fingerprint._tasks.setdefault(task_id, [None, {}])
+                if response_key == _TASK_KEY:
+                    entry[0] = digest
+                else:
+                    entry[1][response_key] = digest
+        finally:
+            connection.close()
+        return fingerprint
+
+    def _rows(self):
+        for task_id, (task_digest, responses) in self._tasks.items():
+            if task_digest is not None:
+                yield task_id, _TASK_KEY, task_digest
+            for key, digest in responses.items():
+                yield task_id, key, digest
+
+
+async def iter_changed_records(
+    previous: SnapshotFingerprint, records, fingerprint=None
+):
+    """
+    Yield only the records of a new snapshot that were added or changed since `previous`.
+
+    Arguments:
+        previous (SnapshotFingerprint): Fingerprint of the last snapshot.
+        records (iterable or async iterable): Report records or Task objects of the new snapshot.
+        fingerprint (SnapshotFingerprint, optional): Filled with the fingerprint of the new snapshot as
+            records are read, to save for the next diff and to find removed tasks with `previous.diff(fingerprint)`.
+
+    Returns:
+        records (async iterator)
+    """
+    # Number of responses of each task read so far, to key responses without an ID like `add`
+    positions = {}
+    async for record in aiter(records):
+        if fingerprint is not None:
+            fingerprint.add(record)
+        task_id = record_task_id(record)
+        position = positions.get(task_id, 0)
+        if previous.is_changed(record, position):
+            yield record
+        positions[task_id] = position + sum(1 for _ in iter_response_records([record]))
+
+
+def _has_all_responses(record):
+    # Task dicts and Task objects carry every response of the task, report records a single one
+    return not isinstance(record, dict) or isinstance(record.get("responses"), list)
+
+
+def _record_fingerprint(record, num_responses: int):
+    # Digest of the task fields, if the record has them, and of each of its responses
+    if isinstance(record, dict):
+        if isinstance(record.get("responses"), list):
+            task_digest = task_fields_hash(
+                {k: v for k, v in record.items() if k != "responses"}
+            )
+        elif "fields" in record:
+            task_digest = task_fields_hash(record["fields"])
+        else:
+            task_digest = None
+    else:
+        task_digest = task_fields_hash(getattr(record, "fields", None) or {})
+
+    responses = {}
+    for response in iter_response_records([record]):
+        key = response.response_id or response.worker_id
+        if key is None:
+            key = f"#{num_responses + len(responses)}"
+        responses[key] = task_fields_hash(
+            {
+                "answers": response.answers,
+                "worker_id": response.worker_id,
+                "completed_at": response.completed_at,
+            }
+        )
+    return task_digest, responses
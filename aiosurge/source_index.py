@@ -0,0 +1,177 @@
+import json
+import sqlite3
+
+from aiosurge import utils
+from aiosurge._helpers import aiter
+from aiosurge.dedup import task_fields_hash
+from aiosurge.records import record_task_id
+
+JOIN_TYPES = ("inner", "left")
+
+
+class SourceKeyIndex:
+
+    def __init__(self, path: str, key=None):
+        """
+        A persistent mapping from the key of each source row to the ID of the Surge task created from it, stored in SQLite.
+        Pass it to `Project.create_tasks(..., source_index=index)` or `create_tasks_from_csv` to record the
+        tasks as they are created, then use `join_source_rows` to match results back to the source rows.
+
+        Arguments:
+            path (str): Location of the index file.
+            key (str, list or callable, optional): How to compute the key of a row: the name of a column, a list
+                of column names, or a function of the row dict. Defaults to a digest of the whole row.
+        """
+        self.path = path
+        self.key = key
+        # Task.create_many updates the index from a worker thread
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS source_keys "
+            "(source_key TEXT PRIMARY KEY, task_id TEXT) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS source_keys_task_id ON source_keys (task_id);"
+        )
+        self._connection.commit()
+
+    def __str__(self):
+        return f'<surge.SourceKeyIndex path="{self.path}">'
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        row = self._connection.execute("SELECT COUNT(*) FROM source_keys").fetchone()
+        return row[0]
+
+    def __contains__(self, source_key):
+        return self.task_id(source_key) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def row_key(self, row: dict):
+        """Returns the key of a source row, as stored in the index."""
+        if self.key is None:
+            return task_fields_hash(row).hex()
+        if callable(self.key):
+            key = self.key(row)
+        elif isinstance(self.key, (list, tuple)):
+            key = [row.get(name) for name in self.key]
+        else:
+            key = row.get(self.key)
+        return key if isinstance(key, str) else json.dumps(key, default=str)
+
+    def row_keys(self, tasks_data: list):
+        """
+        Returns the key of each row, checking that every row has a key and that no two rows share one,
+        so each task created from them can be recorded unambiguously.
+        Raises ValueError otherwise.
+        """
+        keys = []
+        for i, row in enumerate(tasks_data):
+            if isinstance(self.key, str):
+                missing = self.key not in row
+            elif isinstance(self.key, (list, tuple)):
+                missing = any(name not in row for name in self.key)
+            else:
+                missing = False
+            key = None if missing else self.row_key(row)
+            if key is None or key == "null":
+                raise ValueError(f"Row {i} has no source key")
+            keys.append(key)
+        if len(set(keys)) != len(keys):
+            raise ValueError("Rows must have unique source keys")
+        return keys
+
+    def add(self, tasks_data: list, task_ids: list):
+        """
+        Record the tasks created from source rows. A row key that is already in the index is mapped to the new task.
+
+        Arguments:
+            tasks_data (list): list of dicts that map each task field to its value.
+            task_ids (list): Surge task IDs, in the same order as `tasks_data`.
+        """
+        if len(tasks_data) != len(task_ids):
+            raise ValueError("tasks_data and task_ids must have the same length")
+        self.add_keys([self.row_key(row) for row in tasks_data], task_ids)
+
+    def add_keys(self, source_keys: list, task_ids: list):
+        """Record the task created from each source key, in the same order."""
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO source_keys (source_key, task_id) VALUES (?, ?)",
+            zip(source_keys, task_ids),
+        )
+        self._connection.commit()
+
+    def task_id(self, source_key):
+        """Returns the ID of the task created from the row with this key, or None."""
+        row = self._connection.execute(
+            "SELECT task_id FROM source_keys WHERE source_key = ?", (source_key,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def source_key(self, task_id: str):
+        """Returns the key of the row a task was created from, or None."""
+        row = self._connection.execute(
+            "SELECT source_key FROM source_keys WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def items(self):
+        """Iterate over (source key, task ID) pairs in one sequential scan."""
+        return self._connection.execute("SELECT source_key, task_id FROM source_keys")
+
+
+async def iter_source_rows_from_csv(file_path: str, encoding: str = "utf-8"):
+    """
+    Lazily read the rows of a task data CSV file as dicts keyed by the header, like `load_tasks_data_from_csv`:
+    blank rows are skipped and missing fields are None, so each row has the key of the task uploaded from it.
+    """
+    headers = None
+    async for row in utils.iter_csv_rows(utils.iter_file_chunks(file_path), encoding):
+        if headers is None:
+            headers = row
+        elif row:
+            yield utils.csv_row_to_dict(headers, row)
+
+
+async def join_source_rows(records, source_rows, index: SourceKeyIndex, how="inner"):
+    """
+    Match report records or Task objects with the source rows their tasks were created from.
+
+    The index is read once into a hash table, then the source rows and the records are each
+    streamed once, so the join takes linear time. Memory is linear too: the whole index, and every
+    source row that has a task, are held until the last record is matched.
+
+    Arguments:
+        records (iterable or async iterable): Report records or Task objects, e.g. `Report.stream_json(project_id)`.
+        source_rows (str, iterable or async iterable): Source row dicts, or the path of the CSV file they were read from.
+        index (SourceKeyIndex): Index filled when the tasks were created.
+        how (str): "inner" to skip records without a source row, "left" to yield them with None.
+
+    Returns:
+        pairs (async iterator): (record, source row) tuples, in the order of `records`.
+    """
+    if how not in JOIN_TYPES:
+        raise ValueError("how must be one of {}".format(", ".join(JOIN_TYPES)))
+    if isinstance(source_rows, str):
+        source_rows = iter_source_rows_from_csv(source_rows)
+
+    task_ids = dict(index.items())
+    rows_by_task = {}
+    async for row in aiter(source_rows):
+        task_id = task_ids.get(index.row_key(row))
+        if task_id is not None:
+            rows_by_task[task_id] = row
+    del task_ids
+
+    async for record in aiter(records):
+        row = rows_by_task.get(record_task_id(record))
+        if row is not None or how == "left":
+            yield record, row
@@ -0,0 +1,394 @@
+import array
+import json
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from aiosurge._helpers import as_int64, require_numpy
+from aiosurge.records import aiter_response_records
+
+SPAN_AGREEMENT_MODES = ("exact", "overlap")
+
+# Keys the text tagging tool may use for the parts of a span
+_SPAN_LIST_KEYS = ("spans", "tags", "annotations", "entities")
+_START_KEYS = ("start", "startOffset", "start_offset", "begin")
+_END_KEYS = ("end", "endOffset", "end_offset")
+_LABEL_KEYS = ("label", "tag", "type", "entity")
+
+
+def decode_spans(answer):
+    """
+    Returns the spans tagged in an answer to a TextTaggingQuestion.
+
+    The answer may be the serialized JSON of the text tagging tool or its parsed value: a list
+    of spans, or an object with the list under "spans", "tags", "annotations" or "entities".
+    A span with several labels, when overlapping tags are allowed, becomes one span per label.
+    Relationship tags and empty spans have no extent of their own and are skipped.
+
+    Returns:
+        spans (list): (start, end, label) tuples, with character offsets and `end` excluded.
+    """
+    if answer is None or answer == "":
+        return []
+    if isinstance(answer, (str, bytes)):
+        answer = json.loads(answer)
+    if isinstance(answer, dict):
+        answer = next(
+            (
+                answer[key]
+                for key in _SPAN_LIST_KEYS
+                if isinstance(answer.get(key), list)
+            ),
+            [],
+        )
+
+    spans = []
+    for item in answer:
+        if not isinstance(item, dict):
+            continue
+        start = _first(item, _START_KEYS)
+        end = _first(item, _END_KEYS)
+        if start is None or end is None or int(end) <= int(start):
+            continue
+        labels = item.get("labels")
+        if labels is None:
+            labels = [_first(item, _LABEL_KEYS)]
+        elif isinstance(labels, str):
+            labels = [labels]
+        for label in labels:
+            spans.append((int(start), int(end), label))
+    return spans
+
+
+def _first(item: dict, keys):
+    for key in keys:
+        if item.get(key) is not None:
+            return item[key]
+    return None
+
+
+class IntervalIndex:
+
+    def __init__(self, starts, ends, groups=None):
+        """
+        A static index of non-empty half-open intervals [start, end) for overlap queries.
+
+        Intervals are sorted by (group, start) next to the running maximum of their ends, so a query
+        is two binary searches plus a scan of the intervals that start before the query ends.
+        Intervals only overlap intervals of the same group, e.g. the same task.
+
+        Arguments:
+            starts (array): Start of each interval, non-negative integers.
+            ends (array): End of each interval, excluded.
+            groups (array, optional): Non-negative group of each interval.
+        """
+        require_numpy("span analysis")
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        groups = (
+            np.zeros(len(starts), dtype=np.int64)
+            if groups is None
+            else np.asarray(groups, dtype=np.int64)
+        )
+        # Each group gets its own range of positions, so one sorted array holds every group
+        self._stride = int(ends.max()) + 1 if len(ends) else 1
+        self._order = np.lexsort((starts, groups))
+        offsets = groups[self._order] * self._stride
+        self._starts = offsets + starts[self._order]
+        self._ends = offsets + ends[self._order]
+        # Positions only grow from one group to the next, so the running maximum never
+        # carries an end over into the next group
+        self._max_ends = np.maximum.accumulate(self._ends) if len(ends) else self._ends
+
+    def __str__(self):
+        return f"<surge.IntervalIndex intervals={len(self)}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        return len(self._order)
+
+    def group(self, group: int = 0):
+        """Returns the indexes of the intervals in `group`, ordered by start."""
+        base = group * self._stride
+        lo = np.searchsorted(self._starts, base, "left")
+        hi = np.searchsorted(self._starts, base + self._stride, "left")
+        return self._order[lo:hi]
+
+    def query(self, start: int, end: int, group: int = 0):
+        """Returns the indexes of the intervals of `group` that overlap [start, end)."""
+        base = group * self._stride
+        start = base + min(max(start, 0), self._stride)
+        end = base + min(max(end, 0), self._stride)
+        lo = np.searchsorted(self._max_ends, start, "right")
+        hi = np.searchsorted(self._starts, end, "left")
+        if hi <= lo:
+            return self._order[:0]
+        return self._order[lo:hi][self._ends[lo:hi] > start]
+
+    def overlapping_pairs(self):
+        """
+        Returns every pair of overlapping intervals in the same group, each pair once.
+
+        Returns:
+            (left, right): arrays of interval indexes, with `left` starting no later than `right`.
+        """
+        n = len(self)
+        # Interval i overlaps the intervals after it that start before it ends
+        following = np.arange(1, n + 1)
+        counts = np.maximum(
+            np.searchsorted(self._starts, self._ends, "left") - following, 0
+        )
+        left = np.repeat(np.arange(n), counts)
+        run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        right = np.arange(len(left)) - run_starts + np.repeat(following, counts)
+        return self._order[left], self._order[right]
+
+
+class SpanAgreement:
+
+    def __init__(self, f1: float, by_label: dict, num_tasks: int, num_spans: int):
+        """
+        Pairwise F1 agreement between the workers of each task, micro-averaged over tasks.
+
+        Arguments:
+            f1 (float): Agreement over every label, NaN if no task has two workers.
+            by_label (dict): Agreement on each label.
+            num_tasks (int): Number of tasks with at least two workers.
+            num_spans (int): Number of spans on those tasks.
+        """
+        self.f1 = f1
+        self.by_label = by_label
+        self.num_tasks = num_tasks
+        self.num_spans = num_spans
+
+    def __str__(self):
+        return f"<surge.SpanAgreement f1={self.f1:.3f} num_tasks={self.num_tasks}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class SpanTable:
+
+    def __init__(
+        self,
+        task,
+        worker,
+        start,
+        end,
+        label,
+        task_ids: list,
+        worker_ids: list,
+        labels: list,
+        response_task=None,
+        response_worker=None,
+    ):
+        """
+        Spans tagged in the responses to a TextTaggingQuestion, one row per span, as integer arrays.
+
+        Arguments:
+            task, worker, start, end, label (array): Columns of the table. `task`, `worker` and `label`
+                are positions in `task_ids`, `worker_ids` and `labels`.
+            task_ids (list): ID of each task.
+            worker_ids (list): ID of each worker.
+            labels (list): Tag of each label code, the question's options first.
+            response_task, response_worker (array, optional): Task and worker of every response,
+                including responses without spans. Defaults to the pairs found in the spans.
+        """
+        self.task = task
+        self.worker = worker
+        self.start = start
+        self.end = end
+        self.label = label
+        self.task_ids = task_ids
+        self.worker_ids = worker_ids
+        self.labels = labels
+        self.response_task = task if response_task is None else response_task
+        self.response_worker = worker if response_worker is None else response_worker
+        self._task_codes = {task_id: i for i, task_id in enumerate(task_ids)}
+        self._index = None
+
+    def __str__(self):
+        return f"<surge.SpanTable spans={len(self)} tasks={len(self.task_ids)}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def index(self):
+        """IntervalIndex of the spans, grouped by task. Built on first use."""
+        if self._index is None:
+            self._index = IntervalIndex(self.start, self.end, self.task)
+        return self._index
+
+    def for_task(self, task_id):
+        """Returns the row indexes of the spans of a task, ordered by start."""
+        code = self._task_codes.get(task_id)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        return self.index.group(code)
+
+    def overlaps(self, task_id, start: int, end: int):
+        """Returns the row indexes of the spans of a task that overlap [start, end)."""
+        code = self._task_codes.get(task_id)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        return self.index.query(start, end, code)
+
+    def agreement(self, mode: str = "exact"):
+        """
+        Span agreement between the workers of each task.
+
+        For every pair of workers on a task, F1 is the number of spans of either worker that the other
+        worker also tagged with the same label, divided by the number of spans of both. Sums over all
+        pairs and tasks are computed in bulk, without comparing workers pair by pair.
+
+        Arguments:
+            mode (str): "exact" if spans must have the same offsets, "overlap" if they only need to overlap.
+
+        Returns:
+            agreement (SpanAgreement)
+        """
+        if mode not in SPAN_AGREEMENT_MODES:
+            raise ValueError(
+                "mode must be one of {}".format(", ".join(SPAN_AGREEMENT_MODES))
+            )
+        num_labels = len(self.labels)
+        num_workers = max(len(self.worker_ids), 1)
+        # The same span tagged twice by a worker counts once
+        columns = [self.task, self.label, self.start, self.end, self.worker]
+        rows = np.unique(np.stack(columns, 1).astype(np.int64), axis=0)
+        task, label, start, end, worker = rows.T
+
+        responses = np.unique(
+            np.asarray(self.response_task, dtype=np.int64) * num_workers
+            + np.asarray(self.response_worker, dtype=np.int64)
+        )
+        workers_per_task = np.bincount(
+            responses // num_workers, minlength=len(self.task_ids)
+        )
+        # Each span is compared with the spans of every other worker on its task
+        others = np.maximum(workers_per_task[task] - 1, 0)
+
+        if mode == "exact":
+            _, inverse, counts = np.unique(
+                rows[:, :4], axis=0, return_inverse=True, return_counts=True
+            )
+            matched = counts[inverse.reshape(-1)] - 1
+        else:
+            index = IntervalIndex(start, end, task * max(num_labels, 1) + label)
+            left, right = index.overlapping_pairs()
+            different = worker[left] != worker[right]
+            left, right = left[different], right[different]
+            # A span is matched once per other worker with an overlapping span
+            matches = np.unique(
+                np.concatenate(
+                    [
+                        left * num_workers + worker[right],
+                        right * num_workers + worker[left],
+                    ]
+                )
+            )
+            matched = np.bincount(matches // num_workers, minlength=len(rows))
+
+        matched_by_label = np.bincount(label, weights=matched, minlength=num_labels)
+        total_by_label = np.bincount(label, weights=others, minlength=num_labels)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            f1_by_label = matched_by_label / total_by_label
+        total = total_by_label.sum()
+        return SpanAgreement(
+            float(matched_by_label.sum() / total) if total else float("nan"),
+            {name: float(f1) for name, f1 in zip(self.labels, f1_by_label)},
+            num_tasks=int((workers_per_task >= 2).sum()),
+            num_spans=int((others > 0).sum()),
+        )
+
+
+class SpanCollector:
+
+    def __init__(self, question):
+        """
+        Decodes the answers to a TextTaggingQuestion into spans, one response at a time.
+
+        Arguments:
+            question (TextTaggingQuestion): The question. Tags that are not among its options
+                get label codes after the options.
+        """
+        self.question = question
+        self.labels = list(getattr(question, "options", None) or [])
+        self._label_codes = {label: i for i, label in enumerate(self.labels)}
+        self._task_codes = {}
+        self._worker_codes = {}
+        self._columns = [array.array("q") for _ in range(5)]
+        self._response_task = array.array("q")
+        self._response_worker = array.array("q")
+
+    def __str__(self):
+        return f"<surge.SpanCollector spans={len(self._columns[0])}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def add(self, response):
+        """Add one ResponseRecord. Responses without an answer to the question are skipped."""
+        answer = response.answer(self.question)
+        if answer is None:
+            return
+        task = self._task_codes.setdefault(response.task_id, len(self._task_codes))
+        worker_id = (
+            response.worker_id
+            if response.worker_id is not None
+            else response.response_id
+        )
+        worker = self._worker_codes.setdefault(worker_id, len(self._worker_codes))
+        self._response_task.append(task)
+        self._response_worker.append(worker)
+
+        tasks, workers, starts, ends, labels = self._columns
+        for start, end, label in decode_spans(answer):
+            code = self._label_codes.get(label)
+            if code is None:
+                code = self._label_codes[label] = len(self.labels)
+                self.labels.append(label)
+            tasks.append(task)
+            workers.append(worker)
+            starts.append(start)
+            ends.append(end)
+            labels.append(code)
+
+    def table(self):
+        """Returns the spans collected so far as a SpanTable."""
+        require_numpy("span analysis")
+        # Copies, since the collector keeps appending to its arrays
+        return SpanTable(
+            *(as_int64(column, copy=True) for column in self._columns),
+            task_ids=list(self._task_codes),
+            worker_ids=list(self._worker_codes),
+            labels=list(self.labels),
+            response_task=as_int64(self._response_task, copy=True),
+            response_worker=as_int64(self._response_worker, copy=True),
+        )
+
+
+async def collect_spans(records, question):
+    """
+    Decode the spans of every response to a TextTaggingQuestion.
+
+    Arguments:
+        records (iterable or async iterable): Report records or Task objects, e.g. `Report.stream_json(project_id)`.
+        question (TextTaggingQuestion): The question.
+
+    Returns:
+        spans (SpanTable)
+    """
+    collector = SpanCollector(question)
+    async for response in aiter_response_records(records):
+        collector.add(response)
+    return collector.table()
@@ -1,8 +1,12 @@
+import asyncio
+
 import dateutil.parser
 
 from aiosurge.errors import SurgeMissingIDError, SurgeTaskDataError
 from aiosurge.api_resource import PROJECTS_ENDPOINT, TASKS_ENDPOINT, APIResource
+from aiosurge.bulk import BulkSummary, run_bulk
 from aiosurge.responses import TaskResponse
+from aiosurge import utils
 
 
 class Task(APIResource):
@@ -62,18 +66,85 @@ class Task(APIResource):
         """
         if self.id is None or self.project_id is None:
             raise SurgeMissingIDError
+
+        response_json = await self._post_gold_standard(
+            self.id,
+            gold_standard_answers,
+            is_gold_standard=is_gold_standard,
+            explanations=explanations,
+            api_key=api_key,
+        )
+        self.__dict__.update(response_json)
+        return self
+
+    @classmethod
+    async def set_gold_standards(
+        cls,
+        gold_standards: dict,
+        concurrency: int = 10,
+        rate_limit: float = None,
+        on_progress=None,
+        api_key: str = None,
+    ):
+        """
+        Set gold standard answers for many tasks, with bounded concurrency.
+
+        Arguments:
+            gold_standards (dict): Maps each task ID to either its list of gold standard answers, or to a dict
+                with the keys "answers", and optionally "explanations" and "is_gold_standard".
+                e.g. {"task-1": ["Yes"], "task-2": {"answers": ["No"], "explanations": ["Off topic"]}}
+            concurrency (int): Maximum number of requests in flight.
+            rate_limit (float or RateLimiter, optional): Maximum requests per second.
+            on_progress (callable, optional): Called with a BulkProgress after each task completes.
+
+        Returns:
+            results (dict): Maps each task ID to a BulkResult. `result.ok` is False and `result.error`
+                is set for tasks that failed.
+        """
+
+        async def set_one(item):
+            task_id, gold_standard = item
+            if not isinstance(gold_standard, dict):
+                gold_standard = {"answers": gold_standard}
+            return await cls._post_gold_standard(
+                task_id,
+                gold_standard.get("answers"),
+                is_gold_standard=gold_standard.get("is_gold_standard", True),
+                explanations=gold_standard.get("explanations"),
+                api_key=api_key,
+            )
+
+        results = {}
+        async for result in run_bulk(
+            gold_standards.items(),
+            set_one,
+            concurrency=concurrency,
+            rate_limit=rate_limit,
+            on_progress=on_progress,
+            total=len(gold_standards),
+        ):
+            results[result.item[0]] = result
+        return {task_id: results[task_id] for task_id in gold_standards}
+
+    @classmethod
+    async def _post_gold_standard(
+        cls,
+        task_id: str,
+        gold_standard_answers,
+        is_gold_standard=True,
+        explanations=None,
+        api_key: str = None,
+    ):
         if explanations is None:
             explanations = []
 
-        endpoint = f"{TASKS_ENDPOINT}/{self.id}/gold-standards"
+        endpoint = f"{TASKS_ENDPOINT}/{task_id}/gold-standards"
         data = {
             "is_gold_standard": is_gold_standard,
             "explanations": explanations,
             "answers": gold_standard_answers,
         }
-        response_json = await self.post(endpoint, data, api_key=api_key)
-        self.__dict__.update(response_json)
-        return self
+        return await cls.post(endpoint, data, api_key=api_key)
 
     async def create_response(self, answers, worker_id=None, api_key: str = None):
         """
@@ -85,9 +156,67 @@ class Task(APIResource):
         """
         if self.id is None or self.project_id is None:
             raise SurgeMissingIDError
-        endpoint = f"{TASKS_ENDPOINT}/{self.id}/create-response"
+        return await self._post_response(self.id, answers, worker_id, api_key=api_key)
+
+    @classmethod
+    async def create_responses(
+        cls,
+        responses,
+        concurrency: int = 10,
+        rate_limit: float = None,
+        on_progress=None,
+        api_key: str = None,
+    ):
+        """
+        Import many worker responses, with bounded concurrency.
+
+        Responses are read from the input only as requests complete, so arbitrarily long
+        iterators, async iterators and files are imported in constant memory.
+
+        Arguments:
+            responses (iterable, async iterable or str): (task_id, answers) or (task_id, answers, worker_id)
+                tuples, or dicts with the same keys. A string is treated as the path to a JSON lines file
+                with one such dict per line, see `utils.iter_responses_from_jsonl`.
+            concurrency (int): Maximum number of requests in flight.
+            rate_limit (float or RateLimiter, optional): Maximum requests per second.
+            on_progress (callable, optional): Called with a BulkProgress after each response completes.
+
+        Returns:
+            summary (BulkSummary): counts, and the failed items with their errors for retrying.
+        """
+        if isinstance(responses, str):
+            responses = utils.iter_responses_from_jsonl(responses)
+
+        async def create_one(item):
+            if isinstance(item, dict):
+                task_id = item["task_id"]
+                answers = item["answers"]
+                worker_id = item.get("worker_id")
+            else:
+                task_id, answers, *rest = item
+                worker_id = rest[0] if rest else None
+            return await cls._post_response(
+                task_id, answers, worker_id, api_key=api_key
+            )
+
+        summary = BulkSummary()
+        async for result in run_bulk(
+            responses,
+            create_one,
+            concurrency=concurrency,
+            rate_limit=rate_limit,
+            on_progress=on_progress,
+        ):
+            summary._update(result)
+        return summary
+
+    @classmethod
+    async def _post_response(
+        cls, task_id: str, answers, worker_id=None, api_key: str = None
+    ):
+        endpoint = f"{TASKS_ENDPOINT}/{task_id}/create-response"
         data = {"answers": answers, "worker_id": worker_id}
-        return await self.post(endpoint, data, api_key=api_key)
+        return await cls.post(endpoint, data, api_key=api_key)
 
     @classmethod
     async def create(cls, project_id: str, api_key: str = None, **params):
@@ -108,7 +237,13 @@ class Task(APIResource):
 
     @classmethod
     async def create_many(
-        cls, project_id: str, tasks_data: list, launch: bool, api_key: str = None
+        cls,
+        project_id: str,
+        tasks_data: list,
+        launch: bool,
+        api_key: str = None,
+        dedup_index=None,
+        source_index=None,
     ):
         """
         Creates new Task objects for a given project.
@@ -117,6 +252,10 @@ class Task(APIResource):
             project_id (str): ID of the project to which the tasks are added.
             tasks_data (list): list of dicts that map each task field to its value.
                 e.g. [{"website": "surgehq.ai"}, {"website":"twitch.tv"}]
+            dedup_index (TaskDedupIndex, optional): Skip tasks whose fields are already in the index,
+                and add the created tasks to it.
+            source_index (SourceKeyIndex, optional): Record the ID of the task created from each row.
+                Both indexes are queried in a worker thread.
 
         Returns:
             tasks (list): list of Task objects
@@ -127,10 +266,47 @@ class Task(APIResource):
         if not all(isinstance(t, dict) for t in tasks_data):
             raise SurgeTaskDataError
 
+        if dedup_index is not None:
+            tasks_data, _ = await asyncio.to_thread(dedup_index.filter_new, tasks_data)
+            if len(tasks_data) == 0:
+                return []
+
+        if source_index is not None:
+            # Checked before any task is created, so a bad row cannot leave tasks unrecorded
+            try:
+                source_keys = await asyncio.to_thread(source_index.row_keys, tasks_data)
+            except ValueError as e:
+                raise SurgeTaskDataError(f"Cannot record source rows: {e}")
+
         endpoint = f"{PROJECTS_ENDPOINT}/{project_id}/{TASKS_ENDPOINT}/create_tasks"
         data = {"tasks": tasks_data, "launch": launch}
         response_json = await cls.post(endpoint, data, api_key=api_key)
         tasks = [cls(**task_json) for task_json in response_json]
+
+        if dedup_index is not None:
+            task_ids = [task.id for task in tasks]
+            if len(task_ids) != len(tasks_data):
+                task_ids = None
+            await asyncio.to_thread(dedup_index.add, tasks_data, task_ids)
+        if source_index is not None:
+            if len(tasks) == len(tasks_data):
+                await asyncio.to_thread(
+                    source_index.add_keys, source_keys, [task.id for task in tasks]
+                )
+            else:
+                # Tasks can't be matched by position, so match the ones whose fields carry a known key
+                expected = set(source_keys)
+                pairs = [
+                    (source_index.row_key(task.fields), task.id)
+                    for task in tasks
+                    if isinstance(getattr(task, "fields", None), dict)
+                ]
+                pairs = [(key, task_id) for key, task_id in pairs if key in expected]
+                await asyncio.to_thread(
+                    source_index.add_keys,
+                    [key for key, _ in pairs],
+                    [task_id for _, task_id in pairs],
+                )
         return tasks
 
     @classmethod
@@ -0,0 +1,146 @@
+import json
+
+import aiofiles
+
+from aiosurge._helpers import aiter
+from aiosurge.records import iter_response_records
+
+# Encoded transcripts are written once this many bytes are buffered
+TRANSCRIPT_WRITE_BUFFER_SIZE = 256 * 1024
+
+TRANSCRIPT_METADATA = ("task_id", "response_id", "worker_id", "completed_at")
+
+# Keys a chat answer may keep its list of turns under
+_TURN_LIST_KEYS = ("messages", "turns", "conversation", "chat", "history")
+
+
+def decode_transcript(answer):
+    """
+    Returns the turns of an answer to a ChatBot question.
+
+    The answer may be serialized JSON or its parsed value: a list of turns, or an object with the list
+    under "messages", "turns", "conversation", "chat" or "history". Turns that are plain strings
+    become {"text": turn}.
+
+    Returns:
+        turns (list): dicts, in conversation order.
+    """
+    if answer is None or answer == "":
+        return []
+    if isinstance(answer, (str, bytes)):
+        try:
+            answer = json.loads(answer)
+        except ValueError:
+            return [{"text": answer}]
+    if isinstance(answer, dict):
+        answer = next(
+            (
+                answer[key]
+                for key in _TURN_LIST_KEYS
+                if isinstance(answer.get(key), list)
+            ),
+            [answer],
+        )
+    if not isinstance(answer, list):
+        return [{"text": answer}]
+    return [turn if isinstance(turn, dict) else {"text": turn} for turn in answer]
+
+
+def chat_questions(questions: list):
+    """Returns the ChatBot questions among `questions`."""
+    return [
+        question for question in questions if getattr(question, "type", None) == "chat"
+    ]
+
+
+async def iter_transcripts(
+    records,
+    questions: list,
+    turn_fields: list = None,
+    task_fields: list = None,
+    metadata: tuple = TRANSCRIPT_METADATA,
+):
+    """
+    Extract the chat transcripts of every response, one record at a time.
+
+    Arguments:
+        records (iterable or async iterable): Report records or Task objects, e.g. `Report.stream_json(project_id)`.
+        questions (list): Questions of the project. Only ChatBot questions are extracted.
+        turn_fields (list, optional): Keys to keep in each turn, e.g. ["role", "text"]. Defaults to every key.
+        task_fields (list, optional): Task fields to copy into each transcript under "fields".
+        metadata (tuple): Response attributes to copy into each transcript.
+
+    Returns:
+        transcripts (async iterator): one dict per response and ChatBot question that has turns,
+            with the metadata, "question" (the question label) and "turns".
+    """
+    questions = chat_questions(questions)
+    async for record in aiter(records):
+        fields = _task_fields(record, task_fields) if task_fields else None
+        for response in iter_response_records([record]):
+            for question in questions:
+                turns = decode_transcript(response.answer(question))
+                if not turns:
+                    continue
+                if turn_fields is not None:
+                    turns = [
+                        {key: turn[key] for key in turn_fields if key in turn}
+                        for turn in turns
+                    ]
+                transcript = {key: getattr(response, key) for key in metadata}
+                transcript["question"] = question.label
+                if fields is not None:
+                    transcript["fields"] = fields
+                transcript["turns"] = turns
+                yield transcript
+
+
+async def write_transcripts(
+    records,
+    questions: list,
+    file_path: str,
+    turn_fields: list = None,
+    task_fields: list = None,
+    metadata: tuple = TRANSCRIPT_METADATA,
+    buffer_size: int = TRANSCRIPT_WRITE_BUFFER_SIZE,
+):
+    """
+    Write the chat transcripts of every response to a JSON lines file, one transcript per line.
+    Records are read and written as they stream, so memory is bounded by the largest record and `buffer_size`.
+
+    Arguments:
+        file_path (str): Path of the JSON lines file.
+        buffer_size (int): Number of encoded bytes to buffer between writes.
+        Other arguments are the same as `iter_transcripts`.
+
+    Returns:
+        count (int): number of transcripts written.
+    """
+    count = 0
+    buffer = []
+    buffered = 0
+    async with aiofiles.open(file_path, "w", encoding="utf-8") as file:
+        async for transcript in iter_transcripts(
+            records, questions, turn_fields, task_fields, metadata
+        ):
+            line = json.dumps(transcript, ensure_ascii=False, default=str) + "\n"
+            buffer.append(line)
+            buffered += len(line)
+            count += 1
+            if buffered >= buffer_size:
+                await file.write("".join(buffer))
+                buffer = []
+                buffered = 0
+        if buffer:
+            await file.write("".join(buffer))
+    return count
+
+
+def _task_fields(record, keys: list):
+    if isinstance(record, dict):
+        fields = record.get("fields")
+        if not isinstance(fields, dict):
+            fields = record
+    else:
+        fields = getattr(record, "fields", None) or {}
+    return {key: fields[key] for key in keys if key in fields}
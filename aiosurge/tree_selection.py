@@ -0,0 +1,279 @@
+import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from aiosurge._helpers import as_int64, require_numpy
+from aiosurge.records import aiter_response_records
+
+# Separates the levels of a TreeSelectionQuestion option, e.g. "Animal / Mammal / Dog"
+TREE_SEPARATOR = " / "
+
+
+class OptionTree:
+
+    def __init__(self, options: list, separator: str = TREE_SEPARATOR):
+        """
+        The hierarchy encoded by the options of a TreeSelectionQuestion, as a prefix tree.
+
+        Every option and every prefix of an option is a node. Node 0 is the root, other nodes are
+        numbered in the order they first appear in `options`, and each has a depth, from 1 for the top level.
+
+        Arguments:
+            options (list): Options of the question, e.g. ["1A / 2A", "1A / 2B", "1B / 2C"].
+            separator (str): Separator between the levels of an option.
+        """
+        self.separator = separator
+        self.paths = [()]
+        self.parents = [-1]
+        self.depths = [0]
+        self._node_ids = {(): 0}
+        self._answer_ids = {}
+        self._ancestors = None
+        for option in options:
+            self._insert(self._split(option))
+
+    def __str__(self):
+        return f"<surge.OptionTree nodes={len(self)} max_depth={self.max_depth}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        return len(self.paths)
+
+    @property
+    def max_depth(self):
+        return max(self.depths)
+
+    def name(self, node: int):
+        """Returns the option, or option prefix, of a node. The root is an empty string."""
+        return self.separator.join(self.paths[node])
+
+    def node_id(self, answer):
+        """
+        Returns the node of an answer, or -1 if it is not in the tree.
+        Answers that stop at an inner node, e.g. "1A", resolve to that node.
+        """
+        node = self._answer_ids.get(answer)
+        if node is None:
+            node = self._node_ids.get(self._split(answer), -1)
+            self._answer_ids[answer] = node
+        return node
+
+    def path_ids(self, node: int):
+        """Returns the nodes from the top level down to `node`, excluding the root."""
+        nodes = []
+        while node > 0:
+            nodes.append(node)
+            node = self.parents[node]
+        return nodes[::-1]
+
+    def level_nodes(self, level: int):
+        """Returns the nodes at a depth, in option order."""
+        return [node for node, depth in enumerate(self.depths) if depth == level]
+
+    @property
+    def ancestors(self):
+        """
+        Array of shape (nodes, max_depth + 1): the ancestor of each node at each depth, -1 below the node.
+        Column 0 is the root. Indexing it with an array of answer nodes gives every level at once.
+        """
+        require_numpy("tree selection aggregates")
+        if self._ancestors is None:
+            ancestors = np.full((len(self), self.max_depth + 1), -1, dtype=np.int64)
+            ancestors[:, 0] = 0
+            for node in range(1, len(self)):
+                for depth, ancestor in enumerate(self.path_ids(node), 1):
+                    ancestors[node, depth] = ancestor
+            self._ancestors = ancestors
+        return self._ancestors
+
+    def _split(self, answer):
+        if answer is None or answer == "":
+            return ()
+        return tuple(part.strip() for part in str(answer).split(self.separator))
+
+    def _insert(self, path: tuple):
+        for depth in range(1, len(path) + 1):
+            prefix = path[:depth]
+            if prefix not in self._node_ids:
+                self._node_ids[prefix] = len(self.paths)
+                self.paths.append(prefix)
+                self.parents.append(self._node_ids[prefix[:-1]])
+                self.depths.append(depth)
+        self._ancestors = None
+
+
+class TreeConsensus:
+
+    def __init__(self, task_id: str, path: str, depth: int, support, num_responses):
+        """
+        The deepest node of the tree that enough of a task's responses agree on.
+
+        Arguments:
+            task_id (str): ID of the task.
+            path (str): Option or option prefix agreed on, None if responses disagree at the top level.
+            depth (int): Depth of `path`, 0 without agreement.
+            support (float): Fraction of the responses whose answer is `path` or below it.
+            num_responses (int): Number of responses to the question.
+        """
+        self.task_id = task_id
+        self.path = path
+        self.depth = depth
+        self.support = support
+        self.num_responses = num_responses
+
+    def __str__(self):
+        return f'<surge.TreeConsensus task_id="{self.task_id}" path="{self.path}">'
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class TreeSelectionAggregator:
+
+    def __init__(self, question, separator: str = TREE_SEPARATOR):
+        """
+        Maps the answers to a TreeSelectionQuestion to nodes of its OptionTree, one response at a time,
+        and aggregates them at every level of the hierarchy in bulk.
+
+        Arguments:
+            question (TreeSelectionQuestion): The question.
+            separator (str): Separator between the levels of an option.
+        """
+        self.question = question
+        self.tree = OptionTree(getattr(question, "options", None) or [], separator)
+        # Answers that are not an option or option prefix of the question
+        self.num_unknown = 0
+        self._task_codes = {}
+        self._tasks = array.array("q")
+        self._nodes = array.array("q")
+
+    def __str__(self):
+        return f"<surge.TreeSelectionAggregator responses={len(self._nodes)}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def add(self, response):
+        """Add one ResponseRecord."""
+        value = response.answer(self.question)
+        if isinstance(value, (list, tuple)):
+            value = value[0] if value else None
+        if value is None or value == "":
+            return
+        node = self.tree.node_id(value)
+        if node < 0:
+            self.num_unknown += 1
+            return
+        self._tasks.append(
+            self._task_codes.setdefault(response.task_id, len(self._task_codes))
+        )
+        self._nodes.append(node)
+
+    def counts(self):
+        """
+        Returns the number of answers at or below each node, indexed by node, counting every level in one pass.
+        """
+        require_numpy("tree selection aggregates")
+        ancestors = self.tree.ancestors[as_int64(self._nodes)]
+        return np.bincount(ancestors[ancestors >= 0], minlength=len(self.tree))
+
+    def level_counts(self, level: int):
+        """Returns the number of answers at or below each node at a depth, keyed by option prefix."""
+        counts = self.counts()
+        return {
+            self.tree.name(node): int(counts[node])
+            for node in self.tree.level_nodes(level)
+        }
+
+    def task_counts(self, level: int):
+        """
+        Returns the count matrix of a level, e.g. for `agreement.fleiss_kappa`.
+        Answers that stop above the level are not counted.
+
+        Returns:
+            (task_ids, nodes, counts): the task of each row, the node of each column, and an
+                array of shape (tasks, nodes at the level).
+        """
+        require_numpy("tree selection aggregates")
+        nodes = self.tree.level_nodes(level)
+        columns = np.full(len(self.tree), -1, dtype=np.int64)
+        columns[nodes] = np.arange(len(nodes))
+        ancestor = self.tree.ancestors[as_int64(self._nodes), level]
+        answered = ancestor >= 0
+        num_tasks = len(self._task_codes)
+        counts = np.bincount(
+            as_int64(self._tasks)[answered] * len(nodes) + columns[ancestor[answered]],
+            minlength=num_tasks * len(nodes),
+        ).reshape(num_tasks, len(nodes))
+        return list(self._task_codes), nodes, counts
+
+    def consensus(self, threshold: float = 0.5):
+        """
+        Resolve each task to the deepest node that more than `threshold` of its responses are at or below.
+
+        Support can only shrink going down the tree, so with the default threshold this is the majority
+        answer at as many levels as there is a majority. Lower thresholds can accept several nodes
+        at a depth, and the one with the most answers wins, then the first in option order.
+
+        Returns:
+            consensus (dict): TreeConsensus keyed by task ID.
+        """
+        require_numpy("tree selection aggregates")
+        num_nodes = len(self.tree)
+        tasks = as_int64(self._tasks)
+        ancestors = self.tree.ancestors[as_int64(self._nodes)][:, 1:]
+        task_ancestors = np.broadcast_to(tasks[:, None], ancestors.shape)
+        below = ancestors >= 0
+
+        # Number of answers of each task at or below each node, for the (task, node) pairs that occur
+        keys, votes = np.unique(
+            task_ancestors[below] * num_nodes + ancestors[below], return_counts=True
+        )
+        key_tasks, key_nodes = keys // num_nodes, keys % num_nodes
+        responses = np.bincount(tasks, minlength=len(self._task_codes))
+        support = votes / responses[key_tasks]
+
+        accepted = support > threshold
+        key_tasks, key_nodes = key_tasks[accepted], key_nodes[accepted]
+        votes, support = votes[accepted], support[accepted]
+        depths = np.asarray(self.tree.depths, dtype=np.int64)[key_nodes]
+        order = np.lexsort((key_nodes, -votes, -depths, key_tasks))
+        resolved_tasks, first = np.unique(key_tasks[order], return_index=True)
+        best = order[first]
+
+        task_ids = list(self._task_codes)
+        consensus = {
+            task_id: TreeConsensus(task_id, None, 0, None, int(responses[task]))
+            for task, task_id in enumerate(task_ids)
+        }
+        for task, node, node_support in zip(
+            resolved_tasks.tolist(), key_nodes[best].tolist(), support[best].tolist()
+        ):
+            entry = consensus[task_ids[task]]
+            entry.path = self.tree.name(node)
+            entry.depth = self.tree.depths[node]
+            entry.support = node_support
+        return consensus
+
+
+async def aggregate_tree_selection(records, question, threshold: float = 0.5):
+    """
+    Resolve the depth-aware consensus of a TreeSelectionQuestion for every task.
+
+    Arguments:
+        records (iterable or async iterable): Report records or Task objects, e.g. `Report.stream_json(project_id)`.
+        question (TreeSelectionQuestion): The question.
+        threshold (float): Fraction of the responses that must agree on a node, see `TreeSelectionAggregator.consensus`.
+
+    Returns:
+        consensus (dict): TreeConsensus keyed by task ID.
+    """
+    aggregator = TreeSelectionAggregator(question)
+    async for response in aiter_response_records(records):
+        aggregator.add(response)
+    return aggregator.consensus(threshold)
@@ -1,8 +1,45 @@
+import asyncio
+import codecs
+import collections
+import concurrent.futures
+import csv
+import io
+import json
+import os
+import zlib
+
 from aiocsv import AsyncReader
 import aiofiles
 
+import aiosurge
+from aiosurge.errors import SurgeTaskDataError
+
+# Byte ranges handed to each worker process when parsing CSV files in parallel
+CSV_PARALLEL_CHUNK_SIZE = 16 * 1024 * 1024
+CSV_PARALLEL_BATCH_SIZE = 1000
+
+FILE_CHUNK_SIZE = 64 * 1024
+# Compressed or encoded report data is handed to the decode executor in batches of about this size
+DECODE_BATCH_SIZE = 256 * 1024
+
+# zlib window bits for gzip framed data
+_GZIP_WBITS = zlib.MAX_WBITS | 16
+
+# Size of the window scanned when moving a chunk boundary onto a record boundary
+_CSV_BOUNDARY_SCAN_SIZE = 64 * 1024
+
+
+async def load_tasks_data_from_csv(
+    file_path: str, parallel: bool = False, max_workers: int = None
+):
+    if parallel:
+        tasks_data = []
+        async for batch in iter_tasks_data_batches_from_csv(
+            file_path, max_workers=max_workers
+        ):
+            tasks_data.extend(batch)
+        return tasks_data
 
-async def load_tasks_data_from_csv(file_path: str):
     tasks_data = []
 
     async with aiofiles.open(file_path) as csvfile:
@@ -16,9 +53,437 @@ async def load_tasks_data_from_csv(file_path: str):
         assert type(headers) is list and len(headers) > 0
 
         async for row in reader:
-            data = {}
-            for i in range(len(headers)):
-                data[headers[i]] = row[i]
-            tasks_data.append(data)
+            if row:
+                tasks_data.append(csv_row_to_dict(headers, row))
 
     return tasks_data
+
+
+def csv_row_to_dict(headers: list, row: list):
+    """
+    Map the cells of a CSV row to the header. Missing fields are None, as with `csv.DictReader`.
+    Raises SurgeTaskDataError if the row has more cells than the header, since they have no field name.
+    """
+    if len(row) > len(headers):
+        raise SurgeTaskDataError(
+            f"CSV row has {len(row)} fields but the header has {len(headers)}: "
+            f"the row starting with {row[0]!r}"
+        )
+    data = dict(zip(headers, row))
+    for header in headers[len(row) :]:
+        data[header] = None
+    return data
+
+
+async def iter_file_chunks(file_path: str, chunk_size: int = FILE_CHUNK_SIZE):
+    """Read a file as an async iterator of byte chunks."""
+    async with aiofiles.open(file_path, "rb") as file:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def run_in_decode_executor(fn, *args, stateful: bool = False):
+    """
+    Run CPU bound decoding work, `fn(*args)`, in `aiosurge.decode_executor` so the event loop stays responsive.
+
+    Arguments:
+        fn (callable): The work to run.
+        stateful (bool): Whether `fn` updates state that cannot be sent to another process, such as
+            a zlib decompressor. Stateful work runs in the event loop's default thread pool when the
+            decode executor is a process pool.
+    """
+    executor = aiosurge.decode_executor
+    if stateful and isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+        executor = None
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+async def _iter_batches(chunks, batch_size: int):
+    # Join small chunks, so each hand-off to the decode executor does a meaningful amount of work
+    batch = []
+    length = 0
+    async for chunk in chunks:
+        batch.append(chunk)
+        length += len(chunk)
+        if length >= batch_size:
+            yield b"".join(batch)
+            batch = []
+            length = 0
+    if batch:
+        yield b"".join(batch)
+
+
+async def decompress_gzip_stream(chunks, batch_size: int = DECODE_BATCH_SIZE):
+    """
+    Decompress an async iterator of gzip compressed byte chunks as they arrive, so only
+    one batch of chunks is held in memory at a time. Concatenated gzip members are supported.
+    Decompression runs in the decode executor, see `run_in_decode_executor`.
+
+    Returns:
+        chunks (async iterator): decompressed byte chunks.
+    """
+    decompressor = _GzipStreamDecompressor()
+    async for batch in _iter_batches(chunks, batch_size):
+        data = await run_in_decode_executor(
+            decompressor.decompress, batch, stateful=True
+        )
+        if data:
+            yield data
+
+    if decompressor.received and not decompressor.eof:
+        raise EOFError(
+            "Compressed file ended before the end-of-stream marker was reached"
+        )
+
+
+class _GzipStreamDecompressor:
+    """Decompresses gzip data fed in arbitrary pieces, across gzip member boundaries."""
+
+    def __init__(self):
+        self._decompressor = zlib.decompressobj(_GZIP_WBITS)
+        self.received = False
+
+    @property
+    def eof(self):
+        return self._decompressor.eof
+
+    def decompress(self, chunk: bytes):
+        output = []
+        while chunk:
+            self.received = True
+            if self._decompressor.eof:
+                # Start of another gzip member
+                self._decompressor = zlib.decompressobj(_GZIP_WBITS)
+            output.append(self._decompressor.decompress(chunk))
+            chunk = self._decompressor.unused_data if self._decompressor.eof else b""
+        return b"".join(output)
+
+
+async def iter_json_array(
+    chunks, encoding: str = "utf-8", batch_size: int = DECODE_BATCH_SIZE
+):
+    """
+    Incrementally parse a JSON array from an async iterator of byte chunks.
+    Parsing runs in the decode executor, see `run_in_decode_executor`.
+
+    Returns:
+        items (async iterator): the elements of the array, as soon as each one is complete.
+    """
+    parser = _JSONArrayParser(encoding)
+    async for batch in _iter_batches(chunks, batch_size):
+        for item in await run_in_decode_executor(
+            parser.feed_bytes, batch, stateful=True
+        ):
+            yield item
+    for item in await run_in_decode_executor(
+        parser.feed_bytes, b"", True, stateful=True
+    ):
+        yield item
+
+
+class _JSONArrayParser:
+    """Push parser for a top level JSON array. Each element is decoded with the C json scanner."""
+
+    _START, _VALUE_OR_END, _VALUE, _COMMA_OR_END, _DONE = range(5)
+    _WHITESPACE = " \t\n\r"
+
+    def __init__(self, encoding: str = "utf-8"):
+        self._text_decoder = codecs.getincrementaldecoder(encoding)()
+        self._decoder = json.JSONDecoder()
+        self._state = self._START
+        self._pending = []
+        self._pending_length = 0
+        # Don't retry decoding an incomplete element until the buffered text has grown past
+        # this length, so large elements are not joined and re-scanned for every chunk.
+        self._retry_length = 0
+
+    def feed_bytes(self, chunk: bytes, final: bool = False):
+        return self.feed(self._text_decoder.decode(chunk, final=final), final)
+
+    def feed(self, text: str, final: bool = False):
+        self._pending.append(text)
+        self._pending_length += len(text)
+        if self._pending_length < self._retry_length and not final:
+            return []
+
+        buffer = "".join(self._pending)
+        self._retry_length = 0
+        pos = 0
+        items = []
+        while True:
+            while pos < len(buffer) and buffer[pos] in self._WHITESPACE:
+                pos += 1
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+
+            if self._state == self._START:
+                if char != "[":
+                    raise json.JSONDecodeError("Expecting '['", buffer, pos)
+                self._state = self._VALUE_OR_END
+                pos += 1
+            elif self._state == self._VALUE_OR_END and char == "]":
+                self._state = self._DONE
+                pos += 1
+            elif self._state in (self._VALUE_OR_END, self._VALUE):
+                try:
+                    item, end = self._decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    # Incomplete element, wait until the buffer has doubled
+                    self._retry_length = (len(buffer) - pos) * 2
+                    break
+                if end == len(buffer) and not final:
+                    # A number or literal may continue in the next chunk
+                    self._retry_length = len(buffer) - pos + 1
+                    break
+                items.append(item)
+                self._state = self._COMMA_OR_END
+                pos = end
+            elif self._state == self._COMMA_OR_END:
+                if char == ",":
+                    self._state = self._VALUE
+                elif char == "]":
+                    self._state = self._DONE
+                else:
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+                pos += 1
+            else:
+                raise json.JSONDecodeError("Extra data", buffer, pos)
+
+        remaining = buffer[pos:]
+        self._pending = [remaining]
+        self._pending_length = len(remaining)
+        if final and self._state != self._DONE:
+            raise json.JSONDecodeError("Unterminated array", buffer, pos)
+        return items
+
+
+async def iter_csv_rows(
+    chunks, encoding: str = "utf-8", batch_size: int = DECODE_BATCH_SIZE
+):
+    """
+    Incrementally parse CSV rows from an async iterator of byte chunks.
+
+    Only complete records are handed to the C `csv` module. A newline ends a record when
+    the number of quote characters before it is even, so quoted newlines are supported.
+    Parsing runs in the decode executor, see `run_in_decode_executor`.
+
+    Returns:
+        rows (async iterator): each record as a list of strings. Blank lines are skipped.
+    """
+    parser = _CSVRowParser(encoding)
+    async for batch in _iter_batches(chunks, batch_size):
+        for row in await run_in_decode_executor(parser.feed, batch, stateful=True):
+            yield row
+    for row in await run_in_decode_executor(parser.feed, b"", True, stateful=True):
+        yield row
+
+
+class _CSVRowParser:
+    """Push parser for CSV bytes, returns the rows of the complete records fed so far."""
+
+    def __init__(self, encoding: str = "utf-8"):
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._pending = ""
+
+    def feed(self, chunk: bytes, final: bool = False):
+        text = self._pending + self._decoder.decode(chunk, final=final)
+        end = len(text) if final else _last_csv_record_boundary(text)
+        self._pending = text[end:]
+        if end == 0:
+            return []
+        return [row for row in csv.reader(io.StringIO(text[:end], newline="")) if row]
+
+
+def _last_csv_record_boundary(text: str):
+    # Offset just past the last newline in `text` that is outside of a quoted field, or 0
+    end = text.rfind("\n")
+    if end == -1:
+        return 0
+    quotes = text.count('"', 0, end)
+    while quotes % 2:
+        previous = text.rfind("\n", 0, end)
+        if previous == -1:
+            return 0
+        quotes -= text.count('"', previous, end)
+        end = previous
+    return end + 1
+
+
+async def iter_responses_from_jsonl(file_path: str):
+    """
+    Lazily read responses to import from a JSON lines file, one object per line:
+    {"task_id": "...", "answers": ["..."], "worker_id": "..."}. Blank lines are skipped.
+    """
+    async with aiofiles.open(file_path) as f:
+        async for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+async def iter_tasks_data_batches_from_csv(
+    file_path: str,
+    batch_size: int = CSV_PARALLEL_BATCH_SIZE,
+    max_workers: int = None,
+    chunk_size: int = CSV_PARALLEL_CHUNK_SIZE,
+    encoding: str = "utf-8",
+):
+    """
+    Parse a CSV file of task data in a process pool and yield it in ordered batches.
+
+    The file is split into byte ranges that start and end on record boundaries, and each
+    range is parsed with the C `csv` module in a separate process. Batches are yielded in
+    file order and are ready to be passed to `Task.create_many`. Rows are read like
+    `load_tasks_data_from_csv` reads them: blank rows are skipped, missing fields are None
+    as with `csv.DictReader`, and rows with more fields than the header raise SurgeTaskDataError.
+
+    Record boundaries are found by counting quote characters, so quotes must only appear
+    in quoted fields, as in RFC 4180. Files with quotes inside unquoted fields, e.g. `5" disk`,
+    must be parsed serially.
+
+    Arguments:
+        file_path (str): path to CSV file. The first record is used as the header.
+        batch_size (int): number of task dicts in each yielded batch.
+        max_workers (int, optional): number of worker processes. Defaults to the CPU count.
+        chunk_size (int): approximate size in bytes of the range parsed by each worker.
+        encoding (str): text encoding of the file.
+
+    Returns:
+        batches (async iterator): lists of dicts that map each task field to its value.
+    """
+    headers, header_end = await asyncio.to_thread(
+        _read_csv_headers, file_path, encoding
+    )
+    assert type(headers) is list and len(headers) > 0
+
+    ranges = await asyncio.to_thread(
+        _split_csv_byte_ranges, file_path, chunk_size, header_end
+    )
+    max_workers = max_workers or os.cpu_count() or 1
+
+    batch = []
+    loop = asyncio.get_running_loop()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+
+        def submit(byte_range):
+            start, end = byte_range
+            return loop.run_in_executor(
+                executor,
+                _parse_csv_byte_range,
+                file_path,
+                start,
+                end,
+                encoding,
+                headers,
+            )
+
+        # Keep a bounded number of ranges in flight so memory does not grow with
+        # the file size while results are still consumed in order.
+        ranges_iter = iter(ranges)
+        pending = collections.deque(
+            submit(byte_range)
+            for _, byte_range in zip(range(max_workers * 2), ranges_iter)
+        )
+        try:
+            while pending:
+                rows = await pending.popleft()
+                next_range = next(ranges_iter, None)
+                if next_range is not None:
+                    pending.append(submit(next_range))
+
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+        finally:
+            for future in pending:
+                future.cancel()
+
+    if batch:
+        yield batch
+
+
+def _read_csv_headers(file_path: str, encoding: str):
+    """Parse the header record of a CSV file and return it with its end offset."""
+    with open(file_path, "rb") as f:
+        end, _ = _next_csv_record_boundary(f, 0, 0)
+        f.seek(0)
+        data = f.read() if end is None else f.read(end)
+    headers = next(csv.reader(io.StringIO(data.decode(encoding), newline="")), None)
+    return headers, len(data)
+
+
+def _split_csv_byte_ranges(file_path: str, chunk_size: int, start: int = 0):
+    """
+    Split a CSV file into (start, end) byte ranges aligned on record boundaries.
+    `start` must itself be a record boundary, e.g. the end of the header record.
+    """
+    file_size = os.path.getsize(file_path)
+    ranges = []
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        quotes = 0
+        while start < file_size:
+            target = start + chunk_size
+            if target >= file_size:
+                ranges.append((start, file_size))
+                break
+
+            quotes += f.read(target - start).count(b'"')
+            end, quotes = _next_csv_record_boundary(f, target, quotes)
+            if end is None:
+                ranges.append((start, file_size))
+                break
+
+            ranges.append((start, end))
+            start = end
+            f.seek(start)
+    return ranges
+
+
+def _next_csv_record_boundary(f, offset: int, quotes: int):
+    """
+    Find the first newline at or after `offset` that is not inside a quoted field.
+
+    A newline ends a record when the number of quote characters before it is even.
+    Escaped quotes (`""`) count twice, so they never change the parity.
+
+    Returns:
+        (end, quotes): offset just past that newline (None if the rest of the file is
+            a single record) and the number of quote characters before it.
+    """
+    f.seek(offset)
+    position = offset
+    while True:
+        window = f.read(_CSV_BOUNDARY_SCAN_SIZE)
+        if not window:
+            return None, quotes
+        index = 0
+        while True:
+            newline = window.find(b"\n", index)
+            if newline == -1:
+                quotes += window.count(b'"', index)
+                break
+            quotes += window.count(b'"', index, newline)
+            if quotes % 2 == 0:
+                return position + newline + 1, quotes
+            index = newline + 1
+        position += len(window)
+
+
+def _parse_csv_byte_range(
+    file_path: str, start: int, end: int, encoding: str, headers: list
+):
+    # Runs in a worker process. Dicts are built here rather than in the parent, as
+    # unpickling them is cheaper than building them from unpickled rows.
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    text = io.StringIO(data.decode(encoding), newline="")
+    return [csv_row_to_dict(headers, row) for row in csv.reader(text) if row]
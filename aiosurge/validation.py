@@ -0,0 +1,164 @@
+import re
+
+from aiosurge.errors import SurgeTaskDataError
+
+# Matches {{field}} and {{{field}}} placeholders, with optional ~ whitespace control.
+FIELDS_TEMPLATE_PLACEHOLDER_RE = re.compile(r"\{\{\{?~?\s*([^{}]*?)\s*~?\}?\}\}")
+# Comments may contain placeholders of their own, so they are removed before matching
+FIELDS_TEMPLATE_COMMENT_RE = re.compile(r"\{\{!--.*?--\}\}|\{\{![^}]*\}\}", re.DOTALL)
+# Block tags ({{#if x}}, {{/if}}, {{^x}}), comments, partials ({{> name}}) and data variables ({{@index}})
+_NON_FIELD_PREFIXES = ("#", "/", "^", "!", ">", "@")
+_NON_FIELD_PLACEHOLDERS = {"else", "this", "."}
+
+
+def fields_template_placeholders(fields_template: str):
+    """
+    Returns the task fields referenced by a project's fields_template, in order of first use.
+    e.g. '<a href="{{url}}">{{ title }}</a>' -> ["url", "title"]
+
+    Block tags, comments, partials and helper calls with arguments, e.g. {{lookup a b}}, are not fields.
+    """
+    if not fields_template:
+        return []
+    fields_template = FIELDS_TEMPLATE_COMMENT_RE.sub("", fields_template)
+    placeholders = []
+    for match in FIELDS_TEMPLATE_PLACEHOLDER_RE.finditer(fields_template):
+        name = match.group(1)
+        # A name followed by arguments is a helper call, e.g. {{lookup a b}} or {{else if x}}
+        is_field = (
+            name
+            and len(name.split()) == 1
+            and not name.startswith(_NON_FIELD_PREFIXES)
+            and name not in _NON_FIELD_PLACEHOLDERS
+        )
+        if is_field and name not in placeholders:
+            placeholders.append(name)
+    return placeholders
+
+
+class TaskDataValidationReport:
+
+    def __init__(self, num_rows: int, missing_fields: dict, empty_fields: dict):
+        self.num_rows = num_rows
+        # Field name -> indexes of the rows where the field is missing or empty
+        self.missing_fields = missing_fields
+        self.empty_fields = empty_fields
+
+    def __str__(self):
+        return f"<surge.TaskDataValidationReport invalid_rows={len(self.invalid_rows)}/{self.num_rows}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    @property
+    def is_valid(self):
+        return not self.missing_fields and not self.empty_fields
+
+    @property
+    def invalid_rows(self):
+        """
+        Returns:
+            invalid_rows (dict): row index -> list of problems, e.g. {3: ["missing field 'url'"]}
+        """
+        problems = {}
+        for field, indexes in self.missing_fields.items():
+            for i in indexes:
+                problems.setdefault(i, []).append(f"missing field '{field}'")
+        for field, indexes in self.empty_fields.items():
+            for i in indexes:
+                problems.setdefault(i, []).append(f"empty field '{field}'")
+        return dict(sorted(problems.items()))
+
+    def raise_for_errors(self, max_rows_in_message: int = 10):
+        """Raise SurgeTaskDataError listing the offending rows if validation failed."""
+        if self.is_valid:
+            return
+        invalid_rows = self.invalid_rows
+        details = "; ".join(
+            f"row {i}: {', '.join(problems)}"
+            for i, problems in list(invalid_rows.items())[:max_rows_in_message]
+        )
+        if len(invalid_rows) > max_rows_in_message:
+            details += f"; and {len(invalid_rows) - max_rows_in_message} more rows"
+        raise SurgeTaskDataError(
+            f"{len(invalid_rows)} of {self.num_rows} tasks are invalid: {details}"
+        )
+
+
+class TaskDataValidator:
+
+    def __init__(self, fields_template: str = None, required_fields: list = None):
+        """
+        Checks task data locally before it is uploaded with `Task.create_many`.
+
+        Arguments:
+            fields_template (str, optional): The project's fields_template. Every placeholder it references must be
+                present in each task.
+            required_fields (list, optional): Fields that must be present and non-empty in each task.
+        """
+        self.placeholders = fields_template_placeholders(fields_template)
+        self.required_fields = list(required_fields or [])
+        self._expected_fields = list(
+            dict.fromkeys(self.placeholders + self.required_fields)
+        )
+
+    @classmethod
+    def from_project(cls, project, required_fields: list = None):
+        """
+        Creates a validator for a project's fields template. Projects returned by the API hold the
+        template in `fields_text`, the name `Project.update` sends it under, so it is used when the
+        project has no `fields_template`.
+        """
+        fields_template = getattr(project, "fields_template", None) or getattr(
+            project, "fields_text", None
+        )
+        return cls(fields_template=fields_template, required_fields=required_fields)
+
+    def validate(self, tasks_data: list):
+        """
+        Validate a batch of task data.
+
+        Rows that share the same columns (e.g. every row of a CSV) are checked for missing
+        fields once per distinct set of columns, and empty values are checked column by column.
+
+        Arguments:
+            tasks_data (list): list of dicts that map each task field to its value.
+
+        Returns:
+            report (TaskDataValidationReport): offending row indexes for each field.
+        """
+        if type(tasks_data) is not list:
+            raise SurgeTaskDataError
+
+        missing_fields = {}
+        missing_by_columns = {}
+        for i, row in enumerate(tasks_data):
+            if not isinstance(row, dict):
+                raise SurgeTaskDataError
+            columns = tuple(row)
+            missing = missing_by_columns.get(columns)
+            if missing is None:
+                missing = [f for f in self._expected_fields if f not in row]
+                missing_by_columns[columns] = missing
+            for field in missing:
+                missing_fields.setdefault(field, []).append(i)
+
+        empty_fields = {}
+        for field in self.required_fields:
+            indexes = [
+                i
+                for i, row in enumerate(tasks_data)
+                if field in row and _is_empty(row[field])
+            ]
+            if indexes:
+                empty_fields[field] = indexes
+
+        return TaskDataValidationReport(len(tasks_data), missing_fields, empty_fields)
+
+
+def _is_empty(value):
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    return False
@@ -0,0 +1,257 @@
+import asyncio
+import hashlib
+import hmac
+import json
+
+from aiosurge.errors import SurgeMissingIDError
+from aiosurge.tasks import Task
+
+CALLBACK_SIGNATURE_HEADER = "X-Surge-Signature"
+CALLBACK_MAX_QUEUE_SIZE = 1000
+CALLBACK_MAX_BODY_SIZE = 16 * 1024 * 1024
+# Seconds to wait for a client to send its request
+CALLBACK_READ_TIMEOUT = 30
+
+_HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    411: "Length Required",
+    413: "Payload Too Large",
+}
+
+# Returned by `_next` once the receiver is stopped and its queue is empty
+_CLOSED = object()
+# Returned by `_next` when its timeout expires first
+_TIMEOUT = object()
+
+
+class CallbackReceiver:
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        path: str = "/",
+        secret: str = None,
+        signature_header: str = CALLBACK_SIGNATURE_HEADER,
+        max_queue_size: int = CALLBACK_MAX_QUEUE_SIZE,
+        max_body_size: int = CALLBACK_MAX_BODY_SIZE,
+    ):
+        """
+        A small HTTP server that receives the task callbacks sent to a project's `callback_url`.
+
+        Each callback is parsed into a Task and put on a bounded queue. When the queue is full,
+        the response to the callback is delayed until there is room, so a slow consumer pushes
+        back on the sender. Iterate over the receiver to get tasks one at a time, or use `batches`.
+
+        Arguments:
+            host (str): Interface to listen on.
+            port (int): Port to listen on. 0 picks a free port, see `url`.
+            path (str): Path callbacks are sent to. Requests to other paths get a 404.
+            secret (str, optional): If set, callbacks must carry a hex HMAC-SHA256 signature of their body,
+                computed with this secret, in `signature_header`.
+            signature_header (str): Header holding the signature, optionally prefixed with "sha256=".
+            max_queue_size (int): Maximum number of received tasks not yet consumed.
+            max_body_size (int): Larger callbacks are rejected with a 413.
+        """
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret = secret.encode("utf-8") if isinstance(secret, str) else secret
+        self.signature_header = signature_header.lower()
+        self.max_body_size = max_body_size
+        self.max_queue_size = max_queue_size
+        # Created in `start`, so it belongs to the running event loop
+        self._queue = None
+        # Pending `queue.get()`, kept across timeouts so a dequeued task is never dropped
+        self._get = None
+        self._server = None
+        self._closed = None
+
+    def __str__(self):
+        return f'<surge.CallbackReceiver url="{self.url}">'
+
+    def __repr__(self):
+        return self.__str__()
+
+    @property
+    def url(self):
+        """URL to use as the project's `callback_url`, from the local network."""
+        return f"http://{self.host}:{self.port}{self.path}"
+
+    async def start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_queue_size)
+        self._closed = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        """Stop accepting callbacks. Tasks already received can still be consumed."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._closed is not None:
+            self._closed.set()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        task = await self._next()
+        if task is _CLOSED:
+            raise StopAsyncIteration
+        return task
+
+    async def get(self):
+        """Wait for the next task. Raises StopAsyncIteration once stopped and drained."""
+        return await self.__anext__()
+
+    async def batches(self, max_size: int = 100, max_wait: float = 1.0):
+        """
+        Yield received tasks in lists of up to `max_size`. A batch is yielded early once
+        `max_wait` seconds have passed since its first task arrived.
+
+        Returns:
+            batches (async iterator): lists of Task objects.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            task = await self._next()
+            if task is _CLOSED:
+                return
+            batch = [task]
+            deadline = loop.time() + max_wait
+            while len(batch) < max_size:
+                task = await self._next(max(deadline - loop.time(), 0))
+                if task is _TIMEOUT:
+                    break
+                if task is _CLOSED:
+                    yield batch
+                    return
+                batch.append(task)
+            yield batch
+
+    async def _next(self, timeout: float = None):
+        # Returns the next task, _CLOSED, or _TIMEOUT once `timeout` seconds have passed
+        if self._queue is None:
+            return _CLOSED
+        if self._get is None:
+            if not self._queue.empty():
+                return self._queue.get_nowait()
+            if self._closed.is_set():
+                return _CLOSED
+            self._get = asyncio.ensure_future(self._queue.get())
+
+        # The get is not cancelled on timeout or if the caller is cancelled: the next call
+        # waits for the same get, and returns its task if it already dequeued one
+        closed = asyncio.ensure_future(self._closed.wait())
+        try:
+            await asyncio.wait(
+                {self._get, closed},
+                timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            closed.cancel()
+        if self._get.done():
+            get, self._get = self._get, None
+            return get.result()
+        if self._closed.is_set():
+            # Cancelling a get leaves its task, if it was about to take one, in the queue
+            self._get.cancel()
+            self._get = None
+            return self._queue.get_nowait() if not self._queue.empty() else _CLOSED
+        return _TIMEOUT
+
+    async def _handle(self, reader, writer):
+        tasks = []
+        try:
+            status, tasks = await asyncio.wait_for(
+                self._read_request(reader), CALLBACK_READ_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            status = 408
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            status = 400
+        # Not covered by the read timeout: waiting for room in the queue is how a slow
+        # consumer pushes back on the sender, and a timeout here would leave a payload half queued
+        for task in tasks:
+            await self._queue.put(task)
+        try:
+            writer.write(
+                f"HTTP/1.1 {status} {_HTTP_REASONS[status]}\r\n"
+                "Content-Length: 0\r\nConnection: close\r\n\r\n".encode("ascii")
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        # Returns the response status and the tasks to queue
+        head = await reader.readuntil(b"\r\n\r\n")
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = request_line.split(" ", 2)
+        headers = {}
+        for line in header_lines:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+        if target.split("?", 1)[0] != self.path:
+            return 404, []
+        if method != "POST":
+            return 405, []
+        if "content-length" not in headers:
+            return 411, []
+        length = int(headers["content-length"])
+        if length > self.max_body_size:
+            return 413, []
+        body = await reader.readexactly(length)
+
+        if self.secret is not None and not self._is_signed(
+            body, headers.get(self.signature_header)
+        ):
+            return 401, []
+
+        try:
+            tasks = parse_callback_payload(json.loads(body))
+        except (ValueError, TypeError, KeyError, SurgeMissingIDError):
+            return 400, []
+        return 200, tasks
+
+    def _is_signed(self, body: bytes, signature: str):
+        if not signature:
+            return False
+        if signature.startswith("sha256="):
+            signature = signature[len("sha256=") :]
+        expected = hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+        # Bytes, since compare_digest rejects non-ASCII strings
+        return hmac.compare_digest(expected.encode("ascii"), signature.encode("utf-8"))
+
+
+def parse_callback_payload(payload):
+    """
+    Returns the Task objects in a callback payload: a task, {"task": task}, or a list of either.
+    """
+    if isinstance(payload, list):
+        return [task for item in payload for task in parse_callback_payload(item)]
+    if not isinstance(payload, dict):
+        raise ValueError("Callback payload must be a JSON object or array")
+    if isinstance(payload.get("task"), dict):
+        payload = payload["task"]
+    return [Task(**payload)]
@@ -0,0 +1,401 @@
+import array
+import json
+import sqlite3
+import statistics
+
+from aiosurge.consensus import ConsensusAggregator, MajorityVote
+from aiosurge.records import (
+    aiter_response_records,
+    answer_options,
+    parse_completed_at,
+    question_answer,
+)
+
+# Pauses between two responses longer than this, in seconds, are breaks rather than work
+CADENCE_SESSION_GAP = 30 * 60
+# Response IDs are remembered for this many seconds before the latest `completed_at` seen,
+# older responses are assumed to have been added already
+SEEN_RESPONSES_WINDOW = 24 * 60 * 60
+
+
+class WorkerStats:
+
+    __slots__ = (
+        "worker_id",
+        "num_responses",
+        "gold_correct",
+        "gold_total",
+        "consensus_agreed",
+        "consensus_total",
+        "completions",
+    )
+
+    def __init__(self, worker_id: str):
+        """
+        Performance of one worker.
+
+        Arguments:
+            worker_id (str): ID of the worker.
+        """
+        self.worker_id = worker_id
+        self.num_responses = 0
+        # Responses to gold standard tasks, and how many matched every gold answer
+        self.gold_correct = 0
+        self.gold_total = 0
+        # Answers compared with the consensus of the task, and how many matched it
+        self.consensus_agreed = 0
+        self.consensus_total = 0
+        # Completion times, as POSIX timestamps
+        self.completions = array.array("d")
+
+    def __str__(self):
+        return f'<surge.WorkerStats worker_id="{self.worker_id}" num_responses={self.num_responses}>'
+
+    def __repr__(self):
+        return self.__str__()
+
+    @property
+    def gold_accuracy(self):
+        """Fraction of gold standard tasks answered correctly, or None without gold standard tasks."""
+        return self.gold_correct / self.gold_total if self.gold_total else None
+
+    @property
+    def consensus_agreement(self):
+        """Fraction of answers that match the consensus answer, or None without multi-worker tasks."""
+        if not self.consensus_total:
+            return None
+        return self.consensus_agreed / self.consensus_total
+
+    @property
+    def median_cadence(self):
+        """Median number of seconds between two consecutive responses within a session, or None."""
+        times = sorted(self.completions)
+        gaps = [
+            later - earlier
+            for earlier, later in zip(times, times[1:])
+            if later - earlier <= CADENCE_SESSION_GAP
+        ]
+        return statistics.median(gaps) if gaps else None
+
+
+class WorkerStatsIndex:
+
+    def __init__(
+        self,
+        questions: list,
+        num_workers_per_task: int = 1,
+        gold_standards: dict = None,
+        strategies: dict = None,
+    ):
+        """
+        Incremental index of worker performance, built from report records or Task objects.
+
+        For each worker it tracks the number of responses, accuracy on gold standard tasks,
+        the median time between consecutive responses from `completed_at`, and how often their
+        answers match the consensus answer of the task. It can be saved to and loaded from a
+        compact SQLite file and updated as new responses arrive.
+
+        Responses are deduplicated by ID. To keep memory bounded, after each `update` only the IDs of
+        responses completed within `SEEN_RESPONSES_WINDOW` of the latest one are kept, and responses
+        completed before that window are skipped, so re-reading a full export adds nothing twice.
+        Likert answers are compared with the most common answer of the task, not the mean.
+
+        Arguments:
+            questions (list): Question objects of the project.
+            num_workers_per_task (int): Number of responses per task, used to resolve the consensus.
+            gold_standards (dict, optional): Maps each gold standard task ID to its answers, one per question,
+                in the same format as `Task.set_gold_standards`.
+            strategies (dict, optional): Consensus strategies, see `ConsensusAggregator`. Likert questions
+                default to a majority vote, as a worker's answer can't match a mean.
+        """
+        self.questions = questions
+        self.gold_standards = gold_standards or {}
+        self.workers = {}
+        # Response ID -> completed_at timestamp, or None
+        self._seen_responses = {}
+        self._latest_completed_at = None
+        # Responses completed before this timestamp are skipped
+        self._skip_before = None
+        self._aggregator = ConsensusAggregator(
+            questions,
+            num_workers_per_task,
+            {"likert": MajorityVote(break_ties=False), **(strategies or {})},
+        )
+
+    def __str__(self):
+        return f"<surge.WorkerStatsIndex workers={len(self.workers)}>"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        return len(self.workers)
+
+    def __getitem__(self, worker_id):
+        return self.workers[worker_id]
+
+    def __contains__(self, worker_id):
+        return worker_id in self.workers
+
+    @classmethod
+    def from_project(cls, project, gold_standards: dict = None, strategies=None):
+        """Creates an index for the questions and `num_workers_per_task` of a project."""
+        return cls(
+            project.questions,
+            getattr(project, "num_workers_per_task", None) or 1,
+            gold_standards,
+            strategies,
+        )
+
+    def add(self, response):
+        """
+        Add one ResponseRecord. Responses with an ID that was already added, or completed before the
+        window of remembered IDs, are skipped. Responses without a worker ID only count toward the
+        consensus of their task.
+
+        Returns:
+            added (bool): whether the response was new.
+        """
+        completed_at = parse_completed_at(response.completed_at)
+        timestamp = completed_at.timestamp() if completed_at is not None else None
+        if response.response_id is not None:
+            if response.response_id in self._seen_responses:
+                return False
+            if (
+                timestamp is not None
+                and self._skip_before is not None
+                and timestamp < self._skip_before
+            ):
+                return False
+            self._seen_responses[response.response_id] = timestamp
+            if timestamp is not None and (
+                self._latest_completed_at is None
+                or timestamp > self._latest_completed_at
+            ):
+                self._latest_completed_at = timestamp
+
+        if response.worker_id is not None:
+            self._add_worker_response(response, timestamp)
+
+        resolved = self._aggregator.add(response)
+        if resolved is not None:
+            self._add_consensus(resolved)
+        return True
+
+    def _add_worker_response(self, response, timestamp):
+        stats = self.workers.get(response.worker_id)
+        if stats is None:
+            stats = self.workers[response.worker_id] = WorkerStats(response.worker_id)
+        stats.num_responses += 1
+
+        if timestamp is not None:
+            stats.completions.append(timestamp)
+
+        gold_standard = self.gold_standards.get(response.task_id)
+        if gold_standard is not None:
+            stats.gold_total += 1
+            if self._matches_gold_standard(response, gold_standard):
+                stats.gold_correct += 1
+
+    async def update(self, records):
+        """
+        Add every response of `records`, e.g. `Report.stream_json(project_id)` or pages of `Task.list`.
+
+        Returns:
+            added (int): number of new responses.
+        """
+        added = 0
+        async for response in aiter_response_records(records):
+            added += self.add(response)
+        # Records are not sorted by completion time, so the window only moves between updates
+        self._forget_old_responses()
+        return added
+
+    def _forget_old_responses(self):
+        if self._latest_completed_at is None:
+            return
+        self._skip_before = self._latest_completed_at - SEEN_RESPONSES_WINDOW
+        self._seen_responses = {
+            response_id: timestamp
+            for response_id, timestamp in self._seen_responses.items()
+            if timestamp is None or timestamp >= self._skip_before
+        }
+
+    def flush(self):
+        """Compare the answers of tasks that are still missing responses with their partial consensus."""
+        for resolved in self._aggregator.flush():
+            self._add_consensus(resolved)
+
+    def select(
+        self,
+        min_responses: int = 1,
+        min_gold_accuracy: float = None,
+        min_consensus_agreement: float = None,
+    ):
+        """
+        Returns the IDs of the workers that meet every given threshold, e.g. to pass to `Team.add_surgers`.
+        Workers without a gold accuracy or consensus agreement do not meet that threshold.
+        """
+        return [
+            stats.worker_id
+            for stats in self.workers.values()
+            if stats.num_responses >= min_responses
+            and _at_least(stats.gold_accuracy, min_gold_accuracy)
+            and _at_least(stats.consensus_agreement, min_consensus_agreement)
+        ]
+
+    def underperforming(
+        self,
+        min_responses: int = 1,
+        min_gold_accuracy: float = None,
+        min_consensus_agreement: float = None,
+    ):
+        """
+        Returns the IDs of the workers with at least `min_responses` responses whose gold accuracy or
+        consensus agreement is below the given threshold, e.g. to pass to `Team.remove_surgers`.
+        """
+        return [
+            stats.worker_id
+            for stats in self.workers.values()
+            if stats.num_responses >= min_responses
+            and (
+                _below(stats.gold_accuracy, min_gold_accuracy)
+                or _below(stats.consensus_agreement, min_consensus_agreement)
+            )
+        ]
+
+    def save(self, path: str):
+        """
+        Save the index to a SQLite file, including the answers of tasks still waiting for responses,
+        so their consensus is resolved once the rest of their responses are added after `load`.
+        """
+        self._forget_old_responses()
+        connection = sqlite3.connect(path)
+        try:
+            connection.executescript(
+                "DROP TABLE IF EXISTS workers; DROP TABLE IF EXISTS responses;"
+                "DROP TABLE IF EXISTS pending; DROP TABLE IF EXISTS meta;"
+                "CREATE TABLE workers (worker_id TEXT PRIMARY KEY, num_responses INTEGER,"
+                " gold_correct INTEGER, gold_total INTEGER, consensus_agreed INTEGER,"
+                " consensus_total INTEGER, completions BLOB);"
+                "CREATE TABLE responses (response_id TEXT PRIMARY KEY, completed_at REAL)"
+                " WITHOUT ROWID;"
+                "CREATE TABLE pending (task_id TEXT PRIMARY KEY, worker_ids TEXT, answers TEXT);"
+                "CREATE TABLE meta (key TEXT PRIMARY KEY, value REAL) WITHOUT ROWID;"
+            )
+            connection.executemany(
+                "INSERT INTO workers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        stats.worker_id,
+                        stats.num_responses,
+                        stats.gold_correct,
+                        stats.gold_total,
+                        stats.consensus_agreed,
+                        stats.consensus_total,
+                        stats.completions.tobytes(),
+                    )
+                    for stats in self.workers.values()
+                ],
+            )
+            connection.executemany(
+                "INSERT INTO responses VALUES (?, ?)", self._seen_responses.items()
+            )
+            connection.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [
+                    ("latest_completed_at", self._latest_completed_at),
+                    ("skip_before", self._skip_before),
+                ],
+            )
+            connection.executemany(
+                "INSERT INTO pending VALUES (?, ?, ?)",
+                [
+                    (task_id, json.dumps(worker_ids), json.dumps(answers, default=str))
+                    for task_id, worker_ids, answers in self._aggregator.pending_responses()
+                ],
+            )
+            connection.commit()
+        finally:
+            connection.close()
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        questions: list,
+        num_workers_per_task: int = 1,
+        gold_standards: dict = None,
+        strategies: dict = None,
+    ):
+        """Load an index saved with `save`, to keep updating it. Arguments are the same as the constructor."""
+        index = cls(questions, num_workers_per_task, gold_standards, strategies)
+        connection = sqlite3.connect(path)
+        try:
+            for row in connection.execute("SELECT * FROM workers"):
+                stats = WorkerStats(row[0])
+                (
+                    stats.num_responses,
+                    stats.gold_correct,
+                    stats.gold_total,
+                    stats.consensus_agreed,
+                    stats.consensus_total,
+                ) = row[1:6]
+                stats.completions.frombytes(row[6])
+                index.workers[stats.worker_id] = stats
+            index._seen_responses.update(
+                connection.execute("SELECT response_id, completed_at FROM responses")
+            )
+            meta = dict(connection.execute("SELECT key, value FROM meta"))
+            index._latest_completed_at = meta.get("latest_completed_at")
+            index._skip_before = meta.get("skip_before")
+            for task_id, worker_ids, answers in connection.execute(
+                "SELECT task_id, worker_ids, answers FROM pending"
+            ):
+                index._aggregator.restore_pending(
+                    task_id, json.loads(worker_ids), json.loads(answers)
+                )
+        finally:
+            connection.close()
+        return index
+
+    def _matches_gold_standard(self, response, gold_standard):
+        if isinstance(gold_standard, dict):
+            gold_standard = gold_standard.get("answers") or []
+        for question, gold_answer in zip(self.questions, gold_standard):
+            if gold_answer is None or gold_answer == "":
+                continue
+            answer = question_answer(response.answers, question)
+            if _normalize(answer) != _normalize(gold_answer):
+                return False
+        return True
+
+    def _add_consensus(self, resolved):
+        if resolved.num_responses < 2:
+            return
+        for name, consensus in resolved.answers.items():
+            # Means of Likert answers, from a LikertMean strategy, are not an answer a worker can match
+            if consensus is None or isinstance(consensus, float):
+                continue
+            consensus = _normalize(consensus)
+            for worker_id, answer in zip(
+                resolved.worker_ids, resolved.response_answers.get(name, [])
+            ):
+                stats = self.workers.get(worker_id)
+                if stats is None or answer is None:
+                    continue
+                stats.consensus_total += 1
+                stats.consensus_agreed += _normalize(answer) == consensus
+
+
+def _normalize(answer):
+    # Checkbox answers may be lists or newline separated strings
+    return tuple(sorted(answer_options(answer)))
+
+
+def _at_least(value, threshold):
+    return threshold is None or (value is not None and value >= threshold)
+
+
+def _below(value, threshold):
+    return threshold is not None and value is not None and value < threshold
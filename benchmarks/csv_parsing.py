@@ -0,0 +1,55 @@
+"""
+Compare the aiocsv and process pool CSV parsers used to load task data.
+
+Usage:
+    python benchmarks/csv_parsing.py [--rows 1000000] [--workers N]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from aiosurge.utils import load_tasks_data_from_csv
+
+
+def write_csv(file_path: str, rows: int):
+    with open(file_path, "w", newline="") as f:
+        f.write("id,company,city,description\n")
+        for i in range(rows):
+            f.write(f'{i},Company {i},San Francisco,"Row {i}, with ""quotes"""\n')
+
+
+async def bench(file_path: str, workers: int):
+    start = time.perf_counter()
+    serial = await load_tasks_data_from_csv(file_path)
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel = await load_tasks_data_from_csv(
+        file_path, parallel=True, max_workers=workers
+    )
+    parallel_time = time.perf_counter() - start
+
+    assert serial == parallel
+    print(f"rows:     {len(serial)}")
+    print(f"aiocsv:   {serial_time:.2f}s")
+    print(f"parallel: {parallel_time:.2f}s ({workers} workers)")
+    print(f"speedup:  {serial_time / parallel_time:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "tasks.csv")
+        write_csv(file_path, args.rows)
+        asyncio.run(bench(file_path, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from aiosurge import agreement
+from aiosurge.questions import CheckboxQuestion, LikertQuestion, MultipleChoiceQuestion
+
+# Fleiss (1971), as reproduced on Wikipedia: 10 tasks, 14 responses each, kappa = 0.210
+FLEISS_COUNTS = [
+    [0, 0, 0, 0, 14],
+    [0, 2, 6, 4, 2],
+    [0, 0, 3, 5, 6],
+    [0, 3, 9, 2, 0],
+    [2, 2, 8, 1, 1],
+    [7, 7, 0, 0, 0],
+    [3, 2, 6, 3, 0],
+    [2, 5, 3, 2, 2],
+    [6, 5, 2, 1, 0],
+    [0, 2, 2, 3, 7],
+]
+
+# Krippendorff (2011), 4 workers, 12 tasks, values 1-5 with missing answers
+KRIPPENDORFF_DATA = [
+    [1, 2, 3, 3, 2, 1, 4, 1, 2, None, None, None],
+    [1, 2, 3, 3, 2, 2, 4, 1, 2, 5, None, 3],
+    [None, 3, 3, 3, 2, 3, 4, 2, 2, 5, 1, None],
+    [1, 2, 3, 3, 2, 4, 4, 1, 2, 5, 1, None],
+]
+
+
+def krippendorff_counts():
+    counts = np.zeros((12, 5), dtype=int)
+    for worker in KRIPPENDORFF_DATA:
+        for task, value in enumerate(worker):
+            if value is not None:
+                counts[task, value - 1] += 1
+    return counts
+
+
+def test_fleiss_kappa():
+    assert agreement.fleiss_kappa(FLEISS_COUNTS) == pytest.approx(0.210, abs=1e-3)
+    assert agreement.fleiss_kappa([[2, 0], [0, 2]]) == pytest.approx(1.0)
+    assert math.isnan(agreement.fleiss_kappa([[1, 0]]))
+
+
+@pytest.mark.parametrize(
+    "metric,expected",
+    [("nominal", 0.743), ("ordinal", 0.815), ("interval", 0.849)],
+)
+def test_krippendorff_alpha(metric, expected):
+    alpha = agreement.krippendorff_alpha(krippendorff_counts(), metric)
+    assert alpha == pytest.approx(expected, abs=1e-3)
+
+
+def test_krippendorff_alpha_invalid_metric():
+    with pytest.raises(ValueError):
+        agreement.krippendorff_alpha(FLEISS_COUNTS, "ratio")
+
+
+@pytest.mark.asyncio
+async def test_agreement_scores():
+    questions = [
+        MultipleChoiceQuestion("Sentiment?", "Sentiment", options=["pos", "neg"]),
+        LikertQuestion("Quality?", "Quality", options=["1", "2", "3", "4", "5"]),
+        CheckboxQuestion("Topics?", "Topics", options=["a", "b"]),
+    ]
+    records = []
+    for worker, values in enumerate(KRIPPENDORFF_DATA):
+        for task, value in enumerate(values):
+            record = {"task_id": f"t{task}", "worker_id": f"w{worker}"}
+            if value is not None:
+                record["Quality?"] = str(value)
+                record["Sentiment?"] = "pos" if task % 2 else "neg"
+                record["Topics?"] = ["a"] if task < 6 else ["a", "b"]
+            records.append(record)
+
+    async def stream():
+        for record in records:
+            yield record
+
+    scores = await agreement.agreement_scores(stream(), questions)
+
+    assert set(scores) == {"Sentiment", "Quality", "Topics: a", "Topics: b"}
+    assert scores["Quality"].krippendorff_alpha == pytest.approx(0.849, abs=1e-3)
+    assert scores["Quality"].num_responses == 41
+    assert scores["Quality"].num_tasks == 12
+    assert scores["Sentiment"].krippendorff_alpha == pytest.approx(1.0)
+    assert scores["Topics: b"].fleiss_kappa == pytest.approx(1.0)
+    # Every worker selected "a", there is no variation to agree on
+    assert math.isnan(scores["Topics: a"].fleiss_kappa)
+
+    ordinal = await agreement.agreement_scores(records, questions, "ordinal")
+    assert ordinal["Quality"].krippendorff_alpha == pytest.approx(0.815, abs=1e-3)
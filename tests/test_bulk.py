@@ -0,0 +1,96 @@
+import asyncio
+import time
+import pytest
+
+from aiosurge.bulk import RateLimiter, run_bulk
+
+
+@pytest.mark.asyncio
+class TestBulk:
+    async def test_run_bulk_results_and_errors(self):
+        async def fn(item):
+            if item == 3:
+                raise ValueError("bad item")
+            return item * 2
+
+        progress = []
+        results = [
+            r
+            async for r in run_bulk(
+                range(5),
+                fn,
+                concurrency=2,
+                on_progress=lambda p: progress.append(p.completed),
+                total=5,
+            )
+        ]
+
+        assert sorted(r.item for r in results) == [0, 1, 2, 3, 4]
+        assert {r.item: r.result for r in results if r.ok} == {
+            0: 0,
+            1: 2,
+            2: 4,
+            4: 8,
+        }
+        [failed] = [r for r in results if not r.ok]
+        assert failed.item == 3
+        assert isinstance(failed.error, ValueError)
+        assert progress == [1, 2, 3, 4, 5]
+
+    async def test_run_bulk_bounds_concurrency_and_input(self):
+        in_flight = 0
+        max_in_flight = 0
+        pulled = 0
+
+        def items():
+            nonlocal pulled
+            for i in range(50):
+                pulled += 1
+                yield i
+
+        async def fn(item):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            return item
+
+        completed = 0
+        async for _ in run_bulk(items(), fn, concurrency=4):
+            completed += 1
+            # Items are only pulled from the input when a slot frees up
+            assert pulled <= completed + 4
+
+        assert completed == 50
+        assert max_in_flight == 4
+
+    async def test_run_bulk_async_iterable(self):
+        async def items():
+            for i in range(3):
+                yield i
+
+        async def fn(item):
+            return item
+
+        results = [r.result async for r in run_bulk(items(), fn)]
+        assert sorted(results) == [0, 1, 2]
+
+    async def test_rate_limiter(self):
+        limiter = RateLimiter(rate=100, burst=1)
+        start = time.monotonic()
+        for _ in range(6):
+            await limiter.acquire()
+        # The first call uses the burst, the next 5 wait 10ms each
+        assert time.monotonic() - start >= 0.045
+
+    async def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            RateLimiter(rate=0)
+
+        async def fn(item):
+            return item
+
+        with pytest.raises(ValueError):
+            async for _ in run_bulk([1], fn, concurrency=0):
+                pass
@@ -0,0 +1,145 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from aiosurge import columnar
+from aiosurge.questions import (
+    CheckboxQuestion,
+    FreeResponseQuestion,
+    LikertQuestion,
+    MultipleChoiceQuestion,
+    TextArea,
+)
+from aiosurge.records import iter_response_records
+from aiosurge.tasks import Task
+
+QUESTIONS = [
+    MultipleChoiceQuestion("Sentiment?", "Sentiment", options=["pos", "neg"]),
+    LikertQuestion("Quality?", "Quality", options=["1", "2", "3"]),
+    CheckboxQuestion("Topics?", "Topics", options=["a", "b", "c"]),
+    FreeResponseQuestion("Why?", "Reason"),
+    TextArea("Please read carefully.", "Instructions"),
+]
+
+RECORDS = [
+    {
+        "task_id": "t1",
+        "response_id": "r1",
+        "worker_id": "w1",
+        "completed_at": "2024-01-01T10:00:00Z",
+        "Sentiment?": "pos",
+        "Quality?": "3",
+        "Topics?": ["a", "c"],
+        "Why?": "Nice",
+    },
+    {
+        "task_id": "t1",
+        "response_id": "r2",
+        "worker_id": "w2",
+        "completed_at": "2024-01-01T11:00:00+01:00",
+        "Sentiment?": "neg",
+        "Topics?": "b",
+    },
+    {
+        "task_id": "t2",
+        "response_id": "r3",
+        "worker_id": "w1",
+        "Sentiment?": "unknown",
+        "Quality?": "1",
+        "Topics?": "a\nb",
+    },
+]
+
+
+def test_schema_from_questions():
+    columns = columnar.schema_from_questions(
+        QUESTIONS + [FreeResponseQuestion("Why again?", "Reason")]
+    )
+
+    assert [(c.name, c.kind) for c in columns] == [
+        ("Sentiment", "categorical"),
+        ("Quality", "categorical"),
+        ("Topics", "multi_option"),
+        ("Reason", "text"),
+        ("Reason (2)", "text"),
+    ]
+    assert columns[1].ordered and not columns[0].ordered
+
+
+def test_iter_response_records_from_tasks_and_dicts():
+    task = Task(
+        id="t1",
+        project_id="p1",
+        responses=[
+            {
+                "id": "r1",
+                "data": {"Sentiment?": "pos"},
+                "completed_at": "2024-01-01T10:00:00Z",
+                "worker_id": "w1",
+            }
+        ],
+    )
+    nested = {"id": "t2", "responses": [{"id": "r2", "data": {"Sentiment?": "neg"}}]}
+
+    responses = list(iter_response_records([task, nested, RECORDS[0]]))
+
+    assert [(r.task_id, r.response_id) for r in responses] == [
+        ("t1", "r1"),
+        ("t2", "r2"),
+        ("t1", "r1"),
+    ]
+    assert [r.answer(QUESTIONS[0]) for r in responses] == ["pos", "neg", "pos"]
+
+
+@pytest.mark.asyncio
+async def test_to_numpy():
+    arrays = await columnar.to_numpy(RECORDS, QUESTIONS, batch_size=2)
+
+    assert list(arrays["task_id"]) == ["t1", "t1", "t2"]
+    assert arrays["Sentiment"].tolist() == [0, 1, -1]
+    assert arrays["Quality"].tolist() == [2, -1, 0]
+    assert arrays["Topics"].tolist() == [
+        [True, False, True],
+        [False, True, False],
+        [True, True, False],
+    ]
+    assert list(arrays["Reason"]) == ["Nice", None, None]
+    assert arrays["completed_at"][0] == np.datetime64("2024-01-01T10:00:00")
+    assert arrays["completed_at"][1] == np.datetime64("2024-01-01T10:00:00")
+    assert np.isnat(arrays["completed_at"][2])
+
+
+@pytest.mark.asyncio
+async def test_to_arrow_and_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    async def stream():
+        for record in RECORDS:
+            yield record
+
+    table = await columnar.to_arrow(stream(), QUESTIONS, batch_size=2)
+
+    assert table.num_rows == 3
+    assert table.column("Sentiment").to_pylist() == ["pos", "neg", None]
+    assert table.column("Quality").type.ordered
+    assert table.column("Topics: b").to_pylist() == [False, True, True]
+    assert table.column("worker_id").to_pylist() == ["w1", "w2", "w1"]
+
+    path = str(tmp_path / "results.parquet")
+    rows = await columnar.write_parquet(stream(), QUESTIONS, path, batch_size=2)
+
+    assert rows == 3
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.metadata.num_row_groups == 2
+    assert parquet_file.read().column("Reason").to_pylist() == ["Nice", None, None]
+
+
+@pytest.mark.asyncio
+async def test_to_arrow_empty():
+    pytest.importorskip("pyarrow")
+
+    table = await columnar.to_arrow([], QUESTIONS)
+
+    assert table.num_rows == 0
+    assert "Topics: c" in table.column_names
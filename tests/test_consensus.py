@@ -0,0 +1,171 @@
+import pytest
+
+from aiosurge.consensus import (
+    ConsensusAggregator,
+    DeepestMajority,
+    LikertMean,
+    MajorityVote,
+    OptionMajority,
+    WeightedVote,
+)
+from aiosurge.projects import Project
+from aiosurge.questions import (
+    CheckboxQuestion,
+    FreeResponseQuestion,
+    LikertQuestion,
+    MultipleChoiceQuestion,
+    TreeSelectionQuestion,
+)
+from aiosurge.records import ResponseRecord
+
+SENTIMENT = MultipleChoiceQuestion("Sentiment?", "Sentiment", options=["pos", "neg"])
+QUALITY = LikertQuestion("Quality?", "Quality", options=["1", "2", "3", "4", "5"])
+TOPICS = CheckboxQuestion("Topics?", "Topics", options=["a", "b", "c"])
+QUESTIONS = [SENTIMENT, QUALITY, TOPICS, FreeResponseQuestion("Why?", "Reason")]
+
+
+def response(task_id, worker_id, sentiment=None, quality=None, topics=None):
+    return {
+        "task_id": task_id,
+        "worker_id": worker_id,
+        "Sentiment?": sentiment,
+        "Quality?": quality,
+        "Topics?": topics,
+    }
+
+
+def test_majority_vote():
+    vote = MajorityVote()
+    assert vote.resolve(SENTIMENT, ["neg", "pos", "neg"], ["w1", "w2", "w3"]) == "neg"
+    # Ties go to the first option
+    assert vote.resolve(SENTIMENT, ["neg", "pos"], ["w1", "w2"]) == "pos"
+    assert (
+        MajorityVote(break_ties=False).resolve(SENTIMENT, ["neg", "pos"], [1, 2])
+        is None
+    )
+    assert vote.resolve(SENTIMENT, [None, ""], ["w1", "w2"]) is None
+
+
+def test_weighted_vote():
+    vote = WeightedVote({"expert": 3}, default_weight=1)
+    assert (
+        vote.resolve(SENTIMENT, ["neg", "pos", "pos"], ["expert", "w2", "w3"]) == "neg"
+    )
+
+
+def test_likert_mean_and_option_majority():
+    assert LikertMean().resolve(QUALITY, ["1", "4", "4", None], []) == 3
+    assert LikertMean(round_to_option=True).resolve(QUALITY, ["2", "3"], []) == "3"
+    assert OptionMajority().resolve(TOPICS, [["a", "b"], ["a"], "a\nc"], []) == ["a"]
+
+
+def test_deepest_majority():
+    tree = TreeSelectionQuestion(
+        "Category?", "Category", options=["A / X", "A / Y", "B / Z"]
+    )
+    strategy = DeepestMajority()
+    assert strategy.resolve(tree, ["A / X", "A / X", "A / Y"], [1, 2, 3]) == "A / X"
+    assert strategy.resolve(tree, ["A / X", "A / Y", "B / Z"], [1, 2, 3]) == "A"
+    assert strategy.resolve(tree, ["A / X", "B / Z"], [1, 2]) is None
+    assert DeepestMajority(0.4).resolve(tree, ["A / X", "B / Z"], [1, 2]) == "A / X"
+    assert strategy.resolve(tree, [None, "unknown"], [1, 2]) is None
+
+
+@pytest.mark.asyncio
+async def test_aggregate_resolves_tasks_as_they_complete():
+    aggregator = ConsensusAggregator(QUESTIONS, num_workers_per_task=3)
+    records = [
+        response("t1", "w1", "pos", "4", ["a"]),
+        response("t2", "w1", "neg", "1", []),
+        response("t1", "w2", "pos", "5", ["a", "b"]),
+        response("t1", "w3", "neg", "3", ["b"]),
+        response("t2", "w2", "neg", "2", ["c"]),
+    ]
+
+    resolved = [task async for task in aggregator.aggregate(records)]
+
+    assert [(r.task_id, r.complete) for r in resolved] == [("t1", True), ("t2", False)]
+    assert resolved[0].answers == {
+        "Sentiment": "pos",
+        "Quality": 4,
+        "Topics": ["a", "b"],
+    }
+    assert resolved[0].worker_ids == ["w1", "w2", "w3"]
+    assert resolved[1].answers["Quality"] == 1.5
+    assert aggregator.num_pending == 0
+
+
+def test_add_drops_state_of_resolved_tasks():
+    aggregator = ConsensusAggregator(
+        QUESTIONS,
+        num_workers_per_task=2,
+        strategies={"likert": LikertMean(round_to_option=True)},
+    )
+
+    assert (
+        aggregator.add(ResponseRecord("t1", {"Quality?": "2"}, worker_id="w1")) is None
+    )
+    assert aggregator.num_pending == 1
+    resolved = aggregator.add(ResponseRecord("t1", {"Quality?": "5"}, worker_id="w2"))
+
+    assert resolved.answers["Quality"] == "4"
+    assert aggregator.num_pending == 0
+    assert aggregator.flush() == []
+
+
+def test_late_response_is_resolved_again_on_flush():
+    aggregator = ConsensusAggregator(QUESTIONS, num_workers_per_task=2)
+    aggregator.add(ResponseRecord("t1", {"Sentiment?": "pos"}, worker_id="w1"))
+    aggregator.add(ResponseRecord("t1", {"Sentiment?": "pos"}, worker_id="w2"))
+    # A third response arrives after the task was resolved
+    assert (
+        aggregator.add(ResponseRecord("t1", {"Sentiment?": "neg"}, worker_id="w3"))
+        is None
+    )
+    assert aggregator.num_pending == 1
+    [late] = aggregator.flush()
+    assert late.task_id == "t1"
+    assert not late.complete
+    assert late.worker_ids == ["w3"]
+    assert late.answers["Sentiment"] == "neg"
+
+
+def test_from_project():
+    project = Project(id="p1", name="Project", num_workers_per_task=2, questions=[])
+    project.questions = [SENTIMENT]
+    aggregator = ConsensusAggregator.from_project(
+        project, strategies={"Sentiment": MajorityVote(break_ties=False)}
+    )
+
+    assert aggregator.num_workers_per_task == 2
+    assert [c.name for c in aggregator.columns] == ["Sentiment"]
+    assert aggregator.strategies[0].break_ties is False
+
+
+def test_strategies_are_keyed_by_label():
+    sentiment = MultipleChoiceQuestion(
+        "Sentiment?", "Sentiment", options=["pos", "neg"], column_header="sentiment_v2"
+    )
+    by_label = MajorityVote(break_ties=False)
+    by_column = MajorityVote(break_ties=False)
+
+    aggregator = ConsensusAggregator([sentiment], 1, strategies={"Sentiment": by_label})
+    assert [c.name for c in aggregator.columns] == ["sentiment_v2"]
+    assert aggregator.strategies == [by_label]
+
+    aggregator = ConsensusAggregator(
+        [sentiment], 1, strategies={"sentiment_v2": by_column}
+    )
+    assert aggregator.strategies == [by_column]
+
+    # The label takes precedence over the column name and the question type
+    aggregator = ConsensusAggregator(
+        [sentiment],
+        1,
+        strategies={
+            "multiple_choice": MajorityVote(),
+            "sentiment_v2": by_column,
+            "Sentiment": by_label,
+        },
+    )
+    assert aggregator.strategies == [by_label]
@@ -0,0 +1,156 @@
+import threading
+from unittest.mock import patch, AsyncMock
+import pytest
+
+from aiosurge.dedup import TaskDedupIndex, task_fields_hash
+from aiosurge.errors import SurgeTaskDataError
+from aiosurge.projects import Project
+from aiosurge.tasks import Task
+
+
+@pytest.fixture
+def dedup_index(tmp_path):
+    index = TaskDedupIndex("project123", path=str(tmp_path / "index.sqlite3"))
+    yield index
+    index.close()
+
+
+def test_task_fields_hash_is_key_order_independent():
+    assert task_fields_hash({"a": "1", "b": "2"}) == task_fields_hash(
+        {"b": "2", "a": "1"}
+    )
+    assert task_fields_hash({"a": "1"}) != task_fields_hash({"a": "2"})
+    assert len(task_fields_hash({"a": "1"})) == 16
+
+
+def test_filter_new(dedup_index):
+    dedup_index.add([{"url": "a"}], ["task-a"])
+
+    new_tasks, skipped = dedup_index.filter_new(
+        [{"url": "a"}, {"url": "b"}, {"url": "b"}, {"url": "c"}]
+    )
+
+    assert new_tasks == [{"url": "b"}, {"url": "c"}]
+    assert skipped == [0, 2]
+    assert {"url": "a"} in dedup_index
+    assert {"url": "b"} not in dedup_index
+
+
+def test_index_is_persistent(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    with TaskDedupIndex("project123", path=path) as index:
+        index.add([{"url": "a"}, {"url": "b"}])
+
+    with TaskDedupIndex("project123", path=path) as index:
+        assert len(index) == 2
+        assert {"url": "b"} in index
+
+
+@pytest.mark.asyncio
+async def test_seed_from_project(dedup_index):
+    pages = [
+        [
+            Task(id="t1", project_id="project123", fields={"url": "a"}),
+            Task(id="t2", project_id="project123", fields={"url": "b"}),
+        ],
+        [Task(id="t3", project_id="project123", fields={"url": "c"})],
+        [],
+    ]
+    with patch(
+        "aiosurge.dedup.Task.list", new_callable=AsyncMock, side_effect=pages
+    ) as mock_list:
+        count = await dedup_index.seed_from_project(per_page=2)
+
+    assert count == 3
+    assert mock_list.await_count == 3
+    assert len(dedup_index) == 3
+    assert {"url": "c"} in dedup_index
+
+
+@pytest.mark.asyncio
+async def test_create_many_skips_duplicates(dedup_index):
+    dedup_index.add([{"url": "a"}])
+
+    async def mock_post(endpoint, data, api_key=None):
+        return [
+            {"id": f"task-{t['url']}", "project_id": "project123", "fields": t}
+            for t in data["tasks"]
+        ]
+
+    with patch(
+        "aiosurge.tasks.Task.post", new_callable=AsyncMock, side_effect=mock_post
+    ) as mock_request:
+        tasks = await Task.create_many(
+            "project123",
+            [{"url": "a"}, {"url": "b"}],
+            launch=False,
+            dedup_index=dedup_index,
+        )
+        assert [t.id for t in tasks] == ["task-b"]
+        assert mock_request.await_args.args[1]["tasks"] == [{"url": "b"}]
+        assert {"url": "b"} in dedup_index
+
+        # Everything is a duplicate now, so no request is made
+        tasks = await Task.create_many(
+            "project123", [{"url": "b"}], launch=False, dedup_index=dedup_index
+        )
+        assert tasks == []
+        assert mock_request.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_create_many_queries_index_off_the_event_loop(dedup_index):
+    threads = []
+    filter_new = dedup_index.filter_new
+
+    def recording_filter_new(tasks_data):
+        threads.append(threading.get_ident())
+        return filter_new(tasks_data)
+
+    dedup_index.filter_new = recording_filter_new
+
+    async def mock_post(endpoint, data, api_key=None):
+        assert api_key == "key"
+        return [{"id": "task-a", "project_id": "project123", "fields": {"url": "a"}}]
+
+    with patch(
+        "aiosurge.tasks.Task.post", new_callable=AsyncMock, side_effect=mock_post
+    ):
+        # api_key keeps its position, before the index arguments
+        tasks = await Task.create_many(
+            "project123", [{"url": "a"}], False, "key", dedup_index
+        )
+
+    assert [t.id for t in tasks] == ["task-a"]
+    assert threads and threads[0] != threading.get_ident()
+    assert {"url": "a"} in dedup_index
+
+
+@pytest.mark.asyncio
+async def test_create_tasks_from_ragged_csv(dedup_index, tmp_path):
+    async def mock_post(endpoint, data, api_key=None):
+        return [
+            {"id": f"task-{t['id']}", "project_id": "project123", "fields": t}
+            for t in data["tasks"]
+        ]
+
+    project = Project(id="project123", name="Test")
+    short_rows = tmp_path / "short.csv"
+    short_rows.write_text("id,name\n1,a\n2\n")
+    extra_cells = tmp_path / "extra.csv"
+    extra_cells.write_text("id,name\n1,a\n2,b,extra\n")
+
+    with patch(
+        "aiosurge.tasks.Task.post", new_callable=AsyncMock, side_effect=mock_post
+    ) as mock_request:
+        tasks = await project.create_tasks_from_csv(
+            str(short_rows), dedup_index=dedup_index
+        )
+        assert [t.id for t in tasks] == ["task-1", "task-2"]
+        assert {"id": "2", "name": None} in dedup_index
+
+        with pytest.raises(SurgeTaskDataError):
+            await project.create_tasks_from_csv(
+                str(extra_cells), dedup_index=dedup_index
+            )
+        assert mock_request.await_count == 1
@@ -376,3 +376,16 @@ async def test_update_with_fields_template():
             {"fields_text": "ABC"},
             api_key=None,
         )
+
+
+@pytest.mark.asyncio
+async def test_create_tasks_from_csv_with_positional_api_key(tmp_path):
+    project = Project(id="CREATE_TASKS_FROM_CSV", name="Project with tasks")
+    csv_path = tmp_path / "tasks.csv"
+    csv_path.write_text("url\na\nb\n")
+
+    with patch("aiosurge.tasks.Task.create_many") as mock_create_many:
+        mock_create_many.return_value = []
+        await project.create_tasks_from_csv(str(csv_path), "key")
+        assert mock_create_many.await_args.args[1] == [{"url": "a"}, {"url": "b"}]
+        assert mock_create_many.await_args.kwargs["api_key"] == "key"
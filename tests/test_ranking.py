@@ -0,0 +1,153 @@
+import itertools
+import json
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from aiosurge.questions import RankingQuestion
+from aiosurge.ranking import (
+    collect_rankings,
+    decode_ranking,
+    kendall_tau,
+    ranks_from_groups,
+)
+
+OPTIONS = ["a", "b", "c", "d"]
+QUESTION = RankingQuestion("Rank these", "Ranking", options=OPTIONS)
+TIES_QUESTION = RankingQuestion(
+    "Rank these", "Ranking", options=OPTIONS, allow_ranking_ties=True
+)
+
+
+def record(task_id, worker_id, ranking):
+    return {"task_id": task_id, "worker_id": worker_id, "Rank these": ranking}
+
+
+def test_decode_ranking():
+    assert decode_ranking(None) == []
+    assert decode_ranking(["b", "a"]) == [["b"], ["a"]]
+    assert decode_ranking('[["b", "c"], "a"]') == [["b", "c"], ["a"]]
+    assert decode_ranking("b, c\na") == [["b", "c"], ["a"]]
+    # Options containing commas are kept whole
+    options = ["Paris, France", "Paris, Texas", "Rome"]
+    assert decode_ranking("Rome, Paris, Texas\nParis, France", options) == [
+        ["Rome", "Paris, Texas"],
+        ["Paris, France"],
+    ]
+    assert decode_ranking('"Paris, France", Rome') == [["Paris, France", "Rome"]]
+
+
+def test_ranks_from_groups():
+    groups = [["b", "c"], ["a"]]
+    assert ranks_from_groups(groups, OPTIONS, allow_ties=True)[:3] == [2, 0.5, 0.5]
+    # Without ties, groups are consecutive ranks
+    assert ranks_from_groups(groups, OPTIONS)[:3] == [2, 0, 1]
+    assert np.isnan(ranks_from_groups(groups, OPTIONS)[3])
+
+
+def test_kendall_tau_matches_definition():
+    assert kendall_tau([0, 1, 2, 3], [0, 1, 2, 3]) == pytest.approx(1)
+    assert kendall_tau([0, 1, 2, 3], [3, 2, 1, 0]) == pytest.approx(-1)
+    # scipy.stats.kendalltau([1, 2, 2, 3], [1, 3, 2, 4]) (tau-b)
+    assert kendall_tau([0, 1, 1, 2], [0, 2, 1, 3]) == pytest.approx(0.9128709)
+    assert np.isnan(kendall_tau([0, 0, 0, 0], [0, 1, 2, 3]))
+    # Only options ranked in both vectors are compared
+    assert kendall_tau([0, 1, 2], [0, 1, np.nan]) == pytest.approx(1)
+    assert kendall_tau([2, 1, 0, 3], [np.nan, 1, 0, np.nan]) == pytest.approx(1)
+    assert np.isnan(kendall_tau([0, 1, np.nan], [np.nan, np.nan, 0]))
+
+
+@pytest.mark.asyncio
+async def test_kendall_tau_per_task_with_partial_rankings():
+    records = [
+        record("t1", "w1", ["a", "b", "c", "d"]),
+        record("t1", "w2", ["a", "b"]),
+        record("t1", "w3", ["c", "d"]),
+        record("t2", "w1", ["a", "b", "c", "d"]),
+        record("t2", "w2", ["b", "a"]),
+        record("t3", "w1", ["a"]),
+        record("t3", "w2", ["b"]),
+    ]
+    taus = (await collect_rankings(records, QUESTION)).kendall_tau()
+    # w2 and w3 rank disjoint options, so only their pairs with w1 count
+    assert taus["t1"] == pytest.approx(1)
+    assert taus["t2"] == pytest.approx(-1)
+    assert np.isnan(taus["t3"])
+
+
+@pytest.mark.asyncio
+async def test_borda_and_pairwise_wins():
+    records = [
+        record("t1", "w1", ["a", "b", "c", "d"]),
+        record("t1", "w2", ["b", "a", "c", "d"]),
+        record("t2", "w1", json.dumps([["c", "d"], "a", "b"])),
+        record("t2", "w2", None),
+    ]
+    rankings = await collect_rankings(records, QUESTION)
+    assert len(rankings) == 3
+    assert rankings.rank_matrix()[2].tolist() == [2, 3, 0, 1]
+
+    assert rankings.borda_counts().tolist() == [6, 5, 5, 2]
+    assert rankings.borda_counts(by_task=True).tolist() == [[5, 5, 2, 0], [1, 0, 3, 2]]
+    wins = rankings.pairwise_wins()
+    assert wins[0].tolist() == [0, 2, 2, 2]
+    assert wins[2].tolist() == [1, 1, 0, 3]
+    assert rankings.pairwise_wins(by_task=True)[1, 2].tolist() == [1, 1, 0, 1]
+
+    tied = await collect_rankings(records, TIES_QUESTION)
+    assert tied.rank_matrix()[2].tolist() == [2, 3, 0.5, 0.5]
+    assert tied.borda_counts(by_task=True)[1].tolist() == [1, 0, 2.5, 2.5]
+    # Tied options win against neither, so only the t1 rankings count
+    assert tied.pairwise_wins()[2, 3] == 2
+
+
+@pytest.mark.asyncio
+async def test_pairwise_wins_by_task_in_batches(monkeypatch):
+    records = [
+        record(f"t{i % 3}", f"w{i}", OPTIONS[i % 4 :] + OPTIONS[: i % 4])
+        for i in range(20)
+    ]
+    rankings = await collect_rankings(records, QUESTION)
+    expected = rankings.pairwise_wins(by_task=True)
+
+    monkeypatch.setattr("aiosurge.ranking.RANKING_BATCH_SIZE", 3)
+    by_task = rankings.pairwise_wins(by_task=True)
+    assert by_task.tolist() == expected.tolist()
+    assert by_task.sum(axis=0).tolist() == rankings.pairwise_wins().tolist()
+
+    empty = await collect_rankings([], QUESTION)
+    assert empty.pairwise_wins(by_task=True).shape == (0, 4, 4)
+    assert empty.pairwise_wins().tolist() == np.zeros((4, 4)).tolist()
+
+
+@pytest.mark.asyncio
+async def test_kendall_tau_per_task_matches_pairwise():
+    rng = random.Random(0)
+    records = []
+    for task in range(30):
+        for worker in range(rng.randrange(1, 5)):
+            options = OPTIONS[:]
+            rng.shuffle(options)
+            # Some workers rank only a subset of the options
+            options = options[: rng.choice([2, 3, 4, 4])]
+            groups, i = [], 0
+            while i < len(options):
+                size = rng.choice([1, 1, 2])
+                groups.append(options[i : i + size])
+                i += size
+            records.append(record(f"t{task}", f"w{worker}", groups))
+    rankings = await collect_rankings(records, TIES_QUESTION)
+    taus = rankings.kendall_tau()
+
+    ranks = rankings.rank_matrix()
+    tasks = rankings.task_codes()
+    for code, task_id in enumerate(rankings.task_ids):
+        rows = ranks[tasks == code]
+        pairwise = [kendall_tau(a, b) for a, b in itertools.combinations(rows, 2)]
+        pairwise = [tau for tau in pairwise if not np.isnan(tau)]
+        if pairwise:
+            assert taus[task_id] == pytest.approx(np.mean(pairwise))
+        else:
+            assert np.isnan(taus[task_id])
@@ -0,0 +1,134 @@
+import gzip
+import json
+import os
+from unittest.mock import patch, AsyncMock
+import pytest
+from pytest_httpx import HTTPXMock
+
+from aiosurge.errors import SurgeMissingAttributeError
+from aiosurge.projects import Project
+from aiosurge.report_cache import ReportCache
+
+REPORT_URL = "https://example.com/report.json.gzip"
+
+
+def make_project(**kwargs):
+    return Project(
+        id="project123",
+        name="Test",
+        num_tasks=10,
+        num_responses_completed=5,
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ReportCache(directory=str(tmp_path / "cache"))
+
+
+def test_freshness_requires_attributes():
+    assert ReportCache.freshness(make_project()) != ReportCache.freshness(
+        make_project(num_tasks_completed=1)
+    )
+    with pytest.raises(SurgeMissingAttributeError):
+        ReportCache.freshness(Project(id="project123", name="Test"))
+
+
+@pytest.mark.asyncio
+class TestReportCache:
+    @patch("aiosurge.report_cache.Project.retrieve", new_callable=AsyncMock)
+    @patch("aiosurge.reports.Report._wait_for_report_url", new_callable=AsyncMock)
+    async def test_download_json_uses_cache(
+        self, mock_wait, mock_retrieve, cache, httpx_mock: HTTPXMock
+    ):
+        mock_wait.return_value = REPORT_URL
+        records = [{"id": "1"}, {"id": "2"}]
+        httpx_mock.add_response(
+            url=REPORT_URL, content=gzip.compress(json.dumps(records).encode())
+        )
+        project = make_project()
+        mock_retrieve.return_value = project
+
+        assert await project.download_json(cache=cache) == records
+        # Served from disk the second time, without requesting the report again
+        assert await project.download_json(cache=cache) == records
+        assert mock_wait.await_count == 1
+
+        # Stored compressed, as downloaded
+        path = cache.path(project)
+        with gzip.open(path) as f:
+            assert json.load(f) == records
+
+    @patch("aiosurge.reports.Report._wait_for_report_url", new_callable=AsyncMock)
+    async def test_stale_report_is_replaced(
+        self, mock_wait, cache, httpx_mock: HTTPXMock
+    ):
+        mock_wait.return_value = REPORT_URL
+        httpx_mock.add_response(url=REPORT_URL, content=gzip.compress(b"[1]"))
+        httpx_mock.add_response(url=REPORT_URL, content=gzip.compress(b"[1, 2]"))
+
+        old_project = make_project()
+        assert await cache.download_json(old_project, refresh=False) == [1]
+
+        new_project = make_project()
+        new_project.num_responses_completed = 6
+        assert cache.path(new_project) != cache.path(old_project)
+        assert await cache.download_json(new_project, refresh=False) == [1, 2]
+        assert mock_wait.await_count == 2
+        assert not os.path.exists(cache.path(old_project))
+
+    @patch("aiosurge.report_cache.Project.retrieve", new_callable=AsyncMock)
+    @patch("aiosurge.reports.Report._wait_for_report_url", new_callable=AsyncMock)
+    async def test_fetch_refreshes_project(
+        self, mock_wait, mock_retrieve, cache, httpx_mock: HTTPXMock
+    ):
+        mock_wait.return_value = REPORT_URL
+        httpx_mock.add_response(url=REPORT_URL, content=gzip.compress(b"[1]"))
+        httpx_mock.add_response(url=REPORT_URL, content=gzip.compress(b"[1, 2]"))
+        # The caller keeps the same, outdated Project object between fetches
+        project = make_project()
+
+        mock_retrieve.return_value = make_project()
+        assert await cache.download_json(project) == [1]
+        assert await cache.download_json(project) == [1]
+        assert mock_wait.await_count == 1
+
+        mock_retrieve.return_value = make_project(num_tasks_completed=3)
+        assert await cache.download_json(project) == [1, 2]
+        assert mock_wait.await_count == 2
+        assert mock_retrieve.await_count == 3
+        mock_retrieve.assert_awaited_with("project123", api_key=None)
+
+    @patch("aiosurge.reports.Report._wait_for_report_url", new_callable=AsyncMock)
+    async def test_invalidate(self, mock_wait, cache, httpx_mock: HTTPXMock):
+        mock_wait.return_value = REPORT_URL
+        httpx_mock.add_response(url=REPORT_URL, content=gzip.compress(b"[]"))
+        project = make_project()
+
+        path = await cache.fetch(project, "export_csv", refresh=False)
+        assert os.path.exists(path)
+
+        cache.invalidate(project.id, type="export_json")
+        assert os.path.exists(path)
+        cache.invalidate(project.id)
+        assert not os.path.exists(path)
+        assert cache.size() == 0
+
+    async def test_evict_least_recently_used(self, tmp_path):
+        cache = ReportCache(directory=str(tmp_path / "cache"), max_bytes=250)
+        paths = []
+        for i in range(3):
+            directory = tmp_path / "cache" / f"project{i}"
+            directory.mkdir()
+            path = directory / "export_json-abc.gz"
+            path.write_bytes(b"x" * 100)
+            os.utime(path, (i, i))
+            paths.append(path)
+
+        cache._evict(keep=str(paths[2]))
+
+        assert not paths[0].exists()
+        assert paths[1].exists()
+        assert paths[2].exists()
+        assert cache.size() == 200
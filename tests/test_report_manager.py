@@ -0,0 +1,86 @@
+import gzip
+from unittest.mock import patch, AsyncMock
+import pytest
+from pytest_httpx import HTTPXMock
+
+from aiosurge.report_manager import ReportJob, ReportManager
+
+
+class MockResponse:
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+@pytest.mark.asyncio
+class TestReportManager:
+    @patch("aiosurge.reports.Report.status", new_callable=AsyncMock)
+    @patch("aiosurge.reports.Report.request", new_callable=AsyncMock)
+    async def test_run(
+        self, mock_request, mock_status, httpx_mock: HTTPXMock, tmp_path
+    ):
+        requests = {
+            "p1": MockResponse(status="READY", url="https://example.com/p1.gzip"),
+            "p2": MockResponse(status="CREATING", job_id="job2"),
+            "p3": MockResponse(status="CREATING", job_id="job3"),
+        }
+        statuses = {
+            "job2": [
+                MockResponse(status="IN_PROGRESS"),
+                MockResponse(status="COMPLETED", url="https://example.com/p2.gzip"),
+            ],
+            "job3": [MockResponse(status="ERROR", type="export_csv")],
+        }
+        mock_request.side_effect = lambda project_id, type, api_key=None: requests[
+            project_id
+        ]
+        mock_status.side_effect = lambda project_id, job_id, api_key=None: statuses[
+            job_id
+        ].pop(0)
+        httpx_mock.add_response(
+            url="https://example.com/p1.gzip", content=gzip.compress(b"p1 data")
+        )
+        httpx_mock.add_response(
+            url="https://example.com/p2.gzip", content=gzip.compress(b"p2 data")
+        )
+
+        updates = []
+        manager = ReportManager(
+            poll_initial_delay=0.01,
+            max_bytes_per_second=10**6,
+            on_progress=lambda job, progress: updates.append(
+                (job.project_id, job.status)
+            ),
+        )
+        jobs = await manager.run(
+            [
+                ("p1", "export_json", str(tmp_path / "p1.json")),
+                ReportJob("p2", "export_csv", str(tmp_path / "p2.csv")),
+                ("p3", "export_csv", str(tmp_path / "p3.csv")),
+            ]
+        )
+
+        assert [job.status for job in jobs] == ["COMPLETED", "COMPLETED", "FAILED"]
+        assert (tmp_path / "p1.json").read_bytes() == b"p1 data"
+        assert (tmp_path / "p2.csv").read_bytes() == b"p2 data"
+        assert isinstance(jobs[2].error, ValueError)
+        assert jobs[0].bytes_downloaded == len(gzip.compress(b"p1 data"))
+        assert mock_request.await_count == 3
+        assert mock_status.await_count == 3
+        assert ("p2", "GENERATING") in updates
+        assert ("p2", "DOWNLOADING") in updates
+        assert updates[-1][1] == "COMPLETED"
+
+    @patch("aiosurge.reports.Report.status", new_callable=AsyncMock)
+    @patch("aiosurge.reports.Report.request", new_callable=AsyncMock)
+    async def test_run_timeout(self, mock_request, mock_status, tmp_path):
+        mock_request.return_value = MockResponse(status="CREATING", job_id="job1")
+        mock_status.return_value = MockResponse(status="IN_PROGRESS")
+
+        manager = ReportManager(poll_time=0.1, poll_initial_delay=0.01)
+        [job] = await manager.run([("p1", "export_json", str(tmp_path / "p1.json"))])
+
+        assert job.status == "FAILED"
+        assert "within 0.1 seconds" in str(job.error)
+        # Exponential backoff keeps the number of status checks low
+        assert mock_status.await_count <= 4
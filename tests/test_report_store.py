@@ -0,0 +1,107 @@
+from unittest.mock import patch
+import pytest
+from aiofiles.threadpool.binary import AsyncBufferedIOBase
+
+from aiosurge.report_store import ReportStore
+
+RECORDS = [
+    {"task_id": "t1", "worker_id": "w1", "Sentiment": "pos"},
+    {"task_id": "t2", "worker_id": "w1", "Sentiment": "neg"},
+    {"task_id": "t1", "worker_id": "w2", "Sentiment": "neutral"},
+    {"id": "t3", "responses": [{"worker_id": "w3", "data": {"Sentiment": "pos"}}]},
+]
+
+
+@pytest.mark.asyncio
+async def test_build_and_get(tmp_path):
+    path = str(tmp_path / "report.jsonl")
+
+    async def stream():
+        for record in RECORDS:
+            yield record
+
+    with await ReportStore.build(stream(), path) as store:
+        assert len(store) == 4
+        assert store.get("t1") == [RECORDS[0], RECORDS[2]]
+        assert store.get("t3") == [RECORDS[3]]
+        assert store.get("missing") == []
+        assert "t2" in store
+        assert "missing" not in store
+        assert list(store) == RECORDS
+
+    # The store can be reopened without rebuilding it
+    with ReportStore(path) as store:
+        assert store.get_raw("t2") == [
+            b'{"task_id": "t2", "worker_id": "w1", "Sentiment": "neg"}'
+        ]
+
+
+@pytest.mark.asyncio
+async def test_build_with_key(tmp_path):
+    rows = [{"Task ID": str(i), "Answer": str(i * 2)} for i in range(1000)]
+
+    store = await ReportStore.build(
+        rows, str(tmp_path / "rows.jsonl"), key=lambda row: row["Task ID"]
+    )
+
+    assert all(store.get(str(i)) == [rows[i]] for i in range(1000))
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_build_buffered_writes(tmp_path, monkeypatch):
+    rows = [{"task_id": str(i % 7), "Answer": "é" * i} for i in range(200)]
+    writes = []
+    write = AsyncBufferedIOBase.write
+
+    async def counting_write(self, data):
+        writes.append(len(data))
+        return await write(self, data)
+
+    monkeypatch.setattr(AsyncBufferedIOBase, "write", counting_write)
+    path = str(tmp_path / "buffered.jsonl")
+    with await ReportStore.build(rows, path, buffer_size=4096) as store:
+        assert list(store) == rows
+        assert store.get("3") == [row for row in rows if row["task_id"] == "3"]
+    # The records are written in a few chunks, then the index header and entries
+    assert 2 < len(writes) < 40
+
+
+@pytest.mark.asyncio
+async def test_build_empty(tmp_path):
+    store = await ReportStore.build([], str(tmp_path / "empty.jsonl"))
+
+    assert len(store) == 0
+    assert store.get("t1") == []
+    assert list(store) == []
+    store.close()
+
+
+def test_invalid_index(tmp_path):
+    path = tmp_path / "report.jsonl"
+    path.write_bytes(b"{}\n")
+    (tmp_path / "report.jsonl.idx").write_bytes(b"not an index file")
+
+    with pytest.raises(ValueError):
+        ReportStore(str(path))
+
+
+@pytest.mark.asyncio
+@patch("aiosurge.report_store.Report.stream_csv")
+@patch("aiosurge.report_store.Report.stream_json")
+async def test_from_report(mock_stream_json, mock_stream_csv, tmp_path):
+    mock_stream_json.return_value = iter(RECORDS)
+    mock_stream_csv.return_value = iter([{"id": "t9"}])
+
+    store = await ReportStore.from_report("project123", str(tmp_path / "a.jsonl"))
+    assert store.get("t2") == [RECORDS[1]]
+    store.close()
+
+    store = await ReportStore.from_report(
+        "project123", str(tmp_path / "b.jsonl"), type="export_csv"
+    )
+    assert store.get("t9") == [{"id": "t9"}]
+    mock_stream_csv.assert_called_once_with(
+        "project123", "export_csv", poll_time=5 * 60, api_key=None
+    )
+    store.close()
@@ -1,9 +1,13 @@
+import asyncio
+import gzip
 import json
 import io
 from unittest.mock import patch, AsyncMock, MagicMock
 import pytest
 
-from aiosurge.reports import Report
+from aiosurge.errors import SurgeRequestError
+from aiosurge.reports import REPORT_DOWNLOAD_RETRY_DELAY, Report
+from aiosurge.utils import decompress_gzip_stream
 
 
 class MockResponse:
@@ -13,11 +17,17 @@ class MockResponse:
 
 
 class MockStreamResponse:
-    def __init__(self, content=b"test data"):
-        self.content = content
+    def __init__(self, content=b"test data", chunks=None):
+        self.chunks = chunks if chunks is not None else [content]
+        self.status_code = 200
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
 
     async def aiter_bytes(self):
-        yield self.content
+        for chunk in self.chunks:
+            yield chunk
 
     async def __aenter__(self):
         return self
@@ -37,6 +47,84 @@ class MockAsyncContextManager:
         pass
 
 
+class RangeServer:
+    """Local stand-in for a presigned report URL that supports Range requests."""
+
+    def __init__(
+        self, payload, drop_after=(), expire_on_drop=False, ranges=True, chunked=False
+    ):
+        self.payload = payload
+        # Number of body bytes sent before dropping the connection, one entry per request
+        self.drop_after = list(drop_after)
+        # Whether a URL expires once its connection was dropped
+        self.expire_on_drop = expire_on_drop
+        self.expired_paths = set()
+        self.ranges = ranges
+        # Send the body as one chunk, so a dropped connection is noticed after its last byte
+        self.chunked = chunked
+        self.requests = []
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def url(self, path="/report.gz"):
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    async def handle(self, reader, writer):
+        head = (await reader.readuntil(b"\r\n\r\n")).decode()
+        lines = head.split("\r\n")
+        path = lines[0].split(" ")[1]
+        headers = dict(line.split(": ", 1) for line in lines[1:] if line)
+        requested_range = headers.get("range") or headers.get("Range")
+        self.requests.append((path, requested_range))
+
+        start = 0
+        if requested_range and self.ranges:
+            start = int(requested_range[len("bytes=") :].rstrip("-"))
+        if path in self.expired_paths:
+            writer.write(
+                b"HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+            )
+        elif start >= len(self.payload):
+            writer.write(
+                (
+                    f"HTTP/1.1 416 Range Not Satisfiable\r\nContent-Range: bytes */{len(self.payload)}\r\n"
+                    "Content-Length: 0\r\nConnection: close\r\n\r\n"
+                ).encode()
+            )
+        else:
+            status = "200 OK"
+            headers = 'ETag: "v1"\r\nConnection: close\r\n'
+            if requested_range and self.ranges:
+                status = "206 Partial Content"
+                headers += f"Content-Range: bytes {start}-{len(self.payload) - 1}/{len(self.payload)}\r\n"
+            body = self.payload[start:]
+            if self.chunked:
+                headers += "Transfer-Encoding: chunked\r\n"
+            else:
+                headers += f"Content-Length: {len(body)}\r\n"
+            writer.write(f"HTTP/1.1 {status}\r\n{headers}\r\n".encode())
+            dropped = bool(self.drop_after)
+            if dropped:
+                body = body[: self.drop_after.pop(0)]
+                if self.expire_on_drop:
+                    self.expired_paths.add(path)
+            if self.chunked:
+                writer.write(b"%x\r\n%s\r\n" % (len(body), body))
+                if not dropped:
+                    writer.write(b"0\r\n\r\n")
+            else:
+                writer.write(body)
+        await writer.drain()
+        writer.close()
+
+
 @pytest.fixture
 def ready_report_response():
     return MockResponse(
@@ -58,35 +146,23 @@ class TestReport:
 
         with (
             patch("httpx.AsyncClient") as mock_client,
-            patch("aiosurge.reports.tempfile.NamedTemporaryFile") as mock_tempfile,
-            patch("aiosurge.reports.gzip.open") as mock_gzip_open,
             patch("aiofiles.open") as mock_aiofiles_open,
         ):
 
             # Mock HTTP stream
-            mock_stream_response = MockStreamResponse(b"compressed data")
+            mock_stream_response = MockStreamResponse(
+                gzip.compress(b"decompressed data")
+            )
             client_instance = AsyncMock()
             client_instance.stream = MagicMock(return_value=mock_stream_response)
             mock_client.return_value = MockAsyncContextManager(client_instance)
 
-            # Mock tempfile
-            tmp_file = MagicMock()
-            tmp_file.name = "/tmp/temp_file"
-            mock_tempfile.return_value.__enter__.return_value = tmp_file
-
-            # Mock gzip
-            gzip_file = MagicMock()
-            gzip_file.read.return_value = b"decompressed data"
-            mock_gzip_open.return_value.__enter__.return_value = gzip_file
-
             # Mock final file write
             aio_file = AsyncMock()
             mock_aiofiles_open.return_value.__aenter__.return_value = aio_file
 
             yield {
                 "client": client_instance,
-                "tmp_file": tmp_file,
-                "gzip_file": gzip_file,
                 "aio_file": aio_file,
             }
 
@@ -101,44 +177,204 @@ class TestReport:
         )
 
         setup_save_mocks["client"].stream.assert_called_once()
-        setup_save_mocks["tmp_file"].write.assert_called_with(b"compressed data")
-        setup_save_mocks["gzip_file"].read.assert_called_once()
         setup_save_mocks["aio_file"].write.assert_awaited_once_with(
             b"decompressed data"
         )
 
+    @patch("aiosurge.reports.Report.request", new_callable=AsyncMock)
+    async def test_save_report_streams_chunks(
+        self, mock_request, setup_save_mocks, ready_report_response
+    ):
+        mock_request.return_value = ready_report_response
+        data = b"".join(b'{"id": "%d"}\n' % i for i in range(20000))
+        compressed = gzip.compress(data)
+        stream_response = MockStreamResponse(
+            chunks=[compressed[i : i + 1000] for i in range(0, len(compressed), 1000)]
+        )
+        setup_save_mocks["client"].stream.return_value = stream_response
+
+        output = io.BytesIO()
+        await Report.save_report(
+            project_id="project123", type="export_json", filepath=output
+        )
+
+        assert output.getvalue() == data
+
+    async def test_decompress_gzip_stream_multiple_members(self):
+        compressed = gzip.compress(b"first ") + gzip.compress(b"second")
+        stream_response = MockStreamResponse(
+            chunks=[compressed[i : i + 7] for i in range(0, len(compressed), 7)]
+        )
+
+        chunks = [
+            c async for c in decompress_gzip_stream(stream_response.aiter_bytes())
+        ]
+        assert b"".join(chunks) == b"first second"
+
+    async def test_decompress_gzip_stream_truncated(self):
+        compressed = gzip.compress(b"some report data")
+        stream_response = MockStreamResponse(compressed[:-10])
+
+        with pytest.raises(EOFError):
+            async for _ in decompress_gzip_stream(stream_response.aiter_bytes()):
+                pass
+
+    @patch("aiosurge.reports.Report.request", new_callable=AsyncMock)
+    async def test_stream_json(
+        self, mock_request, setup_save_mocks, ready_report_response
+    ):
+        mock_request.return_value = ready_report_response
+        records = [{"id": str(i), "text": "x" * (i % 50)} for i in range(500)]
+        compressed = gzip.compress(json.dumps(records).encode())
+        setup_save_mocks["client"].stream.return_value = MockStreamResponse(
+            chunks=[compressed[i : i + 100] for i in range(0, len(compressed), 100)]
+        )
+
+        result = [record async for record in Report.stream_json("project123")]
+
+        assert result == records
+        assert mock_request.await_args.kwargs["type"] == "export_json"
+
+    @pytest.mark.parametrize(
+        "as_dict,batch_size,expected",
+        [
+            (True, None, [{"id": "1", "text": "a,\nb"}, {"id": "2", "text": "c"}]),
+            (False, None, [["id", "text"], ["1", "a,\nb"], ["2", "c"]]),
+            (True, 1, [[{"id": "1", "text": "a,\nb"}], [{"id": "2", "text": "c"}]]),
+            (False, 2, [[["id", "text"], ["1", "a,\nb"]], [["2", "c"]]]),
+        ],
+    )
+    @patch("aiosurge.reports.Report.request", new_callable=AsyncMock)
+    async def test_stream_csv(
+        self,
+        mock_request,
+        setup_save_mocks,
+        ready_report_response,
+        as_dict,
+        batch_size,
+        expected,
+    ):
+        mock_request.return_value = ready_report_response
+        compressed = gzip.compress(b'id,text\r\n1,"a,\nb"\r\n2,c\r\n')
+        setup_save_mocks["client"].stream.return_value = MockStreamResponse(
+            chunks=[compressed[i : i + 5] for i in range(0, len(compressed), 5)]
+        )
+
+        result = [
+            row
+            async for row in Report.stream_csv(
+                "project123",
+                type="export_csv_flattened",
+                as_dict=as_dict,
+                batch_size=batch_size,
+            )
+        ]
+
+        assert result == expected
+        assert mock_request.await_args.kwargs["type"] == "export_csv_flattened"
+
+    async def test_stream_csv_invalid_type(self):
+        with pytest.raises(ValueError):
+            async for _ in Report.stream_csv("project123", type="export_json"):
+                pass
+
+    @patch("aiosurge.reports.Report.status", new_callable=AsyncMock)
     @patch("aiosurge.reports.Report.request", new_callable=AsyncMock)
     @patch("aiosurge.reports.asyncio.sleep", new_callable=AsyncMock)
     async def test_creating_then_ready(
         self,
         mock_sleep,
         mock_request,
+        mock_status,
         setup_save_mocks,
         creating_report_response,
         ready_report_response,
     ):
-        mock_request.side_effect = [creating_report_response, ready_report_response]
+        mock_request.return_value = creating_report_response
+        mock_status.side_effect = [
+            MockResponse(status="IN_PROGRESS"),
+            MockResponse(status="RETRYING", job_id="job456"),
+            MockResponse(status="IN_PROGRESS"),
+            MockResponse(status="COMPLETED", url="https://example.com/report.gzip"),
+        ]
+
+        await Report.save_report("project123", "export_json")
+
+        # The report is requested once, then only its job status is polled
+        assert mock_request.await_count == 1
+        assert [c.args[1] for c in mock_status.await_args_list] == [
+            "job123",
+            "job123",
+            "job456",
+            "job456",
+        ]
+        assert [c.args[0] for c in mock_sleep.await_args_list] == [1, 2, 4, 8]
+        setup_save_mocks["client"].stream.assert_called_once_with(
+            "GET", "https://example.com/report.gzip"
+        )
+
+    @patch("aiosurge.reports.Report.request", new_callable=AsyncMock)
+    @patch("aiosurge.reports.asyncio.sleep", new_callable=AsyncMock)
+    async def test_creating_without_job_id(
+        self, mock_sleep, mock_request, setup_save_mocks, ready_report_response
+    ):
+        mock_request.side_effect = [
+            MockResponse(status="CREATING"),
+            ready_report_response,
+        ]
 
         await Report.save_report("project123", "export_json")
 
         assert mock_request.await_count == 2
-        mock_sleep.assert_called_once_with(2)
+        mock_sleep.assert_awaited_once_with(1)
 
+    @patch("aiosurge.reports.Report.status", new_callable=AsyncMock)
     @patch("aiosurge.reports.Report.request", new_callable=AsyncMock)
-    async def test_report_status_error(self, mock_request):
+    async def test_report_status_error(self, mock_request, mock_status):
         mock_request.return_value = MockResponse(status="ERROR")
 
         with pytest.raises(ValueError):
             await Report.save_report("project123", "export_json")
 
+        mock_request.return_value = MockResponse(status="CREATING", job_id="job123")
+        mock_status.return_value = MockResponse(status="ERROR", type="export_json")
+
+        with pytest.raises(ValueError):
+            await Report.save_report("project123", "export_json", poll_time=2)
+
+    @patch("aiosurge.reports.Report.status", new_callable=AsyncMock)
     @patch("aiosurge.reports.Report.request", new_callable=AsyncMock)
-    async def test_report_timeout(self, mock_request):
+    @patch("aiosurge.reports.asyncio.sleep", new_callable=AsyncMock)
+    async def test_report_timeout(self, mock_sleep, mock_request, mock_status):
         mock_request.return_value = MockResponse(status="CREATING", job_id="job123")
+        mock_status.return_value = MockResponse(status="IN_PROGRESS")
 
         with pytest.raises(
-            Exception, match="Report failed to generate within 2 seconds"
+            Exception, match="Report failed to generate within 10 seconds"
         ):
-            await Report.save_report("project123", "export_json", poll_time=2)
+            await Report.save_report("project123", "export_json", poll_time=10)
+
+        # The last delay is capped by the time remaining
+        assert [c.args[0] for c in mock_sleep.await_args_list] == [1, 2, 4, 3]
+
+    @patch("aiosurge.reports.Report.post", new_callable=AsyncMock)
+    @patch("aiosurge.reports.Report.get", new_callable=AsyncMock)
+    async def test_request_and_status(self, mock_get, mock_post):
+        mock_post.return_value = {"status": "CREATING", "job_id": "job123"}
+        mock_get.return_value = {"status": "IN_PROGRESS"}
+
+        response = await Report.request("project123", "export_json")
+        assert response.status == "CREATING"
+        assert response.job_id == "job123"
+        mock_post.assert_awaited_once_with(
+            "projects/project123/report", {"report_type": "export_json"}, api_key=None
+        )
+
+        response = await Report.status("project123", "job123")
+        assert response.status == "IN_PROGRESS"
+        mock_get.assert_awaited_once_with(
+            "projects/project123/report_status", {"job_id": "job123"}, api_key=None
+        )
 
     @pytest.mark.parametrize(
         "json_data",
@@ -170,3 +406,93 @@ class TestReport:
         result = await Report.download_json("project123", poll_time=99)
 
         assert result == [{"id": "1"}]
+
+
+@pytest.mark.asyncio
+@patch("aiosurge.reports.asyncio.sleep", new_callable=AsyncMock)
+class TestResumableDownload:
+    payload = b"".join(b'{"id": "%d"},' % i for i in range(20000))
+
+    async def test_resumes_with_range_after_connection_drop(self, mock_sleep):
+        compressed = gzip.compress(self.payload)
+        async with RangeServer(compressed, drop_after=[1000, 5000]) as server:
+            output = io.BytesIO()
+            await Report._download(server.url(), output)
+
+        assert output.getvalue() == self.payload
+        assert server.requests == [
+            ("/report.gz", None),
+            ("/report.gz", "bytes=1000-"),
+            ("/report.gz", "bytes=6000-"),
+        ]
+        assert mock_sleep.await_count == 2
+
+    async def test_skips_received_bytes_without_range_support(self, mock_sleep):
+        compressed = gzip.compress(self.payload)
+        async with RangeServer(compressed, drop_after=[1000], ranges=False) as server:
+            output = io.BytesIO()
+            await Report._download(server.url(), output)
+
+        assert output.getvalue() == self.payload
+        assert len(server.requests) == 2
+
+    async def test_refreshes_expired_url(self, mock_sleep):
+        compressed = gzip.compress(self.payload)
+        async with RangeServer(
+            compressed, drop_after=[1000], expire_on_drop=True
+        ) as server:
+
+            async def refresh_url():
+                return server.url("/new.gz")
+
+            output = io.BytesIO()
+            await Report._download(server.url(), output, refresh_url=refresh_url)
+
+        assert output.getvalue() == self.payload
+        assert server.requests == [
+            ("/report.gz", None),
+            ("/report.gz", "bytes=1000-"),
+            ("/new.gz", "bytes=1000-"),
+        ]
+
+    async def test_gives_up_after_max_retries(self, mock_sleep):
+        compressed = gzip.compress(self.payload)
+        async with RangeServer(compressed, drop_after=[100] + [0] * 3) as server:
+            with pytest.raises(SurgeRequestError):
+                async for _ in Report._iter_compressed_chunks(
+                    server.url(), max_retries=2
+                ):
+                    pass
+        assert len(server.requests) == 3
+
+    async def test_retries_reset_when_bytes_arrive(self, mock_sleep):
+        compressed = gzip.compress(self.payload)
+        # More drops than max_retries, but each one after some progress
+        async with RangeServer(compressed, drop_after=[100] * 5) as server:
+            output = io.BytesIO()
+            async for chunk in Report._iter_compressed_chunks(
+                server.url(), max_retries=2
+            ):
+                output.write(chunk)
+
+        assert output.getvalue() == compressed
+        assert len(server.requests) == 6
+        # The backoff starts over after every drop
+        assert {call.args[0] for call in mock_sleep.await_args_list} == {
+            REPORT_DOWNLOAD_RETRY_DELAY
+        }
+
+    async def test_range_not_satisfiable_after_last_byte(self, mock_sleep):
+        compressed = gzip.compress(self.payload)
+        # The connection drops after the last byte, before the end of the response
+        async with RangeServer(
+            compressed, drop_after=[len(compressed)], chunked=True
+        ) as server:
+            output = io.BytesIO()
+            await Report._download(server.url(), output)
+
+        assert output.getvalue() == self.payload
+        assert server.requests == [
+            ("/report.gz", None),
+            ("/report.gz", f"bytes={len(compressed)}-"),
+        ]
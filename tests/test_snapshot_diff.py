@@ -0,0 +1,127 @@
+import pytest
+
+from aiosurge.snapshot_diff import SnapshotFingerprint, iter_changed_records
+
+OLD = [
+    {"task_id": "t1", "response_id": "r1", "worker_id": "w1", "Sentiment": "pos"},
+    {"task_id": "t1", "response_id": "r2", "worker_id": "w2", "Sentiment": "neg"},
+    {"task_id": "t2", "response_id": "r3", "worker_id": "w1", "Sentiment": "pos"},
+    {"task_id": "t3", "response_id": "r4", "worker_id": "w1", "Sentiment": "neg"},
+]
+NEW = [
+    {"task_id": "t1", "response_id": "r1", "worker_id": "w1", "Sentiment": "pos"},
+    {"task_id": "t1", "response_id": "r2", "worker_id": "w2", "Sentiment": "pos"},
+    {"task_id": "t2", "response_id": "r3", "worker_id": "w1", "Sentiment": "pos"},
+    {"task_id": "t2", "response_id": "r5", "worker_id": "w3", "Sentiment": "pos"},
+    {"task_id": "t4", "response_id": "r6", "worker_id": "w1", "Sentiment": "neg"},
+]
+
+
+async def stream(records):
+    for record in records:
+        yield record
+
+
+@pytest.mark.asyncio
+async def test_diff():
+    old = await SnapshotFingerprint.build(stream(OLD))
+    new = await SnapshotFingerprint.build(NEW)
+
+    diff = old.diff(new)
+
+    assert diff.added_tasks == ["t4"]
+    assert diff.removed_tasks == ["t3"]
+    assert diff.changed_tasks == ["t1", "t2"]
+    assert diff.added_responses == [("t2", "r5"), ("t4", "r6")]
+    assert diff.removed_responses == [("t3", "r4")]
+    assert diff.changed_responses == [("t1", "r2")]
+    assert not new.diff(await SnapshotFingerprint.build(NEW))
+
+
+@pytest.mark.asyncio
+async def test_diff_task_records():
+    old = await SnapshotFingerprint.build(
+        [
+            {
+                "id": "t1",
+                "fields": {"text": "a"},
+                "responses": [{"id": "r1", "data": {}}],
+            },
+            {
+                "id": "t2",
+                "fields": {"text": "b"},
+                "responses": [{"id": "r2", "data": {}}],
+            },
+        ]
+    )
+    new = await SnapshotFingerprint.build(
+        [
+            {
+                "id": "t1",
+                "fields": {"text": "changed"},
+                "responses": [{"id": "r1", "data": {}}],
+            },
+            {"id": "t2", "fields": {"text": "b"}, "responses": []},
+        ]
+    )
+
+    diff = old.diff(new)
+
+    assert diff.changed_tasks == ["t1", "t2"]
+    assert diff.changed_responses == []
+    assert diff.removed_responses == [("t2", "r2")]
+
+
+@pytest.mark.asyncio
+async def test_iter_changed_records():
+    previous = await SnapshotFingerprint.build(OLD)
+    fingerprint = SnapshotFingerprint()
+
+    changed = [
+        record
+        async for record in iter_changed_records(previous, stream(NEW), fingerprint)
+    ]
+
+    assert changed == [NEW[1], NEW[3], NEW[4]]
+    assert previous.diff(fingerprint).removed_tasks == ["t3"]
+
+
+@pytest.mark.asyncio
+async def test_responses_without_ids_are_keyed_by_position():
+    old = [
+        {"task_id": "t1", "Sentiment": "pos"},
+        {"task_id": "t1", "Sentiment": "neg"},
+        {"task_id": "t2", "Sentiment": "pos"},
+    ]
+    new = [
+        {"task_id": "t1", "Sentiment": "pos"},
+        {"task_id": "t1", "Sentiment": "pos"},
+        {"task_id": "t2", "Sentiment": "pos"},
+        {"task_id": "t2", "Sentiment": "neg"},
+    ]
+    previous = await SnapshotFingerprint.build(old)
+
+    changed = [record async for record in iter_changed_records(previous, new)]
+
+    assert changed == [new[1], new[3]]
+    diff = previous.diff(await SnapshotFingerprint.build(new))
+    assert diff.changed_responses == [("t1", "#1")]
+    assert diff.added_responses == [("t2", "#1")]
+
+
+@pytest.mark.asyncio
+async def test_save_and_load(tmp_path):
+    fingerprint = await SnapshotFingerprint.build(
+        OLD + [{"id": "t9", "fields": {"a": 1}, "responses": []}]
+    )
+    path = str(tmp_path / "snapshot.sqlite3")
+    fingerprint.save(path)
+
+    loaded = SnapshotFingerprint.load(path)
+
+    assert len(loaded) == 4
+    assert not fingerprint.diff(loaded)
+    assert loaded.diff(await SnapshotFingerprint.build(NEW)).changed_tasks == [
+        "t1",
+        "t2",
+    ]
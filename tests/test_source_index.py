@@ -0,0 +1,179 @@
+from unittest.mock import patch, AsyncMock
+import pytest
+
+from aiosurge.errors import SurgeTaskDataError
+from aiosurge.projects import Project
+from aiosurge.source_index import SourceKeyIndex, join_source_rows
+from aiosurge.tasks import Task
+
+
+@pytest.fixture
+def source_index(tmp_path):
+    index = SourceKeyIndex(str(tmp_path / "sources.sqlite3"), key="row_id")
+    yield index
+    index.close()
+
+
+def mock_create_tasks():
+    async def mock_post(endpoint, data, api_key=None):
+        return [
+            {"id": f"task-{t['row_id']}", "project_id": "project123", "fields": t}
+            for t in data["tasks"]
+        ]
+
+    return patch(
+        "aiosurge.tasks.Task.post", new_callable=AsyncMock, side_effect=mock_post
+    )
+
+
+def test_row_keys(tmp_path):
+    row = {"row_id": "1", "lang": "en", "text": "hi"}
+    with SourceKeyIndex(str(tmp_path / "a.sqlite3")) as index:
+        assert index.row_key(row) == index.row_key(dict(reversed(row.items())))
+    with SourceKeyIndex(str(tmp_path / "b.sqlite3"), key=["row_id", "lang"]) as index:
+        assert index.row_key(row) == '["1", "en"]'
+    with SourceKeyIndex(str(tmp_path / "c.sqlite3"), key=lambda r: r["text"]) as index:
+        assert index.row_key(row) == "hi"
+
+
+@pytest.mark.asyncio
+async def test_create_many_records_task_ids(source_index):
+    with mock_create_tasks():
+        await Task.create_many(
+            "project123",
+            [{"row_id": "1"}, {"row_id": "2"}],
+            launch=False,
+            source_index=source_index,
+        )
+
+    assert len(source_index) == 2
+    assert source_index.task_id("2") == "task-2"
+    assert source_index.source_key("task-1") == "1"
+    assert "3" not in source_index
+
+
+@pytest.mark.asyncio
+async def test_create_many_with_positional_api_key(source_index):
+    with mock_create_tasks() as mock_post:
+        await Task.create_many(
+            "project123", [{"row_id": "1"}], False, "key", source_index=source_index
+        )
+
+    assert mock_post.await_args.kwargs["api_key"] == "key"
+    assert source_index.task_id("1") == "task-1"
+
+
+@pytest.mark.asyncio
+async def test_create_many_checks_source_keys_first(source_index):
+    for tasks_data in ([{"row_id": "1"}, {"text": "no key"}], [{"row_id": "1"}] * 2):
+        with mock_create_tasks() as mock_post:
+            with pytest.raises(SurgeTaskDataError):
+                await Task.create_many(
+                    "project123", tasks_data, launch=False, source_index=source_index
+                )
+        mock_post.assert_not_awaited()
+    assert len(source_index) == 0
+
+
+@pytest.mark.asyncio
+async def test_create_many_records_unmatched_counts(source_index):
+    async def mock_post(endpoint, data, api_key=None):
+        # One of the tasks was not created
+        return [
+            {"id": f"task-{t['row_id']}", "project_id": "project123", "fields": t}
+            for t in data["tasks"][1:]
+        ]
+
+    with patch(
+        "aiosurge.tasks.Task.post", new_callable=AsyncMock, side_effect=mock_post
+    ):
+        tasks = await Task.create_many(
+            "project123",
+            [{"row_id": "1"}, {"row_id": "2"}, {"row_id": "3"}],
+            launch=False,
+            source_index=source_index,
+        )
+
+    assert len(tasks) == 2
+    assert dict(source_index.items()) == {"2": "task-2", "3": "task-3"}
+
+
+@pytest.mark.asyncio
+async def test_create_tasks_from_ragged_csv(tmp_path):
+    csv_path = tmp_path / "tasks.csv"
+    csv_path.write_text("row_id,text\n1,a\n2\n")
+    project = Project(id="project123", name="Test")
+
+    with SourceKeyIndex(str(tmp_path / "sources.sqlite3")) as index:
+        with mock_create_tasks():
+            await project.create_tasks_from_csv(str(csv_path), source_index=index)
+        assert index.task_id(index.row_key({"row_id": "2", "text": None})) == "task-2"
+
+        csv_path.write_text("row_id,text\n3,c\n4,d,extra\n")
+        with mock_create_tasks() as mock_post:
+            with pytest.raises(SurgeTaskDataError):
+                await project.create_tasks_from_csv(str(csv_path), source_index=index)
+        mock_post.assert_not_awaited()
+        assert len(index) == 2
+
+
+@pytest.mark.asyncio
+async def test_join_ragged_csv_rows(tmp_path):
+    csv_path = tmp_path / "tasks.csv"
+    csv_path.write_text("row_id,text\n1,a\n\n2\n")
+    project = Project(id="project123", name="Test")
+    records = [{"task_id": "task-2", "response_id": "r1"}]
+
+    # Rows are keyed by a digest of the whole row, so short rows must be read like when uploaded
+    with SourceKeyIndex(str(tmp_path / "sources.sqlite3")) as index:
+        with mock_create_tasks():
+            await project.create_tasks_from_csv(str(csv_path), source_index=index)
+        pairs = [pair async for pair in join_source_rows(records, str(csv_path), index)]
+
+    assert [row for _, row in pairs] == [{"row_id": "2", "text": None}]
+
+
+def test_index_is_persistent(tmp_path):
+    path = str(tmp_path / "sources.sqlite3")
+    with SourceKeyIndex(path, key="row_id") as index:
+        index.add([{"row_id": "1"}], ["task-1"])
+    with SourceKeyIndex(path, key="row_id") as index:
+        assert index.task_id("1") == "task-1"
+
+
+@pytest.mark.asyncio
+async def test_join_csv_rows(tmp_path, source_index):
+    csv_path = tmp_path / "tasks.csv"
+    csv_path.write_text('row_id,text\n1,"a, b"\n2,c\n3,d\n')
+    project = Project(id="project123", name="Test")
+
+    with mock_create_tasks():
+        await project.create_tasks_from_csv(str(csv_path), source_index=source_index)
+    assert len(source_index) == 3
+
+    records = [
+        {"task_id": "task-3", "response_id": "r1", "Answer": "x"},
+        {"task_id": "task-1", "response_id": "r2", "Answer": "y"},
+        {"task_id": "task-9", "response_id": "r3", "Answer": "z"},
+        {"task_id": "task-3", "response_id": "r4", "Answer": "w"},
+    ]
+    pairs = [
+        pair async for pair in join_source_rows(records, str(csv_path), source_index)
+    ]
+    assert [(record["response_id"], row) for record, row in pairs] == [
+        ("r1", {"row_id": "3", "text": "d"}),
+        ("r2", {"row_id": "1", "text": "a, b"}),
+        ("r4", {"row_id": "3", "text": "d"}),
+    ]
+
+    source_rows = [{"row_id": "1", "text": "a, b"}]
+    tasks = [Task(id="task-1", project_id="project123"), {"id": "task-2"}]
+    pairs = [
+        pair
+        async for pair in join_source_rows(tasks, source_rows, source_index, how="left")
+    ]
+    assert [row for _, row in pairs] == [source_rows[0], None]
+
+    with pytest.raises(ValueError):
+        async for _ in join_source_rows(records, source_rows, source_index, "outer"):
+            pass
@@ -0,0 +1,165 @@
+import json
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from aiosurge.questions import TextTaggingQuestion
+from aiosurge.records import iter_response_records
+from aiosurge.spans import (
+    IntervalIndex,
+    SpanCollector,
+    collect_spans,
+    decode_spans,
+)
+
+QUESTION = TextTaggingQuestion(
+    "Tag the entities", "Entities", options=["Person", "Place"]
+)
+
+
+def record(task_id, worker_id, spans):
+    return {
+        "task_id": task_id,
+        "response_id": f"{task_id}-{worker_id}",
+        "worker_id": worker_id,
+        "Tag the entities": json.dumps(
+            {"spans": [{"start": s, "end": e, "label": l} for s, e, l in spans]}
+        ),
+    }
+
+
+def test_decode_spans():
+    assert decode_spans(None) == []
+    assert decode_spans("[]") == []
+    assert decode_spans(
+        [
+            {"startOffset": 0, "endOffset": 4, "tag": "Person"},
+            {"start": 5, "end": 9, "labels": ["Place", "Person"]},
+            # Empty span and relationship tag
+            {"start": 3, "end": 3, "label": "Place"},
+            {"from": 0, "to": 1, "label": "lives_in"},
+        ]
+    ) == [(0, 4, "Person"), (5, 9, "Place"), (5, 9, "Person")]
+    assert decode_spans('{"entities": [{"begin": 1, "end": 2, "type": "X"}]}') == [
+        (1, 2, "X")
+    ]
+
+
+def test_interval_index_matches_brute_force():
+    rng = random.Random(0)
+    starts = [rng.randrange(100) for _ in range(300)]
+    ends = [start + rng.randrange(1, 15) for start in starts]
+    groups = [rng.randrange(4) for _ in range(300)]
+    index = IntervalIndex(starts, ends, groups)
+
+    for _ in range(200):
+        group = rng.randrange(4)
+        start = rng.randrange(-5, 120)
+        end = start + rng.randrange(1, 20)
+        expected = {
+            i
+            for i in range(300)
+            if groups[i] == group and starts[i] < end and ends[i] > start
+        }
+        assert set(index.query(start, end, group).tolist()) == expected
+
+    left, right = index.overlapping_pairs()
+    pairs = {frozenset(pair) for pair in zip(left.tolist(), right.tolist())}
+    expected = {
+        frozenset((i, j))
+        for i in range(300)
+        for j in range(i + 1, 300)
+        if groups[i] == groups[j] and starts[i] < ends[j] and starts[j] < ends[i]
+    }
+    assert len(left) == len(expected)
+    assert pairs == expected
+    assert sorted(index.group(2).tolist()) == [i for i in range(300) if groups[i] == 2]
+
+
+@pytest.mark.asyncio
+async def test_collect_spans():
+    records = [
+        record("t1", "w1", [(0, 4, "Person"), (10, 15, "Place")]),
+        record("t1", "w2", [(0, 4, "Person"), (11, 15, "Place")]),
+        record("t2", "w1", [(3, 8, "Organization")]),
+    ]
+    table = await collect_spans(records, QUESTION)
+
+    assert len(table) == 5
+    assert table.labels == ["Person", "Place", "Organization"]
+    assert table.worker_ids == ["w1", "w2"]
+    assert table.start.tolist() == [0, 10, 0, 11, 3]
+    assert table.label.tolist() == [0, 1, 0, 1, 2]
+
+    assert sorted(table.for_task("t1").tolist()) == [0, 1, 2, 3]
+    assert sorted(table.overlaps("t1", 12, 13).tolist()) == [1, 3]
+    assert table.overlaps("t2", 0, 3).tolist() == []
+    assert table.overlaps("t3", 0, 3).tolist() == []
+
+
+def test_span_agreement():
+    collector = SpanCollector(QUESTION)
+    records = [
+        record("t1", "w1", [(0, 4, "Person"), (10, 15, "Place")]),
+        record("t1", "w2", [(0, 4, "Person"), (11, 15, "Place")]),
+        # A worker who tagged nothing still disagrees with the others
+        record("t1", "w3", []),
+        # Single worker tasks are not compared
+        record("t2", "w1", [(3, 8, "Person")]),
+    ]
+    for response in iter_response_records(records):
+        collector.add(response)
+    table = collector.table()
+
+    # Pairs (w1, w2), (w1, w3), (w2, w3) on t1: 4 spans each compared with 2 workers
+    exact = table.agreement()
+    assert exact.f1 == pytest.approx(2 / 8)
+    assert exact.by_label["Person"] == pytest.approx(2 / 4)
+    assert exact.by_label["Place"] == 0
+    assert exact.num_tasks == 1
+    assert exact.num_spans == 4
+
+    overlap = table.agreement("overlap")
+    assert overlap.f1 == pytest.approx(4 / 8)
+    assert overlap.by_label["Place"] == pytest.approx(2 / 4)
+
+    with pytest.raises(ValueError):
+        table.agreement("partial")
+
+
+def test_span_agreement_matches_pairwise_f1():
+    rng = random.Random(1)
+    collector = SpanCollector(QUESTION)
+    responses = {}
+    for task in range(20):
+        for worker in range(rng.randrange(1, 4)):
+            spans = {
+                (start, start + rng.randrange(1, 4), rng.choice(QUESTION.options))
+                for start in rng.sample(range(30), rng.randrange(0, 6))
+            }
+            responses[(task, worker)] = spans
+            for response in iter_response_records(
+                [record(f"t{task}", f"w{worker}", sorted(spans))]
+            ):
+                collector.add(response)
+    table = collector.table()
+
+    def matched(a, b, overlap):
+        if not overlap:
+            return len(a & b)
+        return sum(
+            any(l1 == l2 and s1 < e2 and s2 < e1 for s2, e2, l2 in b)
+            for s1, e1, l1 in a
+        )
+
+    for mode in ("exact", "overlap"):
+        numerator = denominator = 0
+        for (task, w1), a in responses.items():
+            for (other, w2), b in responses.items():
+                if other == task and w1 < w2:
+                    numerator += matched(a, b, mode == "overlap")
+                    numerator += matched(b, a, mode == "overlap")
+                    denominator += len(a) + len(b)
+        assert table.agreement(mode).f1 == pytest.approx(numerator / denominator)
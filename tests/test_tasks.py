@@ -1,11 +1,12 @@
 from datetime import datetime
+from unittest.mock import patch, AsyncMock
 from dateutil.tz import tzutc
 import pytest
 
 from aiosurge.api_resource import APIResource
 from aiosurge.projects import Task
 from aiosurge.responses import Response, TaskResponse
-from aiosurge.errors import SurgeMissingIDError
+from aiosurge.errors import SurgeMissingIDError, SurgeRequestError
 
 
 def test_raise_exception_if_missing_id():
@@ -104,3 +105,90 @@ def test_str():
         )
     )
     assert t_str == "<surge.Task#XYZ-123-ABC>"
+
+
+@pytest.mark.asyncio
+async def test_set_gold_standards():
+    async def mock_post(endpoint, data, api_key=None):
+        if endpoint == "tasks/task-3/gold-standards":
+            raise SurgeRequestError("Not found")
+        return {"is_gold_standard": data["is_gold_standard"]}
+
+    progress = []
+    with patch(
+        "aiosurge.tasks.Task.post", new_callable=AsyncMock, side_effect=mock_post
+    ) as mock_request:
+        results = await Task.set_gold_standards(
+            {
+                "task-1": ["Yes"],
+                "task-2": {"answers": ["No"], "explanations": ["Off topic"]},
+                "task-3": ["Yes"],
+            },
+            concurrency=2,
+            on_progress=lambda p: progress.append(p.completed),
+        )
+
+    assert list(results) == ["task-1", "task-2", "task-3"]
+    assert results["task-1"].ok
+    assert results["task-1"].result == {"is_gold_standard": True}
+    assert not results["task-3"].ok
+    assert isinstance(results["task-3"].error, SurgeRequestError)
+    assert progress == [1, 2, 3]
+    mock_request.assert_any_await(
+        "tasks/task-2/gold-standards",
+        {
+            "is_gold_standard": True,
+            "explanations": ["Off topic"],
+            "answers": ["No"],
+        },
+        api_key=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_responses():
+    async def mock_post(endpoint, data, api_key=None):
+        if endpoint == "tasks/task-2/create-response":
+            raise SurgeRequestError("Not found")
+        return {"answers": data["answers"], "worker_id": data["worker_id"]}
+
+    def responses():
+        yield ("task-1", ["Yes"], "worker-1")
+        yield ("task-2", ["No"])
+        yield {"task_id": "task-3", "answers": ["Maybe"]}
+
+    with patch(
+        "aiosurge.tasks.Task.post", new_callable=AsyncMock, side_effect=mock_post
+    ) as mock_request:
+        summary = await Task.create_responses(responses(), concurrency=2)
+
+    assert summary.succeeded == 2
+    assert summary.failed == 1
+    assert summary.failed_items == [("task-2", ["No"])]
+    assert isinstance(summary.failures[0].error, SurgeRequestError)
+    mock_request.assert_any_await(
+        "tasks/task-1/create-response",
+        {"answers": ["Yes"], "worker_id": "worker-1"},
+        api_key=None,
+    )
+    mock_request.assert_any_await(
+        "tasks/task-3/create-response",
+        {"answers": ["Maybe"], "worker_id": None},
+        api_key=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_responses_from_jsonl(tmp_path):
+    file_path = tmp_path / "responses.jsonl"
+    file_path.write_text(
+        '{"task_id": "task-1", "answers": ["Yes"], "worker_id": "w1"}\n'
+        "\n"
+        '{"task_id": "task-2", "answers": ["No"]}\n'
+    )
+
+    with patch("aiosurge.tasks.Task.post", new_callable=AsyncMock) as mock_request:
+        summary = await Task.create_responses(str(file_path))
+
+    assert summary.succeeded == 2
+    assert mock_request.await_count == 2
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+from aiosurge.questions import ChatBot, FreeResponseQuestion
+from aiosurge.tasks import Task
+from aiosurge.transcripts import (
+    decode_transcript,
+    iter_transcripts,
+    write_transcripts,
+)
+
+CHAT = ChatBot("Chat with the model", "Chat")
+QUESTIONS = [CHAT, FreeResponseQuestion("Why?", "Reason")]
+TURNS = [
+    {"role": "user", "text": "Hi", "timestamp": 1},
+    {"role": "bot", "text": "Hello!", "timestamp": 2, "rating": "Good"},
+]
+
+
+def test_decode_transcript():
+    assert decode_transcript(None) == []
+    assert decode_transcript(json.dumps(TURNS)) == TURNS
+    assert decode_transcript({"messages": TURNS}) == TURNS
+    assert decode_transcript(["Hi", "Hello!"]) == [{"text": "Hi"}, {"text": "Hello!"}]
+    assert decode_transcript("not json") == [{"text": "not json"}]
+
+
+@pytest.mark.asyncio
+async def test_iter_transcripts():
+    records = [
+        {
+            "task_id": "t1",
+            "response_id": "r1",
+            "worker_id": "w1",
+            "fields": {"prompt": "Say hi", "source": "x"},
+            "Chat with the model": json.dumps(TURNS),
+            "Why?": "because",
+        },
+        {"task_id": "t2", "response_id": "r2", "worker_id": "w2", "Why?": "no chat"},
+        Task(
+            id="t3",
+            project_id="p1",
+            fields={"prompt": "Again"},
+            responses=[
+                {
+                    "id": "r3",
+                    "data": {"Chat with the model": {"messages": TURNS[:1]}},
+                    "completed_at": "2021-01-01T00:00:00Z",
+                    "worker_id": "w3",
+                }
+            ],
+        ),
+    ]
+    transcripts = [
+        transcript
+        async for transcript in iter_transcripts(
+            records,
+            QUESTIONS,
+            turn_fields=["role", "text"],
+            task_fields=["prompt"],
+            metadata=("task_id", "worker_id"),
+        )
+    ]
+    assert transcripts == [
+        {
+            "task_id": "t1",
+            "worker_id": "w1",
+            "question": "Chat",
+            "fields": {"prompt": "Say hi"},
+            "turns": [
+                {"role": "user", "text": "Hi"},
+                {"role": "bot", "text": "Hello!"},
+            ],
+        },
+        {
+            "task_id": "t3",
+            "worker_id": "w3",
+            "question": "Chat",
+            "fields": {"prompt": "Again"},
+            "turns": [{"role": "user", "text": "Hi"}],
+        },
+    ]
+
+
+@pytest.mark.asyncio
+async def test_write_transcripts(tmp_path):
+    async def stream():
+        for i in range(50):
+            yield {
+                "task_id": f"t{i}",
+                "response_id": f"r{i}",
+                "worker_id": "w1",
+                "completed_at": "2021-01-01T00:00:00Z",
+                "Chat with the model": TURNS,
+            }
+
+    path = tmp_path / "transcripts.jsonl"
+    count = await write_transcripts(stream(), QUESTIONS, str(path), buffer_size=100)
+
+    assert count == 50
+    lines = path.read_text().splitlines()
+    assert len(lines) == 50
+    first = json.loads(lines[0])
+    assert first["response_id"] == "r0"
+    assert first["completed_at"] == "2021-01-01T00:00:00Z"
+    assert first["turns"] == TURNS
+    assert json.loads(lines[-1])["task_id"] == "t49"
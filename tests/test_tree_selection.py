@@ -0,0 +1,112 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from aiosurge.questions import TreeSelectionQuestion
+from aiosurge.records import iter_response_records
+from aiosurge.tree_selection import (
+    OptionTree,
+    TreeSelectionAggregator,
+    aggregate_tree_selection,
+)
+
+QUESTION = TreeSelectionQuestion(
+    "Category?",
+    "Category",
+    options=[
+        "Animal / Mammal / Dog",
+        "Animal / Mammal / Cat",
+        "Animal / Bird",
+        "Plant",
+    ],
+)
+
+
+def record(task_id, worker_id, answer):
+    return {"task_id": task_id, "worker_id": worker_id, "Category?": answer}
+
+
+def aggregator_for(records):
+    aggregator = TreeSelectionAggregator(QUESTION)
+    for response in iter_response_records(records):
+        aggregator.add(response)
+    return aggregator
+
+
+def test_option_tree():
+    tree = OptionTree(QUESTION.options)
+    assert len(tree) == 7
+    assert tree.max_depth == 3
+    assert [tree.name(node) for node in tree.level_nodes(1)] == ["Animal", "Plant"]
+
+    dog = tree.node_id("Animal / Mammal / Dog")
+    assert tree.depths[dog] == 3
+    assert [tree.name(node) for node in tree.path_ids(dog)] == [
+        "Animal",
+        "Animal / Mammal",
+        "Animal / Mammal / Dog",
+    ]
+    assert tree.node_id("Animal / Mammal") == tree.parents[dog]
+    assert tree.node_id("Animal / Fish") == -1
+    assert tree.ancestors[dog].tolist() == [0] + tree.path_ids(dog)
+    assert tree.ancestors[tree.node_id("Plant")].tolist() == [
+        0,
+        tree.node_id("Plant"),
+        -1,
+        -1,
+    ]
+
+
+def test_counts():
+    aggregator = aggregator_for(
+        [
+            record("t1", "w1", "Animal / Mammal / Dog"),
+            record("t1", "w2", "Animal / Mammal / Cat"),
+            record("t1", "w3", "Animal / Bird"),
+            record("t2", "w1", "Plant"),
+            record("t2", "w2", "Animal / Mammal"),
+            record("t2", "w3", "Fungus"),
+            record("t2", "w4", None),
+        ]
+    )
+    assert aggregator.num_unknown == 1
+    assert aggregator.level_counts(1) == {"Animal": 4, "Plant": 1}
+    assert aggregator.level_counts(2) == {"Animal / Mammal": 3, "Animal / Bird": 1}
+    assert aggregator.counts()[0] == 5
+
+    task_ids, nodes, counts = aggregator.task_counts(2)
+    assert task_ids == ["t1", "t2"]
+    assert [aggregator.tree.name(node) for node in nodes] == [
+        "Animal / Mammal",
+        "Animal / Bird",
+    ]
+    # t2's "Plant" stops above level 2
+    assert counts.tolist() == [[2, 1], [1, 0]]
+
+
+@pytest.mark.asyncio
+async def test_consensus():
+    records = [
+        record("t1", "w1", "Animal / Mammal / Dog"),
+        record("t1", "w2", "Animal / Mammal / Cat"),
+        record("t1", "w3", "Animal / Mammal / Dog"),
+        record("t2", "w1", "Animal / Mammal / Dog"),
+        record("t2", "w2", "Animal / Mammal / Cat"),
+        record("t2", "w3", "Animal / Bird"),
+        record("t3", "w1", "Plant"),
+        record("t3", "w2", "Animal / Bird"),
+    ]
+    consensus = await aggregate_tree_selection(records, QUESTION)
+
+    assert consensus["t1"].path == "Animal / Mammal / Dog"
+    assert consensus["t1"].support == pytest.approx(2 / 3)
+    assert consensus["t2"].path == "Animal / Mammal"
+    assert consensus["t2"].depth == 2
+    assert consensus["t3"].path is None
+    assert consensus["t3"].depth == 0
+    assert consensus["t3"].num_responses == 2
+
+    # Lower thresholds accept one of several nodes at a depth, by votes then option order
+    consensus = aggregator_for(records).consensus(threshold=0.3)
+    assert consensus["t2"].path == "Animal / Mammal / Dog"
+    assert consensus["t3"].path == "Animal / Bird"
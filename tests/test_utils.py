@@ -1,8 +1,26 @@
+import asyncio
+import concurrent.futures
+import csv
+import gzip
+import json
 import pytest
 from unittest.mock import patch, AsyncMock
 import io
+import threading
 
-from aiosurge.utils import load_tasks_data_from_csv
+import aiosurge
+from aiosurge.errors import SurgeTaskDataError
+from aiosurge.utils import (
+    _GzipStreamDecompressor,
+    _JSONArrayParser,
+    decompress_gzip_stream,
+    run_in_decode_executor,
+    iter_csv_rows,
+    iter_json_array,
+    load_tasks_data_from_csv,
+    iter_tasks_data_batches_from_csv,
+    _split_csv_byte_ranges,
+)
 
 
 class MockAsyncReader:
@@ -127,3 +145,228 @@ class TestUtils:
             # Call the function and expect an assertion error
             with pytest.raises(AssertionError):
                 await load_tasks_data_from_csv("dummy_path.csv")
+
+
+@pytest.fixture
+def quoted_csv_file(tmp_path):
+    # Quoted fields with embedded newlines, commas and escaped quotes
+    lines = ["id,name,description\n"]
+    for i in range(200):
+        lines.append(f'{i},"Task {i}","line one\nline ""two"", {i}"\n')
+    file_path = tmp_path / "tasks.csv"
+    file_path.write_text("".join(lines))
+    return file_path
+
+
+class TestParallelCSV:
+    def test_split_csv_byte_ranges_aligned_on_records(self, quoted_csv_file):
+        ranges = _split_csv_byte_ranges(str(quoted_csv_file), chunk_size=100, start=20)
+        data = quoted_csv_file.read_bytes()
+
+        assert len(ranges) > 1
+        assert ranges[0][0] == 20
+        assert ranges[-1][1] == len(data)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start
+            # Every range ends outside of a quoted field
+            assert data[:end].count(b'"') % 2 == 0
+            assert data[end - 1 : end] == b"\n"
+
+    @pytest.mark.asyncio
+    async def test_parallel_matches_aiocsv(self, quoted_csv_file):
+        expected = await load_tasks_data_from_csv(str(quoted_csv_file))
+
+        batches = [
+            batch
+            async for batch in iter_tasks_data_batches_from_csv(
+                str(quoted_csv_file), batch_size=64, max_workers=2, chunk_size=500
+            )
+        ]
+
+        assert [len(b) for b in batches] == [64, 64, 64, 8]
+        assert [row for batch in batches for row in batch] == expected
+        assert expected[3] == {
+            "id": "3",
+            "name": "Task 3",
+            "description": 'line one\nline "two", 3',
+        }
+
+    @pytest.mark.asyncio
+    async def test_load_tasks_data_from_csv_parallel(self, quoted_csv_file):
+        result = await load_tasks_data_from_csv(
+            str(quoted_csv_file), parallel=True, max_workers=2
+        )
+
+        assert len(result) == 200
+        assert result[-1]["id"] == "199"
+
+    @pytest.mark.asyncio
+    async def test_parallel_matches_serial_on_ragged_rows(self, tmp_path):
+        lines = ["id,name,description\n"]
+        for i in range(100):
+            lines.append(
+                [f"{i},Task {i},desc\n", "\n", f"{i}\n", f'{i},"a, b"\n'][i % 4]
+            )
+        file_path = tmp_path / "ragged.csv"
+        file_path.write_text("".join(lines))
+
+        serial = await load_tasks_data_from_csv(str(file_path))
+        batches = [
+            batch
+            async for batch in iter_tasks_data_batches_from_csv(
+                str(file_path), batch_size=16, max_workers=2, chunk_size=64
+            )
+        ]
+
+        assert [row for batch in batches for row in batch] == serial
+        # Blank rows are skipped and short rows padded with None
+        assert len(serial) == 75
+        assert serial[1] == {"id": "2", "name": None, "description": None}
+        assert serial[2] == {"id": "3", "name": "a, b", "description": None}
+        with open(file_path, newline="") as f:
+            assert serial == list(csv.DictReader(f))
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("parallel", [False, True])
+    async def test_rows_with_extra_fields_are_rejected(self, tmp_path, parallel):
+        file_path = tmp_path / "extra.csv"
+        file_path.write_text("id,name\n1,a\n2,b,extra\n")
+
+        with pytest.raises(SurgeTaskDataError, match="3 fields but the header has 2"):
+            await load_tasks_data_from_csv(
+                str(file_path), parallel=parallel, max_workers=1
+            )
+
+    @pytest.mark.asyncio
+    async def test_parallel_empty_file(self, tmp_path):
+        file_path = tmp_path / "empty.csv"
+        file_path.write_text("")
+
+        with pytest.raises(AssertionError):
+            await load_tasks_data_from_csv(str(file_path), parallel=True)
+
+
+async def iter_chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+@pytest.mark.asyncio
+class TestIterJSONArray:
+    @pytest.mark.parametrize("chunk_size", [1, 3, 64, 100000])
+    async def test_iter_json_array(self, chunk_size):
+        items = [
+            {"id": "1", "text": "caf\u00e9 \u2603", "nested": {"a": [1, 2.5, None]}},
+            12345,
+            "string",
+            [],
+            True,
+        ]
+        data = json.dumps(items, ensure_ascii=False).encode("utf-8")
+
+        result = [item async for item in iter_json_array(iter_chunks(data, chunk_size))]
+
+        assert result == items
+
+    async def test_iter_json_array_empty(self):
+        result = [item async for item in iter_json_array(iter_chunks(b" [ ] ", 2))]
+        assert result == []
+
+    @pytest.mark.parametrize(
+        "data", [b"[1, 2", b"[1,]", b'{"a": 1}', b"[1] 2", b'[{"a": ']
+    )
+    async def test_iter_json_array_invalid(self, data):
+        with pytest.raises(json.JSONDecodeError):
+            async for _ in iter_json_array(iter_chunks(data, 2)):
+                pass
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [1, 4, 100000])
+async def test_iter_csv_rows(chunk_size):
+    data = (
+        'id,text\r\n1,"multi\r\nline, ""quoted"""\r\n\r\n2,caf\u00e9\r\n3,last'
+    ).encode("utf-8")
+
+    rows = [row async for row in iter_csv_rows(iter_chunks(data, chunk_size))]
+
+    assert rows == [
+        ["id", "text"],
+        ["1", 'multi\r\nline, "quoted"'],
+        ["2", "caf\u00e9"],
+        ["3", "last"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_report_decoding_keeps_event_loop_responsive():
+    records = [{"id": i, "text": f"item {i} " * 30} for i in range(20000)]
+    compressed = gzip.compress(json.dumps(records).encode())
+
+    loop_thread = threading.get_ident()
+    ticks = 0
+    # Thread and number of loop ticks so far, at the start of each decode step
+    decode_steps = []
+    decompress = _GzipStreamDecompressor.decompress
+    feed_bytes = _JSONArrayParser.feed_bytes
+
+    def record_decompress(self, *args):
+        decode_steps.append((threading.get_ident(), ticks))
+        return decompress(self, *args)
+
+    def record_feed_bytes(self, *args):
+        decode_steps.append((threading.get_ident(), ticks))
+        return feed_bytes(self, *args)
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0)
+            ticks += 1
+
+    async def network_chunks():
+        for i in range(0, len(compressed), 64 * 1024):
+            yield compressed[i : i + 64 * 1024]
+
+    tick_task = asyncio.ensure_future(tick())
+    count = 0
+    with (
+        patch.object(_GzipStreamDecompressor, "decompress", record_decompress),
+        patch.object(_JSONArrayParser, "feed_bytes", record_feed_bytes),
+    ):
+        async for _ in iter_json_array(
+            decompress_gzip_stream(network_chunks(), batch_size=64 * 1024),
+            batch_size=64 * 1024,
+        ):
+            count += 1
+    tick_task.cancel()
+
+    assert count == len(records)
+    # Every decode step ran off the event loop thread, and the loop kept running between them
+    assert len(decode_steps) > 2
+    assert all(thread != loop_thread for thread, _ in decode_steps)
+    tick_counts = [tick_count for _, tick_count in decode_steps]
+    assert len(set(tick_counts)) == len(tick_counts)
+
+
+@pytest.mark.asyncio
+async def test_run_in_decode_executor():
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        with patch.object(aiosurge, "decode_executor", executor):
+            assert await run_in_decode_executor(json.loads, b"[1, 2]") == [1, 2]
+
+            assert [
+                r
+                async for r in iter_json_array(
+                    decompress_gzip_stream(iter_chunks(gzip.compress(b"[1, 2]"), 4))
+                )
+            ] == [1, 2]
+
+    with concurrent.futures.ProcessPoolExecutor(1) as executor:
+        with patch.object(aiosurge, "decode_executor", executor):
+            assert await run_in_decode_executor(json.loads, b"[3]") == [3]
+            # Stateful decoders cannot run in another process, they fall back to threads
+            chunks = iter_chunks(gzip.compress(b"[4, 5]"), 4)
+            assert [
+                r async for r in iter_json_array(decompress_gzip_stream(chunks))
+            ] == [4, 5]
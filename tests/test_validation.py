@@ -0,0 +1,122 @@
+import pytest
+
+from aiosurge.projects import Project
+from aiosurge.validation import TaskDataValidator, fields_template_placeholders
+from aiosurge.errors import SurgeTaskDataError
+
+
+def test_fields_template_placeholders():
+    template = (
+        '<a href="{{url}}">{{ title }}</a>{{{raw_html}}}'
+        "{{#if note}}{{note}}{{else}}-{{/if}}{{url}}"
+    )
+    assert fields_template_placeholders(template) == [
+        "url",
+        "title",
+        "raw_html",
+        "note",
+    ]
+    assert fields_template_placeholders(None) == []
+
+
+def test_fields_template_placeholders_skip_helpers_and_blocks():
+    template = (
+        "{{!-- {{hidden}} --}}{{! note }}{{> header}}"
+        "{{#each items}}{{@index}}{{this}}{{/each}}"
+        "{{^empty}}{{~ body ~}}{{/empty}}"
+        "{{lookup labels key}}{{#if a}}{{else if b}}{{/if}}{{{ raw }}}"
+    )
+    assert fields_template_placeholders(template) == ["body", "raw"]
+
+
+def test_validate_valid_rows():
+    validator = TaskDataValidator("{{company}} in {{city}}")
+    report = validator.validate([{"company": "Surge", "city": "SF"}] * 3)
+
+    assert report.is_valid
+    assert report.invalid_rows == {}
+    report.raise_for_errors()
+
+
+def test_validate_missing_and_empty_fields():
+    validator = TaskDataValidator(
+        "{{company}} in {{city}}", required_fields=["company"]
+    )
+    report = validator.validate(
+        [
+            {"company": "Surge", "city": "SF"},
+            {"company": "", "city": "SF"},
+            {"company": "Twitch"},
+            {"city": "NYC"},
+            {"company": "  ", "city": "LA"},
+        ]
+    )
+
+    assert not report.is_valid
+    assert report.missing_fields == {"city": [2], "company": [3]}
+    assert report.empty_fields == {"company": [1, 4]}
+    assert report.invalid_rows == {
+        1: ["empty field 'company'"],
+        2: ["missing field 'city'"],
+        3: ["missing field 'company'"],
+        4: ["empty field 'company'"],
+    }
+
+
+def test_raise_for_errors_lists_rows():
+    validator = TaskDataValidator("{{url}}")
+    report = validator.validate([{"url": "a"}] + [{}] * 12)
+
+    with pytest.raises(
+        SurgeTaskDataError, match="12 of 13 tasks are invalid: row 1"
+    ) as e:
+        report.raise_for_errors(max_rows_in_message=2)
+    assert "and 10 more rows" in str(e.value)
+
+
+def test_validate_rejects_non_dict_rows():
+    with pytest.raises(SurgeTaskDataError):
+        TaskDataValidator("{{url}}").validate([{"url": "a"}, "b"])
+
+
+def test_from_project_reads_fields_text():
+    # Projects returned by the API hold their template in fields_text
+    project = Project(id="ABC1234", name="Test", fields_text="{{video}} {{title}}")
+    assert TaskDataValidator.from_project(project).placeholders == ["video", "title"]
+
+    project = Project(
+        id="ABC1234", name="Test", fields_template="{{video}}", fields_text="{{old}}"
+    )
+    assert TaskDataValidator.from_project(project).placeholders == ["video"]
+    assert (
+        TaskDataValidator.from_project(Project(id="ABC1234", name="Test")).placeholders
+        == []
+    )
+
+
+@pytest.mark.asyncio
+async def test_project_create_tasks_validate():
+    project = Project(id="ABC1234", name="Test", fields_template="{{video}}")
+
+    report = project.validate_tasks_data([{"video": "a"}, {"image": "b"}])
+    assert report.invalid_rows == {1: ["missing field 'video'"]}
+
+    # Invalid batches are rejected before any request is made
+    with pytest.raises(SurgeTaskDataError):
+        await project.create_tasks([{"image": "b"}], validate=True)
+
+
+@pytest.mark.asyncio
+async def test_create_tasks_required_fields(tmp_path):
+    project = Project(id="ABC1234", name="Test", fields_template="{{video}}")
+    csv_path = tmp_path / "tasks.csv"
+    csv_path.write_text("video,title\na,\n")
+
+    with pytest.raises(SurgeTaskDataError, match="empty field 'title'"):
+        await project.create_tasks(
+            [{"video": "a", "title": ""}], validate=True, required_fields=["title"]
+        )
+    with pytest.raises(SurgeTaskDataError, match="empty field 'title'"):
+        await project.create_tasks_from_csv(
+            str(csv_path), validate=True, required_fields=["title"]
+        )
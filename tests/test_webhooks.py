@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import hmac
+import json
+
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from aiosurge.tasks import Task
+from aiosurge.webhooks import CallbackReceiver, parse_callback_payload
+
+
+def task_payload(task_id):
+    return {
+        "id": task_id,
+        "project_id": "P1",
+        "created_at": "2021-01-01T00:00:00Z",
+        "fields": {"text": f"text {task_id}"},
+        "responses": [
+            {
+                "id": f"R{task_id}",
+                "data": {"Sentiment": "Positive"},
+                "completed_at": "2021-01-01T01:00:00Z",
+                "worker_id": "W1",
+            }
+        ],
+    }
+
+
+def test_parse_callback_payload():
+    tasks = parse_callback_payload([task_payload("T1"), {"task": task_payload("T2")}])
+    assert [task.id for task in tasks] == ["T1", "T2"]
+    assert isinstance(tasks[0], Task)
+    assert tasks[0].responses[0].data == {"Sentiment": "Positive"}
+
+    with pytest.raises(ValueError):
+        parse_callback_payload("T1")
+
+
+@pytest.mark.asyncio
+async def test_receive_callbacks():
+    async with CallbackReceiver(path="/callback") as receiver:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(receiver.url, json=task_payload("T1"))
+            assert response.status_code == 200
+            response = await client.post(
+                receiver.url, json=[task_payload("T2"), task_payload("T3")]
+            )
+            assert response.status_code == 200
+
+            assert (await client.get(receiver.url)).status_code == 405
+            other = receiver.url.replace("/callback", "/other")
+            assert (await client.post(other, json={})).status_code == 404
+            assert (await client.post(receiver.url, content=b"{")).status_code == 400
+            assert (await client.post(receiver.url, json={})).status_code == 400
+
+    # Tasks received before stopping are still delivered
+    tasks = [task async for task in receiver]
+    assert [task.id for task in tasks] == ["T1", "T2", "T3"]
+    assert tasks[0].fields == {"text": "text T1"}
+
+
+@pytest.mark.asyncio
+async def test_signature_check():
+    secret = "shh"
+    body = json.dumps(task_payload("T1")).encode()
+    signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+    async with CallbackReceiver(secret=secret, signature_header="X-Sig") as receiver:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(receiver.url, content=body)
+            assert response.status_code == 401
+            response = await client.post(
+                receiver.url, content=body, headers={"X-Sig": "0" * 64}
+            )
+            assert response.status_code == 401
+            response = await client.post(
+                receiver.url, content=body, headers={"X-Sig": f"sha256={signature}"}
+            )
+            assert response.status_code == 200
+            response = await client.post(
+                receiver.url,
+                content=body,
+                headers={"X-Sig": "sha256=\u00e9t\u00e9".encode()},
+            )
+            assert response.status_code == 401
+
+        task = await receiver.get()
+        assert task.id == "T1"
+
+
+@pytest.mark.asyncio
+async def test_full_queue_delays_response():
+    async with CallbackReceiver(max_queue_size=1) as receiver:
+        async with httpx.AsyncClient() as client:
+            await client.post(receiver.url, json=task_payload("T1"))
+            pending = asyncio.ensure_future(
+                client.post(receiver.url, json=task_payload("T2"))
+            )
+            await asyncio.sleep(0.1)
+            assert not pending.done()
+
+            assert (await receiver.get()).id == "T1"
+            assert (await pending).status_code == 200
+            assert (await receiver.get()).id == "T2"
+
+
+@pytest.mark.asyncio
+async def test_batches():
+    async with CallbackReceiver() as receiver:
+        async with httpx.AsyncClient() as client:
+            for i in range(5):
+                await client.post(receiver.url, json=task_payload(f"T{i}"))
+
+        batches = receiver.batches(max_size=2, max_wait=0.05)
+        assert [task.id for task in await batches.__anext__()] == ["T0", "T1"]
+        assert [task.id for task in await batches.__anext__()] == ["T2", "T3"]
+        # A partial batch is yielded once max_wait has passed
+        assert [task.id for task in await batches.__anext__()] == ["T4"]
+
+        async def send_later():
+            await asyncio.sleep(0.05)
+            async with httpx.AsyncClient() as client:
+                await client.post(receiver.url, json=task_payload("T5"))
+            await receiver.stop()
+
+        sender = asyncio.ensure_future(send_later())
+        rest = [batch async for batch in batches]
+        await sender
+        assert [[task.id for task in batch] for batch in rest] == [["T5"]]
+
+
+@pytest.mark.asyncio
+async def test_batches_keep_every_task_through_timeouts():
+    async with CallbackReceiver(max_queue_size=10) as receiver:
+
+        async def produce():
+            for i in range(2000):
+                await receiver._queue.put(i)
+                if i % 7 == 0:
+                    await asyncio.sleep(0.0005)
+            await receiver.stop()
+
+        producer = asyncio.ensure_future(produce())
+        received = [
+            i
+            async for batch in receiver.batches(max_size=50, max_wait=0.0005)
+            for i in batch
+        ]
+        await producer
+
+    assert received == list(range(2000))
+
+
+@pytest.mark.asyncio
+async def test_cancelled_get_keeps_its_task():
+    async with CallbackReceiver() as receiver:
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(receiver.get(), 0.01)
+        await receiver._queue.put("T1")
+        with pytest.raises(asyncio.TimeoutError):
+            # Cancelled while its pending get already holds T1
+            await asyncio.wait_for(receiver.get(), 0)
+        assert await receiver.get() == "T1"
+
+
+@pytest.mark.asyncio
+async def test_read_timeout_does_not_cover_a_full_queue():
+    with patch("aiosurge.webhooks.CALLBACK_READ_TIMEOUT", 0.05):
+        async with CallbackReceiver(max_queue_size=1) as receiver:
+            async with httpx.AsyncClient() as client:
+                await client.post(receiver.url, json=task_payload("T1"))
+                pending = asyncio.ensure_future(
+                    client.post(
+                        receiver.url, json=[task_payload("T2"), task_payload("T3")]
+                    )
+                )
+                # Longer than the read timeout
+                await asyncio.sleep(0.2)
+                assert not pending.done()
+
+                ids = [(await receiver.get()).id for _ in range(3)]
+                assert (await pending).status_code == 200
+    assert ids == ["T1", "T2", "T3"]
+
+
+def test_queue_is_created_on_start():
+    receiver = CallbackReceiver()
+
+    async def receive():
+        async with receiver:
+            async with httpx.AsyncClient() as client:
+                await client.post(receiver.url, json=task_payload("T1"))
+            return (await receiver.get()).id
+
+    # The receiver was built outside of the event loop that runs it
+    assert asyncio.run(receive()) == "T1"
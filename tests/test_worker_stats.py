@@ -0,0 +1,169 @@
+import pytest
+
+from aiosurge.consensus import LikertMean
+from aiosurge.questions import (
+    CheckboxQuestion,
+    LikertQuestion,
+    MultipleChoiceQuestion,
+    TextArea,
+)
+from aiosurge.worker_stats import WorkerStatsIndex
+
+QUESTIONS = [
+    TextArea("Read the text below.", "Instructions"),
+    MultipleChoiceQuestion("Sentiment?", "Sentiment", options=["pos", "neg"]),
+    CheckboxQuestion("Topics?", "Topics", options=["a", "b"]),
+]
+# One answer per question, as passed to Task.set_gold_standards
+GOLD_STANDARDS = {"gold": [None, "pos", ["a"]]}
+
+
+def response(response_id, task_id, worker_id, minute, sentiment, topics):
+    return {
+        "response_id": response_id,
+        "task_id": task_id,
+        "worker_id": worker_id,
+        "completed_at": f"2024-01-01T10:{minute:02d}:00Z",
+        "Sentiment?": sentiment,
+        "Topics?": topics,
+    }
+
+
+RECORDS = [
+    response("r1", "gold", "w1", 0, "pos", ["a"]),
+    response("r2", "gold", "w2", 1, "neg", ["a"]),
+    response("r3", "t1", "w1", 2, "pos", "a\nb"),
+    response("r4", "t1", "w2", 3, "neg", ["b"]),
+    response("r5", "t2", "w1", 6, "neg", []),
+    response("r6", "t1", "w3", 4, "pos", ["b", "a"]),
+    response("r7", "t2", "w3", 50, "neg", ["b"]),
+]
+
+
+@pytest.fixture
+def index():
+    return WorkerStatsIndex(
+        QUESTIONS, num_workers_per_task=3, gold_standards=GOLD_STANDARDS
+    )
+
+
+@pytest.mark.asyncio
+async def test_update(index):
+    assert await index.update(RECORDS) == 7
+    # Responses that were already added are skipped
+    assert await index.update(RECORDS[:2]) == 0
+
+    w1, w2, w3 = index["w1"], index["w2"], index["w3"]
+    assert (w1.num_responses, w2.num_responses, w3.num_responses) == (3, 2, 2)
+    assert w1.gold_accuracy == 1
+    assert w2.gold_accuracy == 0
+    assert w3.gold_accuracy is None
+
+    # t1 resolved to "pos" and ["a", "b"]
+    assert (w1.consensus_agreed, w1.consensus_total) == (2, 2)
+    assert (w2.consensus_agreed, w2.consensus_total) == (0, 2)
+    assert w3.consensus_agreement == 1
+
+    assert w1.median_cadence == 180
+    # The 46 minute pause is a break
+    assert w3.median_cadence is None
+
+    index.flush()
+    # The partial consensus of the gold task and t2 now counts too
+    assert w3.consensus_total == 4
+
+
+@pytest.mark.asyncio
+async def test_select_and_underperforming(index):
+    await index.update(RECORDS)
+
+    assert index.select(min_gold_accuracy=0.5) == ["w1"]
+    assert sorted(index.select(min_consensus_agreement=0.5)) == ["w1", "w3"]
+    assert index.select(min_responses=3) == ["w1"]
+    assert index.underperforming(
+        min_gold_accuracy=0.5, min_consensus_agreement=0.5
+    ) == ["w2"]
+
+
+@pytest.mark.asyncio
+async def test_save_and_load(index, tmp_path):
+    await index.update(RECORDS[:4])
+    path = str(tmp_path / "workers.sqlite3")
+    index.save(path)
+
+    loaded = WorkerStatsIndex.load(path, QUESTIONS, 3, GOLD_STANDARDS)
+
+    assert len(loaded) == 2
+    assert loaded["w1"].gold_correct == 1
+    assert list(loaded["w1"].completions) == list(index["w1"].completions)
+    assert loaded._aggregator.num_pending == 2
+    assert await loaded.update(RECORDS) == 3
+    assert loaded["w1"].num_responses == 3
+    assert "w3" in loaded
+
+    # Responses added before saving still count toward the consensus of their task
+    full = WorkerStatsIndex(QUESTIONS, 3, GOLD_STANDARDS)
+    await full.update(RECORDS)
+    for worker_id in ("w1", "w2", "w3"):
+        assert (
+            loaded[worker_id].consensus_agreed,
+            loaded[worker_id].consensus_total,
+        ) == (full[worker_id].consensus_agreed, full[worker_id].consensus_total)
+
+
+@pytest.mark.asyncio
+async def test_responses_without_worker_count_toward_consensus(index):
+    records = [
+        response("r1", "t1", "w1", 0, "pos", ["a"]),
+        response("r2", "t1", None, 1, "neg", ["b"]),
+        response("r3", "t1", None, 2, "neg", ["b"]),
+    ]
+    assert await index.update(records) == 3
+
+    assert list(index.workers) == ["w1"]
+    assert index["w1"].num_responses == 1
+    # t1 resolved to "neg" and ["b"], which w1 disagrees with
+    assert (index["w1"].consensus_agreed, index["w1"].consensus_total) == (0, 2)
+
+
+@pytest.mark.asyncio
+async def test_seen_responses_are_bounded(index, tmp_path):
+    old = response("old", "t0", "w1", 0, "pos", ["a"])
+    old["completed_at"] = "2023-12-30T10:00:00Z"
+    undated = response("undated", "t0", "w2", 0, "pos", ["a"])
+    undated["completed_at"] = None
+    assert await index.update([old, undated] + RECORDS) == 9
+
+    # Only the IDs within a day of the latest response, and those without a date, are kept
+    assert set(index._seen_responses) == {"undated"} | {
+        r["response_id"] for r in RECORDS
+    }
+    assert await index.update([old, undated] + RECORDS) == 0
+
+    path = str(tmp_path / "workers.sqlite3")
+    index.save(path)
+    loaded = WorkerStatsIndex.load(path, QUESTIONS, 3, GOLD_STANDARDS)
+    assert loaded._seen_responses == index._seen_responses
+    assert await loaded.update([old, undated] + RECORDS) == 0
+    assert loaded["w1"].num_responses == index["w1"].num_responses == 4
+
+
+@pytest.mark.asyncio
+async def test_likert_agreement_uses_majority():
+    quality = LikertQuestion("Quality?", "Quality", options=["1", "2", "3"])
+    records = [
+        {"response_id": f"r{i}", "task_id": "t1", "worker_id": f"w{i}", "Quality?": q}
+        for i, q in enumerate(["1", "1", "3"])
+    ]
+
+    index = WorkerStatsIndex([quality], num_workers_per_task=3)
+    await index.update(records)
+    assert [index[f"w{i}"].consensus_agreed for i in range(3)] == [1, 1, 0]
+    assert index["w2"].consensus_total == 1
+
+    # The mean of a LikertMean strategy is not compared
+    index = WorkerStatsIndex(
+        [quality], num_workers_per_task=3, strategies={"likert": LikertMean()}
+    )
+    await index.update(records)
+    assert index["w0"].consensus_total == 0